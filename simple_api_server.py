@@ -4,13 +4,19 @@ Simple API Server for React Webapp
 A minimal FastAPI server that definitely works
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
 import uuid
 from datetime import datetime
 
+# Same pricing engine and VAT setting as the quotation service
+from task2_quotation_service.api.config import get_settings
+from task2_quotation_service.api.pricing import price_lines, to_major
+
+VAT_RATE_PCT = get_settings().vat_rate_pct
+
 # Create FastAPI app
 app = FastAPI(title="Alrouf AI API", version="1.0.0")
 
@@ -52,27 +58,33 @@ async def health():
 async def generate_quotation(request: QuotationRequest):
     """Generate a quotation"""
     
-    # Calculate pricing
-    items_with_totals = []
-    subtotal = 0
-    
-    for item in request.items:
-        unit_price = item.unit_cost * (1 + item.margin_pct / 100)
-        line_total = unit_price * item.qty
-        subtotal += line_total
-        
-        items_with_totals.append({
+    # Calculate pricing in exact minor units
+    try:
+        priced = price_lines(
+            [item.qty for item in request.items],
+            [item.unit_cost for item in request.items],
+            [item.margin_pct for item in request.items],
+            vat_pct=VAT_RATE_PCT,
+        )
+    except ValueError as e:
+        # Amounts too large to price exactly
+        raise HTTPException(status_code=400, detail=str(e))
+    items_with_totals = [
+        {
             "sku": item.sku,
             "qty": item.qty,
             "unit_cost": item.unit_cost,
             "margin_pct": item.margin_pct,
-            "unit_price": round(unit_price, 2),
-            "line_total": round(line_total, 2)
-        })
-    
-    # Calculate tax (15% VAT)
-    tax_amount = subtotal * 0.15
-    total = subtotal + tax_amount
+            "unit_price": unit_price,
+            "line_total": line_total
+        }
+        for item, unit_price, line_total in zip(
+            request.items, to_major(priced.unit_price, 2).tolist(), to_major(priced.line_total, 2).tolist()
+        )
+    ]
+    subtotal, tax_amount, total = (
+        to_major(amount, 2).item() for amount in (priced.subtotal, priced.tax_amount, priced.total)
+    )
     
     # Generate quotation ID
     quotation_id = f"QUO-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
@@ -97,7 +109,7 @@ async def generate_quotation(request: QuotationRequest):
         
         email_draft += f"""
 المجموع الفرعي: {subtotal:.2f} {request.currency}
-ضريبة القيمة المضافة (15%): {tax_amount:.2f} {request.currency}
+ضريبة القيمة المضافة ({VAT_RATE_PCT:g}%): {tax_amount:.2f} {request.currency}
 المجموع الكلي: {total:.2f} {request.currency}
 
 شروط التسليم: {request.delivery_terms}
@@ -127,7 +139,7 @@ Product Details:
         
         email_draft += f"""
 Subtotal: {subtotal:.2f} {request.currency}
-VAT (15%): {tax_amount:.2f} {request.currency}
+VAT ({VAT_RATE_PCT:g}%): {tax_amount:.2f} {request.currency}
 Total: {total:.2f} {request.currency}
 
 Delivery Terms: {request.delivery_terms}
@@ -143,9 +155,9 @@ Sales Team - Alrouf Lighting Technology
         "quotation_id": quotation_id,
         "client": request.client,
         "items": items_with_totals,
-        "subtotal": round(subtotal, 2),
-        "tax_amount": round(tax_amount, 2),
-        "total": round(total, 2),
+        "subtotal": subtotal,
+        "tax_amount": tax_amount,
+        "total": total,
         "email_draft": email_draft,
         "generated_at": datetime.now().isoformat()
     }
@@ -0,0 +1,237 @@
+"""
+Product catalog loaded from a CSV, JSON or SQLite file with hot reload
+"""
+
+import csv
+import hashlib
+import io
+import json
+import logging
+import sqlite3
+import sys
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from hot_reload import SnapshotReloader
+
+logger = logging.getLogger(__name__)
+
+CORE_FIELDS = ("sku", "name", "description", "base_price", "category")
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def normalize_spec_key(key: str) -> str:
+    """Normalize a specification name, e.g. ``Color Temp`` -> ``color_temp``"""
+    return "_".join(str(key).split()).lower()
+
+
+def normalize_spec_value(value: Any) -> str:
+    """Normalize a specification value, e.g. ``4000 K`` -> ``4000k``"""
+    return "".join(str(value).split()).lower()
+
+
+class Product:
+    """Catalog entry; slotted to keep tens of thousands of SKUs compact"""
+
+    __slots__ = ("sku", "name", "description", "base_price", "category", "specifications")
+
+    def __init__(
+        self,
+        sku: str,
+        name: str,
+        description: str,
+        base_price: float,
+        category: str,
+        specifications: Dict[str, Any],
+    ):
+        self.sku = sku
+        self.name = name
+        self.description = description
+        self.base_price = base_price
+        self.category = category
+        self.specifications = specifications
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Product as returned by GET /products"""
+        return {
+            "sku": self.sku,
+            "name": self.name,
+            "description": self.description,
+            "base_price": self.base_price,
+            "category": self.category,
+            "specifications": self.specifications,
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Product) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Product(sku={self.sku!r}, name={self.name!r}, base_price={self.base_price!r})"
+
+
+class CatalogSnapshot:
+    """
+    One fully loaded, immutable version of the catalog.
+
+    Lookup indexes are built once per load, so searches never scan the
+    product list. Readers hold a reference to a snapshot for the whole
+    request and never see a partially loaded catalog.
+    """
+
+    __slots__ = ("products", "by_category", "by_spec", "version", "_position")
+
+    def __init__(self, products: Dict[str, Product], version: str):
+        self.products = products
+        self.version = version
+        # Catalog order of every SKU, so matches are ordered without a scan
+        self._position = {sku: position for position, sku in enumerate(products)}
+
+        by_category: Dict[str, List[str]] = {}
+        by_spec: Dict[Tuple[str, str], List[str]] = {}
+        for product in products.values():
+            by_category.setdefault(product.category.lower(), []).append(product.sku)
+            for key, value in product.specifications.items():
+                spec = (normalize_spec_key(key), normalize_spec_value(value))
+                by_spec.setdefault(spec, []).append(product.sku)
+
+        self.by_category: Dict[str, FrozenSet[str]] = {
+            category: frozenset(skus) for category, skus in by_category.items()
+        }
+        self.by_spec: Dict[Tuple[str, str], FrozenSet[str]] = {
+            spec: frozenset(skus) for spec, skus in by_spec.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def find(self, category: Optional[str] = None, specs: Optional[Dict[str, Any]] = None) -> List[Product]:
+        """
+        Products matching a category and every given specification
+
+        Args:
+            category: Category name, case-insensitive
+            specs: Specification filters compared after normalization,
+                so ``{"Wattage": "90 w"}`` matches ``wattage: 90W``
+
+        Returns:
+            Matching products in catalog order
+        """
+        candidate_sets = []
+        if category is not None:
+            candidate_sets.append(self.by_category.get(category.lower(), frozenset()))
+        for key, value in (specs or {}).items():
+            spec = (normalize_spec_key(key), normalize_spec_value(value))
+            candidate_sets.append(self.by_spec.get(spec, frozenset()))
+
+        if not candidate_sets:
+            return list(self.products.values())
+
+        candidate_sets.sort(key=len)
+        skus = candidate_sets[0].intersection(*candidate_sets[1:])
+        return [self.products[sku] for sku in sorted(skus, key=self._position.__getitem__)]
+
+
+def _product_from_row(row: Dict[str, Any], line: int) -> Product:
+    """Build a product from a flat CSV/SQLite row or a JSON object"""
+    missing = [field for field in ("sku", "base_price") if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"Catalog row {line} is missing {', '.join(missing)}")
+
+    specifications = row.get("specifications") or {}
+    if isinstance(specifications, str):
+        specifications = json.loads(specifications)
+    # Any other non-empty column is treated as a specification
+    for key, value in row.items():
+        if key not in CORE_FIELDS and key != "specifications" and value not in (None, ""):
+            specifications[key] = value
+
+    try:
+        base_price = float(row["base_price"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Catalog row {line} has an invalid base_price: {row['base_price']!r}")
+
+    return Product(
+        sku=str(row["sku"]).strip(),
+        name=str(row.get("name") or ""),
+        description=str(row.get("description") or ""),
+        base_price=base_price,
+        category=sys.intern(str(row.get("category") or "")),
+        specifications={sys.intern(str(key)): value for key, value in specifications.items()},
+    )
+
+
+def _read_json(data: bytes) -> Iterable[Dict[str, Any]]:
+    document = json.loads(data.decode("utf-8"))
+    return document["products"] if isinstance(document, dict) else document
+
+
+def _read_csv(data: bytes) -> Iterable[Dict[str, Any]]:
+    return csv.DictReader(io.StringIO(data.decode("utf-8-sig"), newline=""))
+
+
+def _read_sqlite(path: str) -> List[Dict[str, Any]]:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM products")]
+    finally:
+        conn.close()
+
+
+def load_catalog(path: str) -> CatalogSnapshot:
+    """
+    Load a catalog file into a snapshot
+
+    JSON files hold a list of products (or ``{"products": [...]}``). CSV
+    files and SQLite ``products`` tables have one row per product; a
+    ``specifications`` column may hold a JSON object and any other extra
+    column becomes a specification.
+
+    Raises:
+        ValueError: If a row is malformed
+        OSError, sqlite3.Error: If the file cannot be read
+    """
+    digest = hashlib.sha256()
+    if path.endswith(SQLITE_SUFFIXES):
+        rows = _read_sqlite(path)
+        for row in rows:
+            digest.update(json.dumps(row, sort_keys=True, default=str).encode("utf-8"))
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        digest.update(data)
+        rows = _read_csv(data) if path.endswith(".csv") else _read_json(data)
+
+    products: Dict[str, Product] = {}
+    for line, row in enumerate(rows, start=1):
+        product = _product_from_row(dict(row), line)
+        if product.sku in products:
+            logger.warning(f"Duplicate SKU {product.sku} in catalog {path}, keeping the last row")
+        products[product.sku] = product
+
+    return CatalogSnapshot(products, version=digest.hexdigest()[:16])
+
+
+class ProductCatalog(SnapshotReloader[CatalogSnapshot]):
+    """
+    Hot-reloading product catalog.
+
+    At most once per ``reload_interval`` seconds, reading the catalog stats
+    the source file. When it has changed, a background thread loads the new
+    file and swaps the snapshot reference in one assignment. Request
+    handling never waits for a reload, and a failed reload keeps serving
+    the previous snapshot.
+    """
+
+    kind = "catalog"
+    load_errors = (OSError, ValueError, KeyError, sqlite3.Error)
+
+    def _parse(self, path: str) -> CatalogSnapshot:
+        return load_catalog(path)
+
+    def _describe(self, snapshot: CatalogSnapshot) -> str:
+        return f"{len(snapshot)} products"
+
+    @property
+    def products(self) -> Dict[str, Product]:
+        """Products of the current snapshot by SKU"""
+        return self.snapshot.products
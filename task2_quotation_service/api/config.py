@@ -17,9 +17,76 @@ class Settings(BaseSettings):
     # OpenAI Configuration
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # Alternative chat-completions endpoint, e.g. a local stand-in for load tests (empty = api.openai.com)
+    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "")
+    openai_timeout_seconds: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    
+    # OpenAI admission control (calls beyond concurrency + queue use the template)
+    openai_max_concurrency: int = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+    openai_max_queue: int = int(os.getenv("OPENAI_MAX_QUEUE", "64"))
+    
+    # OpenAI circuit breaker (open after N failures within the window)
+    openai_breaker_failure_threshold: int = int(os.getenv("OPENAI_BREAKER_FAILURE_THRESHOLD", "5"))
+    openai_breaker_window_seconds: float = float(os.getenv("OPENAI_BREAKER_WINDOW_SECONDS", "30"))
+    openai_breaker_cooldown_seconds: float = float(os.getenv("OPENAI_BREAKER_COOLDOWN_SECONDS", "30"))
+    
+    # Deferred Email Drafts
+    draft_workers: int = int(os.getenv("DRAFT_WORKERS", "4"))
+    draft_queue_size: int = int(os.getenv("DRAFT_QUEUE_SIZE", "1000"))
+    draft_max_wait_seconds: float = float(os.getenv("DRAFT_MAX_WAIT_SECONDS", "30"))
+    draft_poll_interval_seconds: float = float(os.getenv("DRAFT_POLL_INTERVAL_SECONDS", "0.25"))
+    # Default wait for the LLM draft on POST /quote before returning the template (0 = no limit)
+    draft_latency_budget_ms: int = int(os.getenv("DRAFT_LATENCY_BUDGET_MS", "0"))
+    
+    # Email Draft Cache
+    draft_cache_enabled: bool = os.getenv("DRAFT_CACHE_ENABLED", "True").lower() == "true"
+    draft_cache_max_entries: int = int(os.getenv("DRAFT_CACHE_MAX_ENTRIES", "1024"))
+    draft_cache_max_bytes: int = int(os.getenv("DRAFT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    draft_cache_ttl_seconds: float = float(os.getenv("DRAFT_CACHE_TTL_SECONDS", "3600"))
+    
+    # Product Catalog (CSV, JSON or SQLite file; reloaded when it changes)
+    catalog_path: str = os.getenv(
+        "CATALOG_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "products.json")
+    )
+    catalog_reload_interval_seconds: float = float(os.getenv("CATALOG_RELOAD_INTERVAL_SECONDS", "5"))
+    
+    # Pricing
+    vat_rate_pct: float = float(os.getenv("VAT_RATE_PCT", "15"))
+    
+    # FX rate table for items priced in another currency (reloaded when it changes)
+    fx_rates_path: str = os.getenv(
+        "FX_RATES_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fx_rates.json")
+    )
+    fx_reload_interval_seconds: float = float(os.getenv("FX_RELOAD_INTERVAL_SECONDS", "5"))
+    
+    # Idempotency-Key support on POST /quote
+    idempotency_max_keys: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+    idempotency_ttl_seconds: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    
+    # Printable documents at GET /quote/{id}/document (0 workers renders in-process)
+    document_workers: int = int(os.getenv("DOCUMENT_WORKERS", "2"))
+    document_max_queue: int = int(os.getenv("DOCUMENT_MAX_QUEUE", "32"))
+    document_cache_max_entries: int = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "256"))
+    # TrueType font with Arabic glyphs, required for Arabic PDFs
+    document_font_path: str = os.getenv("DOCUMENT_FONT_PATH", "")
+    
+    # Serialized GET /quote/{id} responses kept in memory
+    response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
     
     # Database Configuration
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./quotations.db")
+    # SQLite file for idempotency keys and drafts shared across worker processes (empty = per process)
+    shared_state_path: str = os.getenv("SHARED_STATE_PATH", "")
+    
+    # Batch Processing
+    batch_max_size: int = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+    batch_draft_concurrency: int = int(os.getenv("BATCH_DRAFT_CONCURRENCY", "8"))
+    
+    # GET /quotes/export (quotations read from the store per chunk)
+    export_batch_size: int = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
     
     # Mock Services
     use_mock_services: bool = os.getenv("USE_MOCK_SERVICES", "True").lower() == "true"
@@ -27,6 +94,9 @@ class Settings(BaseSettings):
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     
+    # Prometheus metrics at /metrics (disable to remove timer overhead, e.g. for benchmarks)
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
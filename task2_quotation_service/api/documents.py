@@ -0,0 +1,434 @@
+"""
+Printable quotation documents (HTML and PDF)
+
+Documents are rendered in a pool of worker processes so a PDF never holds
+the event loop, or the GIL of the process serving requests. Output is
+cached under a hash of exactly the fields a document shows, so the same
+quotation is rendered once per format however often it is downloaded,
+and the hash doubles as the document's ETag.
+
+PDF output needs reportlab; Arabic PDFs also need arabic-reshaper and
+python-bidi (reportlab draws glyphs in logical order without joining
+them) and a TrueType font with Arabic glyphs. HTML needs none of these:
+browsers shape Arabic themselves, so the page only declares dir="rtl".
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
+
+from jinja2 import Environment, StrictUndefined
+
+from response_cache import CachedResponse, ResponseCache
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_LEFT, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:
+    pdfmetrics = None
+
+try:
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:
+    arabic_reshaper = None
+
+# Part of every cache key; bump when the templates change
+DOCUMENT_VERSION = 1
+
+# Fields a document shows; anything else (e.g. the email draft) can change
+# without invalidating rendered documents
+DOCUMENT_FIELDS = (
+    "quotation_id", "client", "currency", "line_items", "subtotal", "tax_rate",
+    "tax_amount", "total", "delivery_terms", "notes", "created_at", "valid_until",
+)
+
+
+class DocumentFormat(str, Enum):
+    """Supported document formats"""
+    HTML = "html"
+    PDF = "pdf"
+
+
+MEDIA_TYPES = {
+    DocumentFormat.HTML: "text/html; charset=utf-8",
+    DocumentFormat.PDF: "application/pdf",
+}
+
+
+class DocumentUnavailable(Exception):
+    """The document cannot be rendered in this deployment, e.g. reportlab is not installed"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class DocumentQueueFull(Exception):
+    """Too many documents are already queued or rendering"""
+
+
+LABELS = {
+    "en": {
+        "company": "Alrouf Lighting Technology",
+        "title": "Quotation",
+        "quotation_id": "Quotation No.",
+        "date": "Date",
+        "valid_until": "Valid until",
+        "client": "Client",
+        "contact": "Contact",
+        "sku": "SKU",
+        "description": "Description",
+        "qty": "Qty",
+        "unit_price": "Unit price",
+        "line_total": "Line total",
+        "subtotal": "Subtotal",
+        "vat": "VAT",
+        "total": "Total",
+        "delivery_terms": "Delivery terms",
+        "notes": "Notes",
+    },
+    "ar": {
+        "company": "شركة الأروف للتكنولوجيا والإضاءة",
+        "title": "عرض سعر",
+        "quotation_id": "رقم العرض",
+        "date": "التاريخ",
+        "valid_until": "صالح حتى",
+        "client": "العميل",
+        "contact": "جهة الاتصال",
+        "sku": "رمز المنتج",
+        "description": "الوصف",
+        "qty": "الكمية",
+        "unit_price": "سعر الوحدة",
+        "line_total": "المجموع",
+        "subtotal": "المجموع الفرعي",
+        "vat": "ضريبة القيمة المضافة",
+        "total": "المجموع الكلي",
+        "delivery_terms": "شروط التسليم",
+        "notes": "ملاحظات",
+    },
+}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="{{ lang }}" dir="{{ 'rtl' if lang == 'ar' else 'ltr' }}">
+<head>
+<meta charset="utf-8">
+<title>{{ labels.title }} {{ q.quotation_id }}</title>
+<style>
+body { font-family: "Noto Naskh Arabic", "Segoe UI", Arial, sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; width: 100%; margin: 1em 0; }
+th, td { border: 1px solid #bbb; padding: 4px 8px; text-align: start; }
+th { background: #f0f0f0; }
+.num { text-align: end; font-variant-numeric: tabular-nums; unicode-bidi: isolate; direction: ltr; }
+.totals th { background: none; text-align: end; }
+</style>
+</head>
+<body>
+<h1>{{ labels.company }}</h1>
+<h2>{{ labels.title }}</h2>
+<p>
+{{ labels.quotation_id }}: <bdi>{{ q.quotation_id }}</bdi><br>
+{{ labels.date }}: <bdi>{{ created }}</bdi><br>
+{{ labels.valid_until }}: <bdi>{{ valid_until }}</bdi>
+</p>
+<p>
+{{ labels.client }}: {{ q.client.name }}<br>
+{{ labels.contact }}: <bdi>{{ q.client.contact }}</bdi>
+</p>
+<table>
+<thead><tr><th>{{ labels.sku }}</th><th>{{ labels.description }}</th><th>{{ labels.qty }}</th><th>{{ labels.unit_price }}</th><th>{{ labels.line_total }}</th></tr></thead>
+<tbody>
+{% for item in q.line_items %}
+<tr><td><bdi>{{ item.sku }}</bdi></td><td>{{ item.description }}</td><td class="num">{{ item.qty }}</td><td class="num">{{ money(item.unit_price) }}</td><td class="num">{{ money(item.line_total) }}</td></tr>
+{% endfor %}
+</tbody>
+<tfoot class="totals">
+<tr><th colspan="4">{{ labels.subtotal }}</th><td class="num">{{ money(q.subtotal) }} {{ currency }}</td></tr>
+<tr><th colspan="4">{{ labels.vat }} ({{ rate }}%)</th><td class="num">{{ money(q.tax_amount) }} {{ currency }}</td></tr>
+<tr><th colspan="4">{{ labels.total }}</th><td class="num"><strong>{{ money(q.total) }} {{ currency }}</strong></td></tr>
+</tfoot>
+</table>
+<p>{{ labels.delivery_terms }}: {{ q.delivery_terms }}</p>
+{% if q.notes %}<p>{{ labels.notes }}: {{ q.notes }}</p>{% endif %}
+</body>
+</html>
+"""
+
+_html_template = Environment(autoescape=True, trim_blocks=True, undefined=StrictUndefined).from_string(HTML_TEMPLATE)
+
+
+def document_content(quotation: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a stored quotation that appear in its documents"""
+    return {field: quotation.get(field) for field in DOCUMENT_FIELDS}
+
+
+def content_hash(content: Dict[str, Any], format: DocumentFormat) -> str:
+    """Hash identifying a rendered document; equal hashes render to equivalent output"""
+    encoded = json.dumps([DOCUMENT_VERSION, format.value, content], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _lang(content: Dict[str, Any]) -> str:
+    lang = getattr(content["client"]["lang"], "value", content["client"]["lang"])
+    return lang if lang in LABELS else "en"
+
+
+def _date(value: Any) -> str:
+    """Calendar date of a datetime or ISO timestamp (stores return either)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.strftime("%Y-%m-%d")
+
+
+def _currency(content: Dict[str, Any]) -> str:
+    return getattr(content["currency"], "value", content["currency"])
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def _rate(value: float) -> str:
+    return f"{value:g}"
+
+
+def render_html(content: Dict[str, Any]) -> bytes:
+    lang = _lang(content)
+    return _html_template.render(
+        q=content,
+        lang=lang,
+        labels=LABELS[lang],
+        created=_date(content["created_at"]),
+        valid_until=_date(content["valid_until"]),
+        rate=_rate(content["tax_rate"]),
+        currency=_currency(content),
+        money=_money,
+    ).encode("utf-8")
+
+
+def pdf_unavailable_reason(content: Dict[str, Any], font_path: str = "") -> Optional[str]:
+    """Why this deployment cannot render the PDF, or None if it can"""
+    if pdfmetrics is None:
+        return "PDF rendering requires the reportlab package"
+    if _lang(content) == "ar":
+        if arabic_reshaper is None:
+            return "Arabic PDFs require the arabic-reshaper and python-bidi packages"
+        if not font_path:
+            return "Arabic PDFs require DOCUMENT_FONT_PATH to point to a TrueType font with Arabic glyphs"
+    return None
+
+
+_registered_fonts: Dict[str, str] = {}
+
+
+def _font(font_path: str) -> str:
+    """reportlab name of the font at font_path, registered once per process"""
+    if not font_path:
+        return "Helvetica"
+    name = _registered_fonts.get(font_path)
+    if name is None:
+        name = f"DocumentFont{len(_registered_fonts)}"
+        pdfmetrics.registerFont(TTFont(name, font_path))
+        _registered_fonts[font_path] = name
+    return name
+
+
+def _shape(text: str) -> str:
+    """Join Arabic letters and reorder the line visually, as reportlab draws it"""
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def render_pdf(content: Dict[str, Any], font_path: str = "") -> bytes:
+    reason = pdf_unavailable_reason(content, font_path)
+    if reason:
+        raise DocumentUnavailable(reason)
+
+    lang = _lang(content)
+    labels = LABELS[lang]
+    rtl = lang == "ar"
+    text = _shape if rtl else str
+    font = _font(font_path)
+    body = ParagraphStyle("body", fontName=font, fontSize=10, leading=14, alignment=TA_RIGHT if rtl else TA_LEFT)
+    heading = ParagraphStyle("heading", parent=body, fontSize=16, leading=22)
+
+    def paragraph(value: str, style: ParagraphStyle = body) -> Paragraph:
+        return Paragraph(escape(text(value)), style)
+
+    def field(label: str, value: Any) -> Paragraph:
+        # Keep the label on the reading-order start side
+        return paragraph(f"{labels[label]}: {value}")
+
+    client = content["client"]
+    currency = _currency(content)
+    story = [
+        paragraph(labels["company"], heading),
+        paragraph(labels["title"], heading),
+        field("quotation_id", content["quotation_id"]),
+        field("date", _date(content["created_at"])),
+        field("valid_until", _date(content["valid_until"])),
+        Spacer(1, 4 * mm),
+        field("client", client["name"]),
+        field("contact", client["contact"]),
+        Spacer(1, 4 * mm),
+    ]
+
+    rows = [[text(labels[key]) for key in ("sku", "description", "qty", "unit_price", "line_total")]]
+    for item in content["line_items"]:
+        rows.append([item["sku"], text(item["description"]), str(item["qty"]), _money(item["unit_price"]), _money(item["line_total"])])
+    for label, amount in (
+        (labels["subtotal"], content["subtotal"]),
+        (f"{labels['vat']} ({_rate(content['tax_rate'])}%)", content["tax_amount"]),
+        (labels["total"], content["total"]),
+    ):
+        rows.append(["", "", "", text(label), f"{_money(amount)} {currency}"])
+    if rtl:
+        # Columns read right to left
+        rows = [list(reversed(row)) for row in rows]
+    number_columns = (0, 2) if rtl else (2, 4)
+    table = Table(rows, repeatRows=1, hAlign="RIGHT" if rtl else "LEFT")
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, -1), font),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, len(content["line_items"])), 0.5, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "RIGHT" if rtl else "LEFT"),
+        ("ALIGN", (number_columns[0], 1), (number_columns[1], -1), "RIGHT"),
+    ]))
+    story += [table, Spacer(1, 4 * mm), field("delivery_terms", content["delivery_terms"])]
+    if content.get("notes"):
+        story.append(field("notes", content["notes"]))
+
+    buffer = io.BytesIO()
+    # invariant drops the timestamp and random ID reportlab writes into
+    # every file, so equal content renders to equal bytes
+    document = SimpleDocTemplate(
+        buffer, pagesize=A4, title=f"{labels['title']} {content['quotation_id']}",
+        leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm, invariant=1,
+    )
+    document.build(story)
+    return buffer.getvalue()
+
+
+def render_document(content: Dict[str, Any], format: DocumentFormat, font_path: str = "") -> bytes:
+    """Render one document; runs in a worker process"""
+    if format == DocumentFormat.PDF:
+        return render_pdf(content, font_path)
+    return render_html(content)
+
+
+class DocumentRenderer:
+    """
+    Process pool rendering quotation documents, with a cache in front.
+
+    At most max_queue documents are queued or rendering at once; beyond
+    that render() raises DocumentQueueFull instead of letting requests pile
+    up behind the pool. Concurrent requests for the same document share one
+    render. workers=0 renders in a thread of the calling process instead,
+    for tests and single-process development.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32, cache_entries: int = 256, font_path: str = ""):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.font_path = font_path
+        self.cache = ResponseCache(max_entries=cache_entries)
+        self._executor = None
+        self._pending: Dict[str, Future] = {}
+        # Reentrant: a future that is already done runs its callback inline
+        self._lock = threading.RLock()
+
+        self.rendered = 0
+        self.shed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Documents queued or rendering"""
+        return len(self._pending)
+
+    def _submit(self, content: Dict[str, Any], format: DocumentFormat) -> Future:
+        if self._executor is None:
+            if self.workers > 0:
+                # spawn, not fork: the server process runs threads (the
+                # default executor, the catalog reloader) that fork would copy mid-lock
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="document")
+        try:
+            return self._executor.submit(render_document, content, format, self.font_path)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            return self._submit(content, format)
+
+    def etag(self, quotation: Dict[str, Any], format: DocumentFormat) -> str:
+        """The ETag the quotation's document will have, known without rendering it"""
+        return f'"{content_hash(document_content(quotation), format)[:32]}"'
+
+    async def render(self, quotation: Dict[str, Any], format: DocumentFormat) -> CachedResponse:
+        """
+        Get a quotation's document, rendering it in the pool on a cache miss
+
+        Raises:
+            DocumentUnavailable: If this deployment cannot render the format
+            DocumentQueueFull: If max_queue documents are already pending
+        """
+        content = document_content(quotation)
+        key = content_hash(content, format)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if format == DocumentFormat.PDF:
+            # Checked here so a missing dependency never costs a pool round trip
+            reason = pdf_unavailable_reason(content, self.font_path)
+            if reason:
+                raise DocumentUnavailable(reason)
+
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                if len(self._pending) >= self.max_queue:
+                    self.shed += 1
+                    raise DocumentQueueFull()
+                future = self._submit(content, format)
+                self._pending[key] = future
+                future.add_done_callback(lambda done: self._finish(key, done))
+        body = await asyncio.wrap_future(future)
+        return self.cache.get(key) or CachedResponse(body, f'"{key[:32]}"')
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, CachedResponse(future.result(), f'"{key[:32]}"'))
+            self.rendered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self.queue_depth,
+            "max_queue": self.max_queue,
+            "rendered": self.rendered,
+            "shed": self.shed,
+            "cache": self.cache.stats(),
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
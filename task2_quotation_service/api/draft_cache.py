@@ -0,0 +1,211 @@
+"""
+Content-addressed cache for generated email drafts
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join((value or "").split())
+
+
+class _SyncFlight:
+    """Result slot shared by threads waiting on the same in-flight draft"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class DraftCache:
+    """
+    LRU + TTL cache of email drafts with a byte budget.
+
+    Concurrent requests for the same key share a single in-flight call
+    (single-flight), so a burst of identical RFQs costs one LLM request.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (draft, size in bytes, expiry on the monotonic clock)
+        self._entries: "OrderedDict[str, Tuple[str, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._sync_inflight: Dict[str, _SyncFlight] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(request: Any, line_items: List[Any], total: float) -> str:
+        """Build a cache key from the normalized request content"""
+        normalized = {
+            "client": {
+                "name": _normalize_text(request.client.name),
+                "contact": request.client.contact.strip().lower(),
+                "lang": str(getattr(request.client.lang, "value", request.client.lang)),
+            },
+            "currency": str(getattr(request.currency, "value", request.currency)),
+            "items": [
+                [item.sku, item.qty, item.unit_cost, item.margin_pct, item.unit_price, item.line_total]
+                for item in line_items
+            ],
+            "total": total,
+            "delivery_terms": _normalize_text(request.delivery_terms),
+            "notes": _normalize_text(request.notes),
+        }
+        encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Return a live entry and mark it recently used; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        draft, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._bytes -= size
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return draft
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached draft, counting the hit or miss"""
+        with self._lock:
+            draft = self._lookup(key)
+            if draft is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return draft
+
+    def put(self, key: str, draft: str) -> None:
+        """Store a draft, evicting least recently used entries to stay within budget"""
+        size = len(draft.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._insert(key, draft, size, self.ttl_seconds)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """get for callers on the event loop"""
+        return self.get(key)
+
+    async def put_async(self, key: str, draft: str) -> None:
+        """put for callers on the event loop"""
+        self.put(key, draft)
+
+    def _insert(self, key: str, draft: str, size: int, ttl_seconds: float) -> None:
+        """Add an entry and evict to stay within budget; caller holds the lock"""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[1]
+        self._entries[key] = (draft, size, time.monotonic() + ttl_seconds)
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the cached draft for key, or create it once for all concurrent callers
+
+        The factory runs in its own task, so a cancelled caller does not cancel
+        the shared call the other callers are waiting on.
+        """
+        with self._lock:
+            draft = self._lookup(key)
+            if draft is not None:
+                self.hits += 1
+                return draft
+
+            task = self._inflight.get(key)
+            if task is None:
+                self.misses += 1
+                task = asyncio.ensure_future(self._fill(key, factory))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            else:
+                self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        draft = await factory()
+        await self.put_async(key, draft)
+        return draft
+
+    def get_or_create_sync(self, key: str, factory: Callable[[], str]) -> str:
+        """Thread-safe counterpart of get_or_create for synchronous callers"""
+        with self._lock:
+            draft = self._lookup(key)
+            if draft is not None:
+                self.hits += 1
+                return draft
+
+            flight = self._sync_inflight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = self._sync_inflight[key] = _SyncFlight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = factory()
+            self.put(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync_inflight.pop(key, None)
+            flight.event.set()
+
+    def clear(self) -> None:
+        """Drop every cached draft"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
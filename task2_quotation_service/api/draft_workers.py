@@ -0,0 +1,111 @@
+"""
+Background worker pool for deferred email drafts
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DraftJob = Callable[[], Awaitable[None]]
+
+
+class DraftWorkerPool:
+    """
+    Fixed pool of asyncio workers draining a bounded queue of draft jobs.
+
+    Jobs are keyed by quotation ID so callers can wait for a specific
+    draft to finish. Workers start lazily on the first submission and are
+    restarted if the pool is used from a different event loop.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._done: Dict[str, asyncio.Event] = {}
+
+    def _ensure_started(self) -> None:
+        """Start the workers on the running loop if they are not already running there"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._done = {}
+        self._tasks = [loop.create_task(self._worker(index)) for index in range(self.workers)]
+
+    def submit(self, key: str, job: DraftJob) -> bool:
+        """
+        Queue a draft job
+
+        Args:
+            key: Quotation ID the job produces a draft for
+            job: Coroutine function that produces and stores the draft
+
+        Returns:
+            False when the queue is full and the caller must draft inline
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((key, job))
+        except asyncio.QueueFull:
+            return False
+        self._done[key] = asyncio.Event()
+        return True
+
+    async def wait(self, key: str, timeout: float) -> bool:
+        """
+        Wait until the job for key has finished
+
+        Returns:
+            True if the job finished, False on timeout or if this pool does
+            not own the job (e.g. it was queued by another worker process)
+        """
+        event = self._done.get(key)
+        if event is None:
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def is_pending(self, key: str) -> bool:
+        """Whether a job for key is queued or running in this pool"""
+        event = self._done.get(key)
+        return event is not None and not event.is_set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of queued jobs not yet picked up by a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            key, job = await self._queue.get()
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Deferred draft for {key} failed: {e}")
+            finally:
+                event = self._done.pop(key, None)
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers"""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,161 @@
+"""
+Precompiled Jinja2 templates for quotation emails
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from jinja2 import Environment, StrictUndefined, Template
+
+from fx import MINOR_UNITS
+from models import Currency, Language
+from pricing import DEFAULT_VAT_RATE_PCT
+
+ENGLISH_TEMPLATE = """Subject: Quotation - {{ client_name }}
+
+Subject: Quotation - {{ client_name }}
+
+Dear {{ client_name }},
+
+Thank you for your interest in Alrouf Lighting Technology products.
+
+Please find below our quotation for your requirements:
+
+Quotation Details:
+{% for sku, description, qty, unit_price, line_total in rows %}
+
+• Product: {{ sku }} - {{ description }}
+• Quantity: {{ qty }} units
+• Unit Price: {{ unit_price }} {{ currency }}
+• Line Total: {{ line_total }} {{ currency }}
+{% endfor %}
+
+Subtotal: {{ subtotal }} {{ currency }}
+VAT ({{ vat_rate }}%): {{ vat_amount }} {{ currency }}
+Total: {{ total }} {{ currency }}
+
+Delivery Terms: {{ delivery_terms }}
+
+Notes: {{ notes or 'No additional notes' }}
+
+This quotation is valid for 30 days from the date of issue.
+
+We look forward to working with you.
+
+Best regards,
+Sales Team
+Alrouf Lighting Technology
+Phone: +966 11 123 4567
+Email: sales@alrouf.com"""
+
+ARABIC_TEMPLATE = """Subject: عرض سعر - {{ client_name }}
+
+الموضوع: عرض سعر - {{ client_name }}
+
+السيد/ة {{ client_name }} المحترم/ة،
+
+السلام عليكم ورحمة الله وبركاته،
+
+نشكركم على اهتمامكم بمنتجات شركة الأروف للتكنولوجيا والإضاءة.
+
+نرفق لكم عرض السعر المطلوب:
+
+تفاصيل العرض:
+{% for sku, description, qty, unit_price, line_total in rows %}
+
+• المنتج: {{ sku }} - {{ description }}
+• الكمية: {{ qty }} وحدة
+• السعر للوحدة: {{ unit_price }} {{ currency }}
+• المجموع: {{ line_total }} {{ currency }}
+{% endfor %}
+
+المجموع الفرعي: {{ subtotal }} {{ currency }}
+ضريبة القيمة المضافة ({{ vat_rate }}%): {{ vat_amount }} {{ currency }}
+المجموع الكلي: {{ total }} {{ currency }}
+
+شروط التسليم: {{ delivery_terms }}
+
+ملاحظات: {{ notes or 'لا توجد ملاحظات إضافية' }}
+
+هذا العرض صالح لمدة 30 يوماً من تاريخ الإصدار.
+
+نتطلع للتعاون معكم.
+
+مع أطيب التحيات،
+فريق المبيعات
+شركة الأروف للتكنولوجيا والإضاءة
+هاتف: +966 11 123 4567
+بريد إلكتروني: sales@alrouf.com"""
+
+TEMPLATE_SOURCES = {
+    Language.ENGLISH.value: ENGLISH_TEMPLATE,
+    Language.ARABIC.value: ARABIC_TEMPLATE,
+}
+
+
+class EmailTemplates:
+    """Email templates compiled once per (language, currency) pair"""
+
+    def __init__(self):
+        self.environment = Environment(
+            autoescape=False,
+            trim_blocks=True,
+            undefined=StrictUndefined,
+        )
+        self.templates: Dict[Tuple[str, str], Template] = {
+            (lang, currency.value): self.environment.from_string(source, globals={"currency": currency.value})
+            for lang, source in TEMPLATE_SOURCES.items()
+            for currency in Currency
+        }
+
+    def render(
+        self,
+        request: Any,
+        line_items: List[Any],
+        total: float,
+        lang: Optional[str] = None,
+        vat_rate: float = DEFAULT_VAT_RATE_PCT,
+    ) -> str:
+        """
+        Render the quotation email for the request's language and currency in a single pass
+
+        Args:
+            request: QuotationRequest being answered
+            line_items: Priced line items
+            total: Quotation total including VAT
+            lang: Language override, defaults to the client's preferred language
+            vat_rate: VAT percentage shown next to the VAT amount
+
+        Returns:
+            Email text starting with a Subject line
+        """
+        lang = lang or getattr(request.client.lang, "value", request.client.lang)
+        currency = getattr(request.currency, "value", request.currency)
+        template = self.templates.get((lang, currency))
+        if template is None:
+            template = self.templates[(Language.ENGLISH.value, currency)]
+
+        # Unpacked tuples keep attribute lookups out of the template loop
+        rows = [
+            (item.sku, item.description, item.qty, item.unit_price, item.line_total)
+            for item in line_items
+        ]
+        # Line totals are exact to the minor unit; rounding drops float summation error
+        decimals = MINOR_UNITS.get(currency, 2)
+        subtotal = round(sum(row[4] for row in rows), decimals)
+        return template.render(
+            client_name=request.client.name,
+            rows=rows,
+            subtotal=subtotal,
+            vat_rate=f"{vat_rate:g}",
+            vat_amount=round(total - subtotal, decimals),
+            total=total,
+            delivery_terms=request.delivery_terms,
+            notes=request.notes,
+        )
+
+
+@lru_cache()
+def get_email_templates() -> EmailTemplates:
+    """Get the shared compiled templates"""
+    return EmailTemplates()
@@ -0,0 +1,108 @@
+"""
+Streaming NDJSON and CSV export of stored quotations
+
+Records are read from the store in primary-key batches and encoded one
+batch per chunk, so an export holds at most one batch in memory whatever
+the size of the store.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import ClientInfo, QuotationResponse
+from serialization import dumps_json
+
+
+class ExportFormat(str, Enum):
+    """Supported export formats"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+# Every top-level quotation field, plus client.<field> for the nested client
+EXPORT_FIELDS = tuple(QuotationResponse.__fields__) + tuple(f"client.{name}" for name in ClientInfo.__fields__)
+
+# CSV has no nesting, so by default it leaves out line items and the draft
+CSV_DEFAULT_FIELDS = (
+    "quotation_id", "created_at", "client.name", "client.contact", "currency",
+    "subtotal", "tax_rate", "tax_amount", "total", "draft_status", "valid_until",
+)
+
+Column = Tuple[str, Callable[[Dict[str, Any]], Any]]
+
+
+def _getter(field: str) -> Callable[[Dict[str, Any]], Any]:
+    if "." in field:
+        parent, child = field.split(".", 1)
+        return lambda record: (record.get(parent) or {}).get(child)
+    return lambda record: record.get(field)
+
+
+def export_columns(format: ExportFormat, fields: Optional[List[str]] = None) -> Optional[List[Column]]:
+    """
+    Resolve the requested fields to (name, getter) columns
+
+    Returns None for a full-record NDJSON export, which needs no projection.
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not fields:
+        if format == ExportFormat.NDJSON:
+            return None
+        fields = list(CSV_DEFAULT_FIELDS)
+    unknown = [field for field in fields if field not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+    return [(field, _getter(field)) for field in dict.fromkeys(fields)]
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return dumps_json(value).decode("utf-8")
+    return value
+
+
+def encode_export(
+    batches: Iterable[List[Dict[str, Any]]],
+    format: ExportFormat,
+    columns: Optional[List[Column]],
+) -> Iterator[bytes]:
+    """
+    Encode batches of quotation records, yielding one chunk per batch
+
+    NDJSON rows are objects keyed by field name (dotted names stay flat);
+    CSV starts with a header row of the field names.
+    """
+    if format == ExportFormat.NDJSON:
+        for batch in batches:
+            if columns is not None:
+                batch = [{name: get(record) for name, get in columns} for record in batch]
+            yield b"".join(dumps_json(record) + b"\n" for record in batch)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for name, _ in columns])
+    for batch in batches:
+        writer.writerows([_csv_value(get(record)) for _, get in columns] for record in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header only: the export matched nothing
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,193 @@
+"""
+Currency conversion from a versioned, hot-reloaded FX rate table
+"""
+
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from hot_reload import SnapshotReloader
+from pricing import mul_div, to_units
+
+# ISO 4217 minor units; a rate file may override them with "decimals"
+MINOR_UNITS = {"SAR": 2, "USD": 2, "EUR": 2, "AED": 2}
+
+# Rates are stored as integers in millionths of the base currency
+RATE_DECIMALS = 6
+RATE_SCALE = 10 ** RATE_DECIMALS
+
+Codes = Union[str, Sequence[str], np.ndarray]
+
+
+def _parse_rate(code: str, value: Any) -> int:
+    """Exact rate in millionths, from a decimal string or JSON number"""
+    try:
+        rate = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"FX rate for {code} is not a number: {value!r}")
+    if not rate.is_finite() or rate <= 0:
+        raise ValueError(f"FX rate for {code} must be positive: {value!r}")
+    scaled = rate * RATE_SCALE
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"FX rate for {code} has more than {RATE_DECIMALS} decimals: {value!r}")
+    return int(scaled)
+
+
+class RateSnapshot:
+    """
+    One loaded, immutable version of the FX rate table.
+
+    Each rate is the value of one unit of a currency in the base currency,
+    held as an exact integer number of millionths. Conversions never touch
+    binary floats between the source and target minor units, and every
+    result is rounded half up to the target currency's minor unit.
+    """
+
+    __slots__ = ("version", "base", "as_of", "codes", "_rates", "_decimals", "_index")
+
+    def __init__(self, rates: Dict[str, int], decimals: Dict[str, int], base: str, version: str, as_of: Optional[str] = None):
+        self.version = version
+        self.base = base
+        self.as_of = as_of
+        self.codes: Tuple[str, ...] = tuple(sorted(rates))
+        self._index = {code: position for position, code in enumerate(self.codes)}
+        self._rates = np.array([rates[code] for code in self.codes], dtype=np.int64)
+        self._decimals = np.array([decimals[code] for code in self.codes], dtype=np.int64)
+        self._rates.flags.writeable = False
+        self._decimals.flags.writeable = False
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def rate(self, source: str, target: str) -> Decimal:
+        """Units of target per unit of source, e.g. ``rate("USD", "SAR") == Decimal("3.75")``"""
+        source_rate, target_rate = self._rates[self._indexes(source)], self._rates[self._indexes(target)]
+        return Decimal(int(source_rate)) / Decimal(int(target_rate))
+
+    def decimals(self, code: str) -> int:
+        """Minor-unit exponent of a currency; ISO 4217's for currencies without a rate"""
+        if code not in self._index:
+            return MINOR_UNITS.get(code, 2)
+        return int(self._decimals[self._index[code]])
+
+    def _indexes(self, codes: Codes) -> Union[int, np.ndarray]:
+        if isinstance(codes, str):
+            if codes not in self._index:
+                raise ValueError(f"No FX rate for {codes}")
+            return self._index[codes]
+        codes = np.asarray(codes, dtype=str)
+        positions = np.searchsorted(self.codes, codes)
+        known = positions < len(self.codes)
+        known[known] = np.asarray(self.codes)[positions[known]] == codes[known]
+        if not known.all():
+            raise ValueError(f"No FX rate for {codes[~known][0]}")
+        return positions
+
+    def to_minor(self, amounts: Sequence[float], codes: Codes) -> np.ndarray:
+        """
+        Round amounts half up to whole minor units of their currency
+
+        Rounded like pricing.to_units, so 1.005 counts as written.
+        """
+        return to_units(amounts, self._decimals[self._indexes(codes)])
+
+    def convert_minor(self, minor: Sequence[int], sources: Codes, targets: Codes) -> np.ndarray:
+        """
+        Convert whole minor units between currencies in one vectorized pass
+
+        Args:
+            minor: Amounts in minor units of their source currency
+            sources: Source currency code, or one code per amount
+            targets: Target currency code, or one code per amount
+
+        Returns:
+            int64 array of amounts in minor units of the target currency
+        """
+        return self._convert_minor(np.asarray(minor, dtype=np.int64), self._indexes(sources), self._indexes(targets))
+
+    def convert(self, amounts: Sequence[float], sources: Codes, targets: Codes) -> np.ndarray:
+        """
+        Convert amounts between currencies in one vectorized pass
+
+        Amounts are rounded to the source currency's minor unit, converted
+        exactly and rounded half up to the target's minor unit. Amounts
+        whose source and target currency are the same are returned unchanged.
+
+        Returns:
+            float64 array of converted amounts
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        source, target = self._indexes(sources), self._indexes(targets)
+        converted = self._convert_minor(to_units(amounts, self._decimals[source]), source, target)
+        return np.where(source == target, amounts, converted / 10.0 ** self._decimals[target])
+
+    def _convert_minor(self, minor: np.ndarray, source: Union[int, np.ndarray], target: Union[int, np.ndarray]) -> np.ndarray:
+        source_decimals, target_decimals = self._decimals[source], self._decimals[target]
+        # Scale up before dividing so no precision is lost to a fractional exponent
+        numerator_scale = self._rates[source] * 10 ** np.maximum(target_decimals - source_decimals, 0)
+        denominator = self._rates[target] * 10 ** np.maximum(source_decimals - target_decimals, 0)
+        return mul_div(minor, numerator_scale, denominator)
+
+
+def load_rates(path: str) -> RateSnapshot:
+    """
+    Load an FX rate file into a snapshot
+
+    The file is a JSON object::
+
+        {"version": "2024-06-01", "base": "SAR",
+         "rates": {"SAR": "1", "USD": "3.75", ...},
+         "decimals": {"SAR": 2, ...}}
+
+    ``rates`` gives the value of one unit of each currency in ``base``,
+    preferably as decimal strings with at most 6 decimals. ``decimals`` is
+    optional and defaults to MINOR_UNITS. The snapshot version is the
+    file's ``version`` followed by a hash of its content, so an edited
+    file never reuses a version.
+
+    Raises:
+        ValueError: If a rate or minor unit is invalid
+        OSError: If the file cannot be read
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    document = json.loads(data.decode("utf-8"))
+
+    base = str(document.get("base", "SAR"))
+    rates = {str(code): _parse_rate(code, value) for code, value in document["rates"].items()}
+    if rates.get(base) != RATE_SCALE:
+        raise ValueError(f"FX rate table must rate its base currency {base} at 1")
+
+    decimals = {}
+    for code in rates:
+        exponent = document.get("decimals", {}).get(code, MINOR_UNITS.get(code))
+        if not isinstance(exponent, int) or not 0 <= exponent <= 4:
+            raise ValueError(f"FX rate table has no valid minor unit for {code}: {exponent!r}")
+        decimals[code] = exponent
+
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    version = f"{document['version']}-{digest}" if document.get("version") else digest
+    return RateSnapshot(rates, decimals, base=base, version=version, as_of=document.get("as_of"))
+
+
+class FxRateTable(SnapshotReloader[RateSnapshot]):
+    """
+    Hot-reloading FX rate table.
+
+    Reloads like ProductCatalog (see SnapshotReloader): a changed file is
+    loaded on a background thread and swapped in with one reference
+    assignment. Readers take no lock; a failed reload keeps serving the
+    previous snapshot. Hold on to one snapshot for a whole pricing pass.
+    """
+
+    kind = "FX rates"
+    load_errors = (OSError, ValueError, KeyError, AttributeError)
+
+    def _parse(self, path: str) -> RateSnapshot:
+        return load_rates(path)
+
+    def _describe(self, snapshot: RateSnapshot) -> str:
+        return f"FX rates for {len(snapshot.codes)} currencies"
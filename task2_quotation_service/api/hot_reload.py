@@ -0,0 +1,117 @@
+"""
+Hot reload of immutable snapshots loaded from a file
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Generic, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+S = TypeVar("S")
+
+
+class SnapshotReloader(Generic[S]):
+    """
+    File-backed snapshot that reloads itself when the file changes.
+
+    At most once per ``reload_interval`` seconds, reading ``snapshot``
+    stats the source file (and its WAL for SQLite). When it has changed, a
+    background thread loads the new file and swaps the snapshot reference
+    in one assignment. Readers take no lock and never wait for a reload,
+    and a failed reload keeps serving the previous snapshot.
+
+    Subclasses supply the parse step: ``_parse`` and the exceptions it
+    raises for a bad file. Snapshots must have a ``version``.
+    """
+
+    # What the file holds, for log messages
+    kind = "snapshot"
+    # Errors from _parse that mean a bad file rather than a bug
+    load_errors: Tuple[Type[BaseException], ...] = (OSError, ValueError, KeyError)
+
+    def __init__(self, path: str, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._next_check = time.monotonic() + reload_interval
+        self._failed_signature: Optional[Tuple] = None
+
+        self._signature = self._stat()
+        self._snapshot: S = self._parse(path)
+        logger.info(f"Loaded {self._describe(self._snapshot)} from {path} (version {self._snapshot.version})")
+
+    def _parse(self, path: str) -> S:
+        raise NotImplementedError
+
+    def _describe(self, snapshot: S) -> str:
+        """Short summary of a snapshot's content for log messages"""
+        return self.kind
+
+    @property
+    def snapshot(self) -> S:
+        """Current snapshot; hold on to it for the duration of a request"""
+        self._maybe_reload()
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        """Version of the current snapshot"""
+        return self.snapshot.version
+
+    def _stat(self) -> Tuple:
+        """Cheap change signature of the source file (and its WAL for SQLite)"""
+        signature = []
+        for path in (self.path, self.path + "-wal"):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _maybe_reload(self) -> None:
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+
+        signature = self._stat()
+        if signature in (self._signature, self._failed_signature):
+            return
+        if self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload_in_background, args=(signature,), daemon=True).start()
+
+    def _reload_in_background(self, signature: Tuple) -> None:
+        try:
+            self._load(signature)
+        finally:
+            self._reload_lock.release()
+
+    def _load(self, signature: Tuple) -> bool:
+        try:
+            snapshot = self._parse(self.path)
+        except self.load_errors as e:
+            self._failed_signature = signature
+            logger.error(f"Failed to reload {self.kind} from {self.path}, keeping version {self._snapshot.version}: {e}")
+            return False
+
+        self._snapshot = snapshot
+        self._signature = signature
+        self._failed_signature = None
+        logger.info(f"Reloaded {self._describe(snapshot)} from {self.path} (version {snapshot.version})")
+        return True
+
+    def reload(self) -> bool:
+        """
+        Reload the file now, in the calling thread
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        with self._reload_lock:
+            return self._load(self._stat())
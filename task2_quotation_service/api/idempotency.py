@@ -0,0 +1,109 @@
+"""
+Idempotency keys for quotation requests
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different request body"""
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL table of idempotency key -> completed result.
+
+    The first request with a key runs; retries with the same key get the
+    stored result back. A retry that arrives while the first request is
+    still running waits for it instead of generating a second quotation.
+    Failed requests are not stored, so the client can retry them.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (request fingerprint, result, expiry on the monotonic clock)
+        self._entries: "OrderedDict[str, Tuple[str, Any, float]]" = OrderedDict()
+        # key -> (request fingerprint, task producing the result)
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+
+        self.replays = 0
+
+    @staticmethod
+    def fingerprint(body: Any, **options: Any) -> str:
+        """Hash of a request body and any options that change its result"""
+        encoded = json.dumps([body, options], sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Any:
+        """Return a live (fingerprint, result) entry; caller holds the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    async def run(self, key: str, fingerprint: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run factory once per idempotency key
+
+        Args:
+            key: Client-supplied Idempotency-Key
+            fingerprint: Request fingerprint; a key may only be reused for the same request
+            factory: Coroutine function producing the result
+
+        Returns:
+            The result and whether it was replayed from an earlier request
+
+        Raises:
+            IdempotencyConflict: If the key was used for a different request
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                if entry[0] != fingerprint:
+                    raise IdempotencyConflict(key)
+                self.replays += 1
+                return entry[1], True
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                if inflight[0] != fingerprint:
+                    raise IdempotencyConflict(key)
+                self.replays += 1
+                task, replayed = inflight[1], True
+            else:
+                task, replayed = asyncio.ensure_future(self._fill(key, fingerprint, factory)), False
+                self._inflight[key] = (fingerprint, task)
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shielded so a client disconnect does not cancel the request others wait on
+        result, filled_by_other = await asyncio.shield(task)
+        return result, replayed or filled_by_other
+
+    async def _fill(self, key: str, fingerprint: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Produce the result for key, and whether it was replayed from another process"""
+        result = await factory()
+        self._remember(key, fingerprint, result)
+        return result, False
+
+    def _remember(self, key: str, fingerprint: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (fingerprint, result, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of stored keys and replays"""
+        return {"entries": len(self._entries), "inflight": len(self._inflight), "replays": self.replays}
@@ -0,0 +1,229 @@
+"""
+Admission control and circuit breaking for OpenAI calls
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional
+
+
+class LLMUnavailable(Exception):
+    """The OpenAI call was not attempted; callers fall back to the template"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a sliding failure window.
+
+    failure_threshold failures within window_seconds open the breaker and
+    every call is rejected for cooldown_seconds. After the cooldown one
+    probe call is let through: success closes the breaker, failure opens
+    it for another cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, window_seconds: float = 30.0, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+
+        self._state = self.CLOSED
+        self._failures: Deque[float] = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; a True in the half-open state claims the single probe"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            # Successes do not clear the window while closed, so a steady
+            # error rate still trips the breaker; only a probe closes it
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures.clear()
+                self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._failures.append(now)
+            while self._failures and self._failures[0] <= now - self.window_seconds:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    def release(self) -> None:
+        """Give back a probe whose call ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._failures.clear()
+        self._probing = False
+        self.trips += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = len(self._failures)
+        return {"state": self.state, "recent_failures": recent, "trips": self.trips, "rejected": self.rejected}
+
+
+class LLMGuard:
+    """
+    Concurrency limit, bounded wait queue and circuit breaker for OpenAI calls.
+
+    At most max_concurrency calls run at once; up to max_queue more wait
+    for a slot. Calls beyond that, and every call while the breaker is
+    open, raise LLMUnavailable immediately instead of piling up behind a
+    slow or failing API. Exceptions raised inside a slot count as failures
+    for the breaker.
+    """
+
+    def __init__(self, max_concurrency: int = 16, max_queue: int = 64, breaker: Optional[CircuitBreaker] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.breaker = breaker or CircuitBreaker()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # The sync OpenAI client runs on worker threads
+        self._thread_semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+
+        self.shed = 0
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        """Semaphore bound to the running loop, recreated if the guard moves to another loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _admit(self) -> None:
+        """Reject the call when the queue is full or the breaker is open; caller holds the lock"""
+        if self._in_flight >= self.max_concurrency and self._waiting >= self.max_queue:
+            self.shed += 1
+            raise LLMUnavailable("overloaded")
+        if not self.breaker.allow():
+            raise LLMUnavailable("circuit_open")
+        self._waiting += 1
+
+    def _settle(self, error: Optional[BaseException]) -> None:
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, Exception):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one OpenAI call slot on the event loop"""
+        semaphore = self._async_semaphore()
+        with self._lock:
+            self._admit()
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        except BaseException as e:
+            self._settle(e)
+            raise
+        else:
+            self._settle(None)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            semaphore.release()
+
+    @contextmanager
+    def slot_sync(self) -> Iterator[None]:
+        """Hold one OpenAI call slot on a worker thread"""
+        with self._lock:
+            self._admit()
+        try:
+            self._thread_semaphore.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        except BaseException as e:
+            self._settle(e)
+            raise
+        else:
+            self._settle(None)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._thread_semaphore.release()
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a slot"""
+        return self._waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+            "breaker": self.breaker.stats(),
+        }
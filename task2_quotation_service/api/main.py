@@ -3,11 +3,14 @@ Task 2: Quotation Microservice
 FastAPI-based quotation service with OpenAI integration
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
+import json
 import logging
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
 
@@ -16,10 +19,21 @@ from models import (
     QuotationResponse, 
     ClientInfo, 
     QuotationItem,
+    Currency,
+    BatchQuotationRequest,
+    BatchQuotationResult,
+    BatchQuotationResponse,
+    DraftResponse,
     ErrorResponse
 )
 from quotation_service import QuotationService
 from config import get_settings
+from response_cache import CachedResponse, etag_matches
+from serialization import MsgPackResponse, accepts_msgpack, negotiated_response
+from idempotency import IdempotencyConflict
+from metrics import REQUEST_STARTED, MetricsMiddleware
+from export import MEDIA_TYPES, ExportFormat
+from documents import DocumentFormat, DocumentQueueFull, DocumentUnavailable, MEDIA_TYPES as DOCUMENT_MEDIA_TYPES
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -46,6 +60,20 @@ app.add_middleware(
 # Initialize quotation service
 quotation_service = QuotationService()
 
+# Per-handler latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware, metrics=lambda: quotation_service.metrics)
+
+def _observe_validation():
+    """Record the time from request arrival to the handler: body parsing and model validation"""
+    started = REQUEST_STARTED.get()
+    if started is not None:
+        quotation_service.metrics.observe_stage("validation", time.perf_counter() - started)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled OpenAI connections"""
+    await quotation_service.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -58,23 +86,61 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    health = {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "service": "quotation-service"
     }
+    snapshot = quotation_service.catalog.snapshot
+    health["catalog"] = {"version": snapshot.version, "products": len(snapshot)}
+    rates = quotation_service.fx_rates.snapshot
+    health["fx_rates"] = {"version": rates.version, "base": rates.base, "currencies": list(rates.codes)}
+    health["response_cache"] = quotation_service.quotation_responses.stats()
+    health["idempotency"] = quotation_service.idempotency.stats()
+    health["shared_state"] = quotation_service.settings.shared_state_path or None
+    health["openai"] = quotation_service.llm_guard.stats()
+    health["draft_queue_depth"] = quotation_service.draft_workers.queue_depth
+    health["documents"] = quotation_service.documents.stats()
+    if quotation_service.draft_cache is not None:
+        health["draft_cache"] = quotation_service.draft_cache.stats()
+    return health
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    if not quotation_service.metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(
+        content=quotation_service.metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 @app.post("/quote", response_model=QuotationResponse)
-async def generate_quotation(request: QuotationRequest):
+async def generate_quotation(
+    request: QuotationRequest,
+    defer_draft: bool = False,
+    accept: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    x_latency_budget_ms: Optional[int] = Header(None, ge=0)
+):
     """
     Generate quotation based on client request
     
     Args:
         request: QuotationRequest with client info, items, and terms
+        defer_draft: Return the priced quotation immediately and draft the
+            email in the background; fetch it from GET /quote/{id}/draft
+        accept: Send application/msgpack to receive MessagePack instead of JSON
+        idempotency_key: Retries with the same key return the original
+            quotation instead of creating a new one
+        x_latency_budget_ms: Milliseconds to wait for the LLM draft; after
+            that the template draft is returned as "provisional" and replaced
+            in the background (0 waits as long as the OpenAI timeout allows)
         
     Returns:
         QuotationResponse with pricing details and email draft
     """
+    _observe_validation()
     try:
         logger.info(f"Generating quotation for client: {request.client.name}")
         
@@ -82,12 +148,32 @@ async def generate_quotation(request: QuotationRequest):
         if not request.items:
             raise HTTPException(status_code=400, detail="No items provided")
         
-        # Generate quotation
-        result = quotation_service.generate_quotation(request)
+        # Generate quotation without blocking the event loop on the email draft
+        async def generate():
+            if defer_draft:
+                return await quotation_service.generate_quotation_deferred(request)
+            latency_budget = None if x_latency_budget_ms is None else x_latency_budget_ms / 1000
+            return await quotation_service.generate_quotation_async(request, latency_budget=latency_budget)
+        
+        headers = None
+        if idempotency_key:
+            fingerprint = quotation_service.idempotency.fingerprint(request.dict(), defer_draft=defer_draft)
+            result, replayed = await quotation_service.idempotency.run(idempotency_key, fingerprint, generate)
+            headers = {"Idempotent-Replayed": "true" if replayed else "false"}
+        else:
+            result = await generate()
         
         logger.info(f"Quotation generated successfully for {request.client.name}")
-        return result
+        with quotation_service.metrics.time("serialization"):
+            return negotiated_response(result, accept, headers=headers)
         
+    except HTTPException:
+        raise
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request"
+        )
     except ValueError as e:
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -95,53 +181,330 @@ async def generate_quotation(request: QuotationRequest):
         logger.error(f"Error generating quotation: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/quote/stream")
+async def stream_quotation(request: QuotationRequest):
+    """
+    Generate quotation and stream it as server-sent events
+    
+    The priced quotation is sent first as a "quotation" event, followed by
+    "token" events carrying email draft fragments as OpenAI produces them,
+    and a final "done" event with the complete draft.
+    
+    Args:
+        request: QuotationRequest with client info, items, and terms
+        
+    Returns:
+        text/event-stream response
+    """
+    events = quotation_service.stream_quotation(request)
+    try:
+        # Price before committing to a 200 so pricing errors still return 400
+        first = await events.__anext__()
+    except ValueError as e:
+        logger.error(f"Validation error: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def event_stream():
+        yield _format_sse(*first)
+        try:
+            async for event, data in events:
+                yield _format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Error streaming quotation: {e}")
+            yield _format_sse("error", {"detail": "Internal server error"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _format_sse(event: str, data: Dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/quotes/batch", response_model=BatchQuotationResponse)
+async def generate_quotation_batch(batch: BatchQuotationRequest):
+    """
+    Generate many quotations in one call
+    
+    Each request is validated and priced independently, so one bad request
+    does not fail the rest of the batch.
+    
+    Args:
+        batch: BatchQuotationRequest with the quotation requests
+        
+    Returns:
+        BatchQuotationResponse with a result or error per request
+    """
+    settings = get_settings()
+    if len(batch.requests) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds maximum size of {settings.batch_max_size} requests"
+        )
+    
+    try:
+        results: List[Optional[BatchQuotationResult]] = [None] * len(batch.requests)
+        valid_indexes = []
+        valid_requests = []
+        
+        for index, payload in enumerate(batch.requests):
+            try:
+                valid_requests.append(QuotationRequest.parse_obj(payload))
+                valid_indexes.append(index)
+            except ValidationError as e:
+                results[index] = BatchQuotationResult(index=index, status="error", error=str(e))
+        
+        logger.info(f"Generating batch of {len(valid_requests)} quotations")
+        generated = await quotation_service.generate_quotation_batch(valid_requests)
+        
+        for index, outcome in zip(valid_indexes, generated):
+            if isinstance(outcome, Exception):
+                results[index] = BatchQuotationResult(index=index, status="error", error=str(outcome))
+            else:
+                results[index] = BatchQuotationResult(index=index, status="ok", quotation=outcome)
+        
+        succeeded = sum(1 for result in results if result.status == "ok")
+        return BatchQuotationResponse(
+            results=results,
+            succeeded=succeeded,
+            failed=len(results) - succeeded
+        )
+        
+    except Exception as e:
+        logger.error(f"Error generating quotation batch: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/quote/{quotation_id}")
-async def get_quotation(quotation_id: str):
+async def get_quotation(
+    quotation_id: str,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None)
+):
     """
     Get quotation by ID
     
     Args:
         quotation_id: Unique quotation identifier
+        if_none_match: ETag from a previous response; answered with 304 if unchanged
+        accept: Send application/msgpack to receive MessagePack instead of JSON
         
     Returns:
         Quotation details
     """
     try:
-        quotation = quotation_service.get_quotation(quotation_id)
-        if not quotation:
+        if accepts_msgpack(accept):
+            quotation = await quotation_service.offload(quotation_service.get_quotation, quotation_id)
+            if not quotation:
+                raise HTTPException(status_code=404, detail="Quotation not found")
+            return MsgPackResponse(quotation, headers={"Vary": "Accept"})
+        
+        cached = await quotation_service.offload(quotation_service.get_quotation_response, quotation_id)
+        if cached is None:
             raise HTTPException(status_code=404, detail="Quotation not found")
         
-        return quotation
+        return _cached_json_response(cached, if_none_match)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting quotation: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _cached_json_response(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """Serve pre-serialized JSON, or 304 when the client already has this version"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@app.get("/quote/{quotation_id}/document")
+async def get_quotation_document(
+    quotation_id: str,
+    format: DocumentFormat = DocumentFormat.PDF,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Get a printable quotation as PDF or HTML
+    
+    Documents are rendered in a process pool and cached by content, so
+    repeated downloads are served from memory. The ETag is known before
+    rendering, so a matching If-None-Match never renders at all.
+    
+    Args:
+        quotation_id: Unique quotation identifier
+        format: pdf (default) or html
+        if_none_match: ETag from a previous response; answered with 304 if unchanged
+        
+    Returns:
+        The rendered document
+    """
+    quotation = await quotation_service.offload(quotation_service.get_quotation, quotation_id)
+    if not quotation:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    
+    headers = {
+        "ETag": quotation_service.documents.etag(quotation, format),
+        "Content-Disposition": f'inline; filename="{quotation_id}.{format.value}"'
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        with quotation_service.metrics.time("rendering"):
+            document = await quotation_service.documents.render(quotation, format)
+    except DocumentQueueFull:
+        raise HTTPException(status_code=503, detail="Document renderer is busy", headers={"Retry-After": "1"})
+    except DocumentUnavailable as e:
+        raise HTTPException(status_code=501, detail=e.reason)
+    except Exception as e:
+        logger.error(f"Error rendering quotation document: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    return Response(content=document.body, media_type=DOCUMENT_MEDIA_TYPES[format], headers=headers)
+
+@app.get("/quote/{quotation_id}/draft", response_model=DraftResponse)
+async def get_quotation_draft(quotation_id: str, wait: float = Query(0, ge=0)):
+    """
+    Get the email draft of a quotation
+    
+    Args:
+        quotation_id: Unique quotation identifier
+        wait: Seconds to long-poll for a pending or provisional draft (capped by DRAFT_MAX_WAIT_SECONDS)
+        
+    Returns:
+        Draft status and, once ready, the email draft
+    """
+    try:
+        draft = await quotation_service.get_draft(quotation_id, wait=wait)
+        if not draft:
+            raise HTTPException(status_code=404, detail="Quotation not found")
+        
+        return draft
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting quotation draft: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/quotes")
-async def list_quotations(limit: int = 100, offset: int = 0):
+async def list_quotations(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    accept: Optional[str] = Header(None)
+):
     """
     List quotations with pagination
     
+    Pages are ordered by creation time. Pass the returned next_cursor as
+    cursor to fetch the following page; every page costs the same however
+    deep it is. offset is still accepted for older clients but costs O(offset).
+    
     Args:
         limit: Maximum number of quotations to return
-        offset: Number of quotations to skip
+        offset: Number of quotations to skip (ignored when cursor is given)
+        cursor: Opaque cursor from a previous page's next_cursor
+        accept: Send application/msgpack to receive MessagePack instead of JSON
         
     Returns:
-        List of quotations
+        List of quotations, total stored count and the next cursor
     """
     try:
-        quotations = quotation_service.list_quotations(limit, offset)
-        return {
+        if offset and not cursor:
+            quotations = await quotation_service.offload(quotation_service.list_quotations, limit, offset)
+            next_cursor = None
+        else:
+            quotations, next_cursor = await quotation_service.offload(quotation_service.list_quotations_page, limit, cursor)
+        return negotiated_response({
             "quotations": quotations,
-            "total": len(quotations),
+            "total": await quotation_service.offload(quotation_service.count_quotations),
             "limit": limit,
-            "offset": offset
-        }
+            "offset": offset,
+            "next_cursor": next_cursor
+        }, accept)
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error listing quotations: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/quotes/search")
+async def search_quotations(
+    client: Optional[str] = Query(None, description="Client contact email"),
+    sku: Optional[str] = Query(None, description="Quotations containing this SKU"),
+    currency: Optional[Currency] = None,
+    created_from: Optional[datetime] = Query(None, description="Created at or after (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Created before (exclusive)"),
+    min_total: Optional[float] = Query(None, ge=0),
+    max_total: Optional[float] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Search quotations by client, SKU, creation date and total amount
+    
+    Every filter is answered from a secondary index and the results are
+    intersected, so no search scans the whole store.
+    
+    Returns:
+        Matching quotations ordered by creation time
+    """
+    try:
+        quotations = await quotation_service.offload(
+            quotation_service.search_quotations,
+            client_contact=client,
+            sku=sku,
+            currency=currency.value if currency else None,
+            created_from=created_from,
+            created_to=created_to,
+            min_total=min_total,
+            max_total=max_total,
+            limit=limit
+        )
+        return {"quotations": quotations, "count": len(quotations), "limit": limit}
+        
+    except Exception as e:
+        logger.error(f"Error searching quotations: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/quotes/export")
+async def export_quotations(
+    format: ExportFormat = ExportFormat.NDJSON,
+    fields: Optional[str] = Query(None, description="Comma-separated fields, e.g. quotation_id,client.contact,total"),
+    created_from: Optional[datetime] = Query(None, description="Created at or after (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Created before (exclusive)")
+):
+    """
+    Stream every matching quotation as NDJSON or CSV
+    
+    Records are read from the store in batches and sent with chunked
+    transfer encoding as they are encoded, so memory stays flat however
+    many quotations are exported.
+    
+    Returns:
+        application/x-ndjson or text/csv response
+    """
+    try:
+        chunks = quotation_service.export_quotations(
+            format,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+            created_from=created_from,
+            created_to=created_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # A sync iterator: Starlette pulls each chunk in the threadpool, so store
+    # reads never block the event loop
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="quotations.{format.value}"'}
+    )
+
 @app.delete("/quote/{quotation_id}")
 async def delete_quotation(quotation_id: str):
     """
@@ -154,28 +517,48 @@ async def delete_quotation(quotation_id: str):
         Success message
     """
     try:
-        success = quotation_service.delete_quotation(quotation_id)
+        success = await quotation_service.offload(quotation_service.delete_quotation, quotation_id)
         if not success:
             raise HTTPException(status_code=404, detail="Quotation not found")
         
         return {"message": "Quotation deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error deleting quotation: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/products")
-async def list_products():
+async def list_products(
+    category: Optional[str] = Query(None, description="Product category, case-insensitive"),
+    spec: Optional[List[str]] = Query(None, description="Specification filter as key:value, e.g. wattage:90W"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     List available products with base pricing
     
+    Args:
+        category: Only products in this category
+        spec: Only products matching every key:value specification
+        if_none_match: ETag from a previous response; answered with 304 if unchanged
+    
     Returns:
         List of products
     """
     try:
-        products = quotation_service.get_products()
-        return {"products": products}
+        specs = {}
+        for item in spec or []:
+            key, separator, value = item.partition(":")
+            if not separator or not key:
+                raise HTTPException(status_code=400, detail=f"Invalid spec filter {item!r}, expected key:value")
+            specs[key] = value
+        
+        cached = quotation_service.get_products_response(category=category, specs=specs)
+        return _cached_json_response(cached, if_none_match)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing products: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,264 @@
+"""
+In-process metrics exported in the Prometheus text format
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans a cached template draft up to a slow OpenAI call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# perf_counter() when the current HTTP request arrived, set by MetricsMiddleware
+REQUEST_STARTED: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+
+Collector = Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, labels)), value) for labels, value in items]
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, *labels: str) -> None:
+        self.inc(-amount, *labels)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        samples = []
+        for labels, counts, total in items:
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((self.name + "_bucket", {**base, "le": _format_value(float(bound))}, cumulative))
+            samples.append((self.name + "_sum", base, total))
+            samples.append((self.name + "_count", base, cumulative))
+        return samples
+
+
+class _Timer:
+    __slots__ = ("histogram", "in_flight", "stage", "started")
+
+    def __init__(self, histogram: Histogram, in_flight: Gauge, stage: str):
+        self.histogram = histogram
+        self.in_flight = in_flight
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.in_flight.inc(1, self.stage)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, self.stage)
+        self.in_flight.dec(1, self.stage)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Metrics of one QuotationService.
+
+    With enabled=False every timer is a shared no-op context manager and
+    counters are not touched, so instrumented code costs one attribute
+    lookup and a method call per stage.
+    """
+
+    def __init__(self, enabled: bool = True, prefix: str = "quotation"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._metrics: List[Any] = []
+        self._collectors: List[Collector] = []
+
+        self.stage_seconds = self.histogram("stage_duration_seconds", "Time spent per request stage", ("stage",))
+        self.stages_in_flight = self.gauge("stage_in_flight", "Requests currently in each stage", ("stage",))
+        self.request_seconds = self.histogram(
+            "http_request_duration_seconds", "HTTP request latency by handler", ("handler", "method", "status")
+        )
+        self.requests_in_flight = self.gauge("http_requests_in_flight", "HTTP requests being handled")
+        self.openai_tokens = self.counter("openai_tokens_total", "OpenAI tokens used for drafts", ("type",))
+        self.openai_requests = self.counter("openai_requests_total", "OpenAI draft calls by outcome", ("outcome",))
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labelnames, buckets))
+
+    def _register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        """
+        Register a callback read at export time
+
+        The collector yields (name, kind, help, labels, value) samples; names
+        are prefixed like registered metrics.
+        """
+        self._collectors.append(collector)
+
+    def time(self, stage: str) -> Any:
+        """Context manager recording the duration of a request stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.stage_seconds, self.stages_in_flight, stage)
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.stage_seconds.observe(seconds, stage)
+
+    def record_openai_usage(self, response: Any, outcome: str = "ok") -> None:
+        """Count an OpenAI call and the tokens it reports, if any"""
+        if not self.enabled:
+            return
+        self.openai_requests.inc(1, outcome)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        for kind in ("prompt", "completion"):
+            tokens = getattr(usage, f"{kind}_tokens", None)
+            if tokens:
+                self.openai_tokens.inc(tokens, kind)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        declared = set()
+        for collector in self._collectors:
+            for name, kind, help, labels, value in collector():
+                name = f"{self.prefix}_{name}"
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# HELP {name} {help}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-handler latency and in-flight requests"""
+
+    def __init__(self, app: Any, metrics: Callable[[], Metrics]):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        metrics = self.metrics()
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = REQUEST_STARTED.set(started)
+        status = [500]
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        metrics.requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.requests_in_flight.dec()
+            REQUEST_STARTED.reset(token)
+            # The router stores the matched endpoint on the shared scope; its
+            # name keeps label cardinality bounded, unlike the raw path
+            handler = getattr(scope.get("endpoint"), "__name__", None) or "unmatched"
+            metrics.request_seconds.observe(time.perf_counter() - started, handler, scope["method"], str(status[0]))
@@ -7,6 +7,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from pricing import MAX_UNIT_COST, PERCENT_DECIMALS, round_amount
+
 class Language(str, Enum):
     """Supported languages"""
     ENGLISH = "en"
@@ -19,6 +21,14 @@ class Currency(str, Enum):
     EUR = "EUR"
     AED = "AED"
 
+class DraftStatus(str, Enum):
+    """Lifecycle of a quotation's email draft"""
+    READY = "ready"
+    PENDING = "pending"
+    FAILED = "failed"
+    # Template draft returned within the latency budget; the LLM draft replaces it when it arrives
+    PROVISIONAL = "provisional"
+
 class ClientInfo(BaseModel):
     """Client information"""
     name: str = Field(..., description="Client name", min_length=1, max_length=100)
@@ -38,7 +48,7 @@ class QuotationItem(BaseModel):
     """Quotation item details"""
     sku: str = Field(..., description="Product SKU", min_length=1, max_length=50)
     qty: int = Field(..., description="Quantity", gt=0, le=10000)
-    unit_cost: float = Field(..., description="Unit cost", gt=0)
+    unit_cost: float = Field(..., description="Unit cost", gt=0, le=MAX_UNIT_COST)
     margin_pct: float = Field(..., description="Margin percentage", ge=0, le=100)
     
     @validator('sku')
@@ -51,13 +61,17 @@ class QuotationItem(BaseModel):
     def validate_unit_cost(cls, v):
         if v <= 0:
             raise ValueError('Unit cost must be positive')
-        return round(v, 2)
+        # Half up to the cent, as the pricing engine rounds
+        v = round_amount(v, 2)
+        if v <= 0:
+            raise ValueError('Unit cost must be at least 0.01')
+        return v
     
     @validator('margin_pct')
     def validate_margin(cls, v):
         if v < 0 or v > 100:
             raise ValueError('Margin percentage must be between 0 and 100')
-        return round(v, 2)
+        return round_amount(v, PERCENT_DECIMALS)
     
     class Config:
         schema_extra = {
@@ -73,6 +87,9 @@ class QuotationRequest(BaseModel):
     """Request model for quotation generation"""
     client: ClientInfo = Field(..., description="Client information")
     currency: Currency = Field(..., description="Currency for quotation")
+    cost_currency: Optional[Currency] = Field(
+        None, description="Currency of the items' unit_cost, converted at the current FX rates; defaults to currency"
+    )
     items: List[QuotationItem] = Field(..., description="List of items", min_items=1)
     delivery_terms: str = Field(..., description="Delivery terms", min_length=1, max_length=200)
     notes: Optional[str] = Field(None, description="Additional notes", max_length=500)
@@ -147,13 +164,14 @@ class QuotationResponse(BaseModel):
     delivery_terms: str = Field(..., description="Delivery terms")
     notes: Optional[str] = Field(None, description="Additional notes")
     email_draft: str = Field(..., description="Generated email draft")
+    draft_status: DraftStatus = Field(DraftStatus.READY, description="Whether the email draft is ready")
     created_at: datetime = Field(..., description="Creation timestamp")
     valid_until: datetime = Field(..., description="Quotation validity date")
     
     class Config:
         schema_extra = {
             "example": {
-                "quotation_id": "QUO-2024-001",
+                "quotation_id": "QUO-01HM7Q2X5K-8Q7R2T6V4W0Y1A2B",
                 "client": {
                     "name": "Gulf Eng.",
                     "contact": "omar@client.com",
@@ -183,6 +201,42 @@ class QuotationResponse(BaseModel):
             }
         }
 
+class DraftResponse(BaseModel):
+    """Email draft of a stored quotation"""
+    quotation_id: str = Field(..., description="Unique quotation identifier")
+    draft_status: DraftStatus = Field(..., description="Whether the email draft is ready")
+    email_draft: Optional[str] = Field(None, description="Generated email draft once ready")
+
+class BatchQuotationRequest(BaseModel):
+    """Request model for bulk quotation generation"""
+    requests: List[Dict[str, Any]] = Field(
+        ...,
+        description="Quotation requests, each validated individually as a QuotationRequest",
+        min_items=1
+    )
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "requests": [
+                    QuotationRequest.Config.schema_extra["example"]
+                ]
+            }
+        }
+
+class BatchQuotationResult(BaseModel):
+    """Outcome of a single request within a batch"""
+    index: int = Field(..., description="Position of the request in the batch")
+    status: str = Field(..., description="'ok' or 'error'")
+    quotation: Optional[QuotationResponse] = Field(None, description="Generated quotation")
+    error: Optional[str] = Field(None, description="Error message when the request failed")
+
+class BatchQuotationResponse(BaseModel):
+    """Response model for bulk quotation generation"""
+    results: List[BatchQuotationResult] = Field(..., description="Per-request results in request order")
+    succeeded: int = Field(..., description="Number of quotations generated")
+    failed: int = Field(..., description="Number of requests that failed")
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     detail: str = Field(..., description="Error message")
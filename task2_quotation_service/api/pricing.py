@@ -0,0 +1,197 @@
+"""
+Exact vectorized pricing for quotation line items
+
+Money is held as int64 fixed-point minor units (cents for SAR, USD, EUR
+and AED) and percentages as integer basis points. Margin, VAT and totals
+are evaluated over whole arrays of items with integer arithmetic and
+half-up rounding, so subtotal + tax_amount == total to the cent. Floats
+are converted once on the way in and once on the way out.
+"""
+
+import math
+from typing import NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Saudi Arabia's standard VAT rate
+DEFAULT_VAT_RATE_PCT = 15.0
+
+PERCENT_DECIMALS = 2
+# 100% in percentage units
+HUNDRED_PERCENT = 100 * 10 ** PERCENT_DECIMALS
+
+# Largest unit cost a line item may have; with qty <= 10,000 thousands of
+# such lines still total well inside int64 minor units
+MAX_UNIT_COST = 10 ** 9
+
+# Largest product mul_div forms in int64; half-up rounding doubles it
+_INT64_LIMIT = 2 ** 61
+_INT64_MAX = np.iinfo(np.int64).max
+
+Decimals = Union[int, Sequence[int], np.ndarray]
+
+
+class PricedLines(NamedTuple):
+    """Prices in minor units: per item, then per quotation"""
+    unit_price: np.ndarray
+    line_total: np.ndarray
+    subtotal: np.ndarray
+    tax_amount: np.ndarray
+    total: np.ndarray
+
+
+def _check_range(values: np.ndarray) -> np.ndarray:
+    """Cast exact (Python int) results to int64, refusing any that do not fit"""
+    if values.size and int(np.abs(values).max()) > _INT64_MAX:
+        raise ValueError("Amount is too large to price exactly")
+    return values.astype(np.int64)
+
+
+def round_half_up(numerator: np.ndarray, denominator: Union[int, np.ndarray]) -> np.ndarray:
+    """Integer numerator / denominator rounded half away from zero"""
+    sign = np.where(numerator < 0, -1, 1)
+    return sign * ((2 * np.abs(numerator) + denominator) // (2 * denominator))
+
+
+def mul_div(values: np.ndarray, factors: Union[int, np.ndarray], denominator: Union[int, np.ndarray]) -> np.ndarray:
+    """
+    Exact values * factors / denominator, rounded half up
+
+    Runs in int64 unless the product could overflow; then the same
+    arithmetic runs on Python integers and the result is cast back.
+
+    Raises:
+        ValueError: If the result does not fit in int64
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if not values.size or int(np.abs(values).max()) * int(np.abs(factors).max()) <= _INT64_LIMIT:
+        return round_half_up(values * factors, denominator)
+    values, factors, denominator = (
+        np.asarray(array, dtype=object) for array in np.broadcast_arrays(values, factors, denominator)
+    )
+    return _check_range(round_half_up(values * factors, denominator))
+
+
+def to_units(amounts: Sequence[float], decimals: Decimals) -> np.ndarray:
+    """
+    Round amounts half up to integers with the given number of decimals
+
+    Products are rounded to 6 decimals first, so a float such as 1.005
+    (stored as 1.00499...) counts as the decimal it was written as.
+
+    Raises:
+        ValueError: If an amount is not finite or does not fit in int64
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    scaled = np.round(np.abs(amounts) * 10.0 ** np.asarray(decimals), 6)
+    # 2**63 is exact as a float; NaN fails the comparison too
+    if not np.all(scaled < 2.0 ** 63):
+        raise ValueError("Amount is too large to price exactly")
+    return (np.sign(amounts) * np.floor(scaled + 0.5)).astype(np.int64)
+
+
+def round_amount(value: float, decimals: int) -> float:
+    """
+    Scalar to_units then to_major in pure Python, for per-field validators
+
+    Rounds half up exactly like to_units, e.g. ``round_amount(1.005, 2) == 1.01``.
+    """
+    scale = 10 ** decimals
+    units = math.floor(round(abs(value) * scale, 6) + 0.5)
+    return math.copysign(units / scale, value)
+
+
+def to_major(units: np.ndarray, decimals: Decimals) -> np.ndarray:
+    """Fixed-point integers as the nearest floats, e.g. 29280 cents -> 292.8"""
+    return np.asarray(units, dtype=np.int64) / 10.0 ** np.asarray(decimals)
+
+
+def group_subtotals(line_total: np.ndarray, counts: Sequence[int]) -> np.ndarray:
+    """
+    Sum consecutive runs of line totals, one run per quotation
+
+    Args:
+        line_total: Line totals for every quotation, concatenated
+        counts: Number of line items belonging to each quotation, at least 1
+
+    Returns:
+        Array of subtotals, one per quotation
+
+    Raises:
+        ValueError: If an int64 subtotal would overflow
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.size == 0 or line_total.size == 0:
+        return np.zeros(counts.size, dtype=line_total.dtype)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    if line_total.dtype == np.int64 and int(np.abs(line_total).max()) * int(counts.max()) > _INT64_MAX:
+        # Sums could wrap: add exactly on Python integers, then check the range
+        return _check_range(np.add.reduceat(line_total.astype(object), starts))
+    return np.add.reduceat(line_total, starts)
+
+
+def price_lines(
+    qty: Sequence[int],
+    unit_cost: Sequence[float],
+    margin_pct: Sequence[float],
+    counts: Optional[Sequence[int]] = None,
+    vat_pct: Union[float, Sequence[float]] = DEFAULT_VAT_RATE_PCT,
+    decimals: Decimals = 2,
+) -> PricedLines:
+    """
+    Price the line items of one or many quotations in a single pass
+
+    unit_price = unit_cost * (1 + margin / 100), rounded half up to the
+    minor unit; line_total = unit_price * qty; tax_amount = subtotal * VAT,
+    rounded half up; total = subtotal + tax_amount.
+
+    Args:
+        qty: Quantities, one per line item
+        unit_cost: Unit costs, one per line item
+        margin_pct: Margin percentages, one per line item
+        counts: Line items per quotation, in order; None prices all items
+            as one quotation
+        vat_pct: VAT percentage, for all quotations or one per quotation
+        decimals: Minor-unit exponent, for all items or one per item
+
+    Returns:
+        PricedLines in minor units
+
+    Raises:
+        ValueError: If an amount is too large to price in int64 minor units
+    """
+    qty = np.asarray(qty, dtype=np.int64)
+    cost = to_units(unit_cost, decimals)
+    margin = to_units(margin_pct, PERCENT_DECIMALS)
+    if counts is None:
+        counts = [qty.size]
+
+    unit_price = mul_div(cost, HUNDRED_PERCENT + margin, HUNDRED_PERCENT)
+    line_total = mul_div(unit_price, qty, 1)
+    subtotal = group_subtotals(line_total, counts)
+    tax_amount = mul_div(subtotal, to_units(vat_pct, PERCENT_DECIMALS), HUNDRED_PERCENT)
+    if subtotal.size and int(np.abs(subtotal).max()) + int(np.abs(tax_amount).max()) > _INT64_MAX:
+        raise ValueError("Amount is too large to price exactly")
+    return PricedLines(unit_price, line_total, subtotal, tax_amount, subtotal + tax_amount)
+
+
+def price_items(
+    qty: Sequence[int],
+    unit_cost: Sequence[float],
+    margin_pct: Sequence[float],
+    decimals: Decimals = 2,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Price many line items in one pass
+
+    Args:
+        qty: Quantities, one per line item
+        unit_cost: Unit costs, one per line item
+        margin_pct: Margin percentages, one per line item
+        decimals: Minor-unit exponent, for all items or one per item
+
+    Returns:
+        Tuple of (unit_price, line_total) float arrays, exact to the minor unit
+    """
+    priced = price_lines(qty, unit_cost, margin_pct, decimals=decimals)
+    return to_major(priced.unit_price, decimals), to_major(priced.line_total, decimals)
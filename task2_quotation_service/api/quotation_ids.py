@@ -0,0 +1,140 @@
+"""
+Time-sortable quotation IDs
+
+IDs look like ``QUO-01J9ZK5X3M-8Q7R2T6V4W0Y1A2B``: a ULID (48-bit Unix
+millisecond timestamp followed by 80 random bits) in Crockford base32,
+split after the timestamp. Fixed width means string order is creation
+order, so "created between T1 and T2" is a range scan on the primary key.
+The random part keeps IDs unique across worker processes without any
+coordination; within one process IDs are strictly increasing even when
+several are issued in the same millisecond.
+
+Legacy IDs (``QUO-YYYYMMDD-XXXXXXXX``) start with the year's ``2`` and
+therefore sort after every ULID-style ID (whose first character stays
+below ``2`` for another two thousand years), so both formats can live in
+one table.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+PREFIX = "QUO-"
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: index for index, char in enumerate(CROCKFORD)}
+
+TIME_CHARS = 10
+RANDOM_CHARS = 16
+RANDOM_BITS = 80
+_RANDOM_MAX = (1 << RANDOM_BITS) - 1
+
+# Bounds of each ID format as string ranges
+_SORTABLE_RANGE = (PREFIX + "0", PREFIX + "2")
+_LEGACY_RANGE = (PREFIX + "2", PREFIX + "3")
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def _local(value: datetime) -> datetime:
+    """Naive local time, the convention for created_at and legacy ID dates"""
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo is not None else value
+
+
+def format_quotation_id(timestamp_ms: int, randomness: int) -> str:
+    return f"{PREFIX}{_encode(timestamp_ms, TIME_CHARS)}-{_encode(randomness, RANDOM_CHARS)}"
+
+
+def quotation_id_timestamp(quotation_id: str) -> Optional[datetime]:
+    """Creation time (naive local) encoded in a sortable ID, or None for other formats"""
+    if not is_sortable_id(quotation_id):
+        return None
+    value = 0
+    for char in quotation_id[len(PREFIX):len(PREFIX) + TIME_CHARS]:
+        value = value * 32 + _DECODE[char]
+    return datetime.fromtimestamp(value / 1000)
+
+
+def is_sortable_id(quotation_id: str) -> bool:
+    body = quotation_id[len(PREFIX):]
+    return (
+        quotation_id.startswith(PREFIX)
+        and len(body) == TIME_CHARS + 1 + RANDOM_CHARS
+        and body[TIME_CHARS] == "-"
+        and all(char in _DECODE for char in body[:TIME_CHARS] + body[TIME_CHARS + 1:])
+    )
+
+
+class QuotationIdGenerator:
+    """Monotonic ULID-style generator; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self, timestamp: Optional[float] = None) -> str:
+        """
+        Generate an ID for a quotation created at timestamp
+
+        Args:
+            timestamp: Unix time in seconds; defaults to now
+
+        Within a millisecond (or if the clock steps back) the random part of
+        the previous ID is incremented instead of redrawn, so IDs from one
+        process never go backwards.
+        """
+        timestamp_ms = int((time.time() if timestamp is None else timestamp) * 1000)
+        with self._lock:
+            if timestamp_ms <= self._last_ms:
+                timestamp_ms = self._last_ms
+                randomness = self._last_random + 1
+                if randomness > _RANDOM_MAX:
+                    timestamp_ms += 1
+                    randomness = int.from_bytes(os.urandom(10), "big") >> 1
+            else:
+                # One bit of headroom so increments within a millisecond cannot overflow
+                randomness = int.from_bytes(os.urandom(10), "big") >> 1
+            self._last_ms, self._last_random = timestamp_ms, randomness
+        return format_quotation_id(timestamp_ms, randomness)
+
+
+_generator = QuotationIdGenerator()
+
+
+def new_quotation_id(timestamp: Optional[float] = None) -> str:
+    """Next ID from the process-wide generator"""
+    return _generator.new_id(timestamp)
+
+
+def quotation_id_ranges(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> List[Tuple[str, str]]:
+    """
+    Half-open [low, high) primary-key ranges covering quotations created in a window
+
+    One range covers sortable IDs to the millisecond (widened by one on
+    each side, since created_at keeps microseconds). The other covers legacy
+    IDs by their date, so it includes the whole boundary days. Callers still
+    filter on created_at.
+    """
+    sortable_low, sortable_high = _SORTABLE_RANGE
+    legacy_low, legacy_high = _LEGACY_RANGE
+    if created_from is not None:
+        created_from = _local(created_from)
+        sortable_low = format_quotation_id(max(0, int(created_from.timestamp() * 1000) - 1), 0)
+        legacy_low = f"{PREFIX}{created_from:%Y%m%d}"
+    if created_to is not None:
+        created_to = _local(created_to)
+        sortable_high = format_quotation_id(int(created_to.timestamp() * 1000) + 1, 0)
+        legacy_high = f"{PREFIX}{created_to + timedelta(days=1):%Y%m%d}"
+    return [(sortable_low, sortable_high), (legacy_low, legacy_high)]
@@ -2,130 +2,213 @@
 Quotation service with pricing logic and OpenAI integration
 """
 
+import asyncio
 import json
 import logging
-import uuid
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass
 
+import numpy as np
+
 try:
     import openai
+    import httpx
 except ImportError:
     openai = None
+    httpx = None
 
 from models import (
     QuotationRequest, 
     QuotationResponse, 
     LineItem, 
     ClientInfo,
-    ProductInfo
+    ProductInfo,
+    Language,
+    DraftStatus
 )
 from config import get_settings
+from storage import QuotationStore, create_store
+from quotation_ids import new_quotation_id
+from catalog import Product, ProductCatalog, normalize_spec_key, normalize_spec_value
+from response_cache import CachedResponse, ResponseCache, render_json
+from pricing import price_lines, to_major
+from draft_cache import DraftCache
+from email_templates import get_email_templates
+from draft_workers import DraftWorkerPool
+from llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable
+from metrics import Metrics
+from idempotency import IdempotencyCache
+from shared_state import SharedDraftCache, SharedIdempotencyCache, SharedStateDB
+from export import ExportFormat, encode_export, export_columns
+from documents import DocumentRenderer
+from fx import FxRateTable, RateSnapshot
 
 logger = logging.getLogger(__name__)
 
 @dataclass
-class Product:
-    """Product data structure"""
-    sku: str
-    name: str
-    description: str
-    base_price: float
-    category: str
-    specifications: Dict[str, Any]
+class PricedQuotation:
+    """Priced line items and totals for one quotation request"""
+    line_items: List[LineItem]
+    subtotal: float
+    tax_rate: float
+    tax_amount: float
+    total: float
 
 class QuotationService:
     """Main quotation service with pricing logic and OpenAI integration"""
     
-    def __init__(self):
+    def __init__(self, store: Optional[QuotationStore] = None):
         self.settings = get_settings()
         self.client = None
-        self.quotations = {}  # In-memory storage for demo
-        self.products = self._initialize_products()
+        self.async_client = None
+        self.store = store or create_store(self.settings.database_url)
+        self.catalog = ProductCatalog(
+            self.settings.catalog_path,
+            reload_interval=self.settings.catalog_reload_interval_seconds
+        )
+        self.fx_rates = FxRateTable(
+            self.settings.fx_rates_path,
+            reload_interval=self.settings.fx_reload_interval_seconds
+        )
+        self.email_templates = get_email_templates()
+        self.metrics = Metrics(enabled=self.settings.metrics_enabled)
+        self.metrics.add_collector(self._collect_metrics)
+        self.quotation_responses = ResponseCache(self.settings.response_cache_max_entries)
+        self.product_responses = ResponseCache(max_entries=256)
+        # Idempotency keys and LLM drafts shared by every worker process on the host
+        self.shared_state = SharedStateDB(self.settings.shared_state_path) if self.settings.shared_state_path else None
+        if self.shared_state is not None:
+            self.idempotency = SharedIdempotencyCache(
+                self.shared_state,
+                encode=lambda response: response.json(),
+                decode=QuotationResponse.parse_raw,
+                max_entries=self.settings.idempotency_max_keys,
+                ttl_seconds=self.settings.idempotency_ttl_seconds
+            )
+        else:
+            self.idempotency = IdempotencyCache(
+                max_entries=self.settings.idempotency_max_keys,
+                ttl_seconds=self.settings.idempotency_ttl_seconds
+            )
+        self.draft_workers = DraftWorkerPool(
+            workers=self.settings.draft_workers,
+            max_queue=self.settings.draft_queue_size
+        )
+        self.llm_guard = LLMGuard(
+            max_concurrency=self.settings.openai_max_concurrency,
+            max_queue=self.settings.openai_max_queue,
+            breaker=CircuitBreaker(
+                failure_threshold=self.settings.openai_breaker_failure_threshold,
+                window_seconds=self.settings.openai_breaker_window_seconds,
+                cooldown_seconds=self.settings.openai_breaker_cooldown_seconds
+            )
+        )
+        self.documents = DocumentRenderer(
+            workers=self.settings.document_workers,
+            max_queue=self.settings.document_max_queue,
+            cache_entries=self.settings.document_cache_max_entries,
+            font_path=self.settings.document_font_path
+        )
+        self.draft_cache = None
+        if self.settings.draft_cache_enabled:
+            draft_cache_options = dict(
+                max_entries=self.settings.draft_cache_max_entries,
+                max_bytes=self.settings.draft_cache_max_bytes,
+                ttl_seconds=self.settings.draft_cache_ttl_seconds
+            )
+            if self.shared_state is not None:
+                self.draft_cache = SharedDraftCache(self.shared_state, **draft_cache_options)
+            else:
+                self.draft_cache = DraftCache(**draft_cache_options)
         
         if not self.settings.use_mock_services and self.settings.openai_api_key:
             try:
-                self.client = openai.OpenAI(api_key=self.settings.openai_api_key)
+                base_url = self.settings.openai_base_url or None
+                self.client = openai.OpenAI(api_key=self.settings.openai_api_key, base_url=base_url)
+                # One pooled HTTP client shared by every async draft request
+                self.async_client = openai.AsyncOpenAI(
+                    api_key=self.settings.openai_api_key,
+                    base_url=base_url,
+                    timeout=self.settings.openai_timeout_seconds,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=self.settings.openai_max_connections,
+                            max_keepalive_connections=self.settings.openai_max_connections
+                        ),
+                        timeout=self.settings.openai_timeout_seconds
+                    )
+                )
             except Exception as e:
                 logger.warning(f"Failed to initialize OpenAI client: {e}")
                 self.client = None
+                self.async_client = None
     
-    def _initialize_products(self) -> Dict[str, Product]:
-        """Initialize product catalog"""
-        products = {
-            "ALR-SL-90W": Product(
-                sku="ALR-SL-90W",
-                name="90W Streetlight Pole",
-                description="High-efficiency LED streetlight pole with 90W output",
-                base_price=240.0,
-                category="Streetlight",
-                specifications={
-                    "wattage": "90W",
-                    "height": "8m",
-                    "material": "Aluminum",
-                    "lifespan": "50000 hours",
-                    "color_temp": "4000K"
-                }
-            ),
-            "ALR-SL-120W": Product(
-                sku="ALR-SL-120W",
-                name="120W Streetlight Pole",
-                description="High-efficiency LED streetlight pole with 120W output",
-                base_price=320.0,
-                category="Streetlight",
-                specifications={
-                    "wattage": "120W",
-                    "height": "10m",
-                    "material": "Aluminum",
-                    "lifespan": "50000 hours",
-                    "color_temp": "4000K"
-                }
-            ),
-            "ALR-SL-60W": Product(
-                sku="ALR-SL-60W",
-                name="60W Streetlight Pole",
-                description="High-efficiency LED streetlight pole with 60W output",
-                base_price=180.0,
-                category="Streetlight",
-                specifications={
-                    "wattage": "60W",
-                    "height": "6m",
-                    "material": "Aluminum",
-                    "lifespan": "50000 hours",
-                    "color_temp": "4000K"
-                }
-            ),
-            "ALR-OBL-12V": Product(
-                sku="ALR-OBL-12V",
-                name="12V Outdoor Bollard Light",
-                description="Low-voltage outdoor bollard light for pathways",
-                base_price=95.5,
-                category="Bollard",
-                specifications={
-                    "voltage": "12V",
-                    "wattage": "15W",
-                    "height": "1.2m",
-                    "material": "Stainless Steel",
-                    "lifespan": "30000 hours"
-                }
-            ),
-            "ALR-FL-50W": Product(
-                sku="ALR-FL-50W",
-                name="50W Flood Light",
-                description="High-power flood light for area illumination",
-                base_price=150.0,
-                category="Floodlight",
-                specifications={
-                    "wattage": "50W",
-                    "beam_angle": "120°",
-                    "material": "Aluminum",
-                    "lifespan": "40000 hours",
-                    "color_temp": "5000K"
-                }
-            )
+    async def offload(self, func, *args, **kwargs):
+        """Make a sync call that touches the store, on a worker thread when the store blocks on I/O"""
+        if self.store.blocking_io:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    
+    def _store_draft_nowait(self, quotation_id: str, email_draft: str, status: DraftStatus) -> None:
+        """Store a draft from sync code without waiting on a blocking store inside the event loop"""
+        def store():
+            self.store.update_draft(quotation_id, email_draft, status)
+            self.quotation_responses.invalidate(quotation_id)
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and self.store.blocking_io:
+            loop.run_in_executor(None, store)
+        else:
+            store()
+    
+    async def aclose(self):
+        """Stop draft workers and document renderers and close the pooled async OpenAI connections"""
+        await self.draft_workers.stop()
+        self.documents.close()
+        if self.async_client:
+            await self.async_client.close()
+        if self.shared_state is not None:
+            self.shared_state.close()
+    
+    def _collect_metrics(self) -> Iterator[Tuple[str, str, str, Dict[str, str], float]]:
+        """Cache, queue and breaker state sampled when /metrics is scraped"""
+        caches = {
+            "quotation_response": self.quotation_responses.stats(),
+            "product_response": self.product_responses.stats(),
+            "document": self.documents.cache.stats(),
         }
-        return products
+        if self.draft_cache is not None:
+            caches["draft"] = self.draft_cache.stats()
+        for cache, stats in caches.items():
+            for result in ("hits", "misses"):
+                yield "cache_lookups_total", "counter", "Cache lookups by cache and result", {"cache": cache, "result": result}, stats[result]
+            yield "cache_hit_ratio", "gauge", "Cache hits over lookups since start", {"cache": cache}, stats["hit_rate"]
+            yield "cache_entries", "gauge", "Entries held by each cache", {"cache": cache}, stats["entries"]
+        
+        yield "idempotency_replays_total", "counter", "Requests answered from a stored idempotency key", {}, self.idempotency.replays
+        
+        guard = self.llm_guard.stats()
+        yield "openai_in_flight", "gauge", "OpenAI calls holding a concurrency slot", {}, guard["in_flight"]
+        yield "openai_queued", "gauge", "OpenAI calls waiting for a slot", {}, guard["queued"]
+        yield "openai_shed_total", "counter", "OpenAI calls replaced by the template under load", {}, guard["shed"]
+        breaker = guard["breaker"]
+        for state in ("closed", "open", "half_open"):
+            yield "openai_breaker_state", "gauge", "1 for the circuit breaker's current state", {"state": state}, int(breaker["state"] == state)
+        yield "openai_breaker_trips_total", "counter", "Times the circuit breaker opened", {}, breaker["trips"]
+        
+        yield "draft_queue_depth", "gauge", "Deferred drafts waiting for a worker", {}, self.draft_workers.queue_depth
+        yield "document_queue_depth", "gauge", "Documents queued or rendering", {}, self.documents.queue_depth
+        yield "document_shed_total", "counter", "Document requests rejected because the render queue was full", {}, self.documents.shed
+    
+    @property
+    def products(self) -> Dict[str, Product]:
+        """Products of the current catalog snapshot by SKU"""
+        return self.catalog.products
     
     def generate_quotation(self, request: QuotationRequest) -> QuotationResponse:
         """
@@ -140,90 +223,516 @@ class QuotationService:
         try:
             logger.info(f"Generating quotation for {request.client.name}")
             
-            # Generate unique quotation ID
-            quotation_id = f"QUO-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+            # Calculate line items and totals
+            priced = self._price_quotation(request)
             
-            # Calculate line items
-            line_items = self._calculate_line_items(request.items)
+            # Generate email draft
+            email_draft = self._generate_email_draft(request, priced.line_items, priced.total)
             
-            # Calculate totals
-            subtotal = sum(item.line_total for item in line_items)
-            tax_rate = 15.0  # 15% VAT for Saudi Arabia
-            tax_amount = subtotal * (tax_rate / 100)
-            total = subtotal + tax_amount
+            # Create and store response
+            response = self._build_response(request, priced, email_draft)
+            with self.metrics.time("storage"):
+                self.store.save(response.dict())
             
-            # Generate email draft
-            email_draft = self._generate_email_draft(request, line_items, total)
+            logger.info(f"Quotation {response.quotation_id} generated successfully")
+            return response
             
-            # Create response
-            response = QuotationResponse(
-                quotation_id=quotation_id,
-                client=request.client,
-                currency=request.currency,
-                line_items=line_items,
-                subtotal=round(subtotal, 2),
-                tax_rate=tax_rate,
-                tax_amount=round(tax_amount, 2),
-                total=round(total, 2),
-                delivery_terms=request.delivery_terms,
-                notes=request.notes,
-                email_draft=email_draft,
-                created_at=datetime.now(),
-                valid_until=datetime.now() + timedelta(days=30)
-            )
+        except Exception as e:
+            logger.error(f"Error generating quotation: {e}")
+            raise ValueError(f"Failed to generate quotation: {str(e)}")
+    
+    async def generate_quotation_async(
+        self,
+        request: QuotationRequest,
+        latency_budget: Optional[float] = None
+    ) -> QuotationResponse:
+        """
+        Generate quotation without blocking the event loop on the email draft
+        
+        Args:
+            request: QuotationRequest with client and item details
+            latency_budget: Seconds to wait for the LLM draft before returning
+                the template draft with draft_status "provisional"; the LLM
+                draft replaces it in the background. None uses the
+                DRAFT_LATENCY_BUDGET_MS setting, 0 disables hedging.
+            
+        Returns:
+            QuotationResponse with complete quotation
+        """
+        if latency_budget is None:
+            latency_budget = self.settings.draft_latency_budget_ms / 1000
+        try:
+            logger.info(f"Generating quotation for {request.client.name}")
+            
+            priced = self._price_quotation(request)
+            if latency_budget > 0:
+                email_draft, upgrade = await self._generate_email_draft_hedged(
+                    request, priced.line_items, priced.total, latency_budget
+                )
+            else:
+                email_draft, upgrade = await self._generate_email_draft_async(request, priced.line_items, priced.total), None
             
-            # Store quotation
-            self.quotations[quotation_id] = response.dict()
+            status = DraftStatus.READY if upgrade is None else DraftStatus.PROVISIONAL
+            response = self._build_response(request, priced, email_draft, draft_status=status)
+            with self.metrics.time("storage"):
+                await self.offload(self.store.save, response.dict())
+            if upgrade is not None:
+                self._schedule_draft_upgrade(response.quotation_id, upgrade, email_draft)
             
-            logger.info(f"Quotation {quotation_id} generated successfully")
+            logger.info(f"Quotation {response.quotation_id} generated successfully")
             return response
             
         except Exception as e:
             logger.error(f"Error generating quotation: {e}")
             raise ValueError(f"Failed to generate quotation: {str(e)}")
     
-    def _calculate_line_items(self, items: List[Any]) -> List[LineItem]:
-        """Calculate line items with pricing"""
-        line_items = []
+    async def _generate_email_draft_hedged(
+        self,
+        request: QuotationRequest,
+        line_items: List[LineItem],
+        total: float,
+        latency_budget: float
+    ) -> Tuple[str, Optional[asyncio.Future]]:
+        """
+        Race the LLM draft against a deadline
+        
+        Returns:
+            The LLM draft and None when it arrives within latency_budget,
+            otherwise the template draft and the still-running LLM call
+        """
+        if not self.async_client or self.settings.use_mock_services:
+            return self._generate_template_email(request, line_items, total), None
+        
+        llm_draft = asyncio.ensure_future(self._generate_email_draft_async(request, line_items, total))
+        done, _ = await asyncio.wait({llm_draft}, timeout=latency_budget)
+        if done:
+            return llm_draft.result(), None
+        logger.info(f"LLM draft exceeded the {latency_budget * 1000:.0f}ms budget, returning the template draft")
+        return self._generate_template_email(request, line_items, total), llm_draft
+    
+    def _schedule_draft_upgrade(self, quotation_id: str, llm_draft: asyncio.Future, template_draft: str) -> None:
+        """Store the LLM draft on a quotation once the hedged call finishes"""
+        async def upgrade():
+            try:
+                email_draft = await llm_draft
+            except Exception as e:
+                logger.error(f"Draft upgrade for {quotation_id} failed: {e}")
+                email_draft = template_draft
+            await self.offload(self.store.update_draft, quotation_id, email_draft, DraftStatus.READY)
+            self.quotation_responses.invalidate(quotation_id)
+        
+        if not self.draft_workers.submit(quotation_id, upgrade):
+            # No room to track the upgrade; the LLM call still finishes and fills the draft cache
+            logger.warning(f"Draft queue full, keeping the template draft for {quotation_id}")
+            self._store_draft_nowait(quotation_id, template_draft, DraftStatus.READY)
+    
+    async def generate_quotation_deferred(self, request: QuotationRequest) -> QuotationResponse:
+        """
+        Generate a priced quotation now and its email draft in the background
         
-        for item in items:
-            # Get product info
-            product = self.products.get(item.sku)
-            if not product:
-                raise ValueError(f"Product {item.sku} not found")
+        Args:
+            request: QuotationRequest with client and item details
+            
+        Returns:
+            QuotationResponse with draft_status "pending" and an empty email_draft,
+            unless the draft queue is full and the template draft was produced inline
+        """
+        try:
+            logger.info(f"Generating deferred quotation for {request.client.name}")
             
-            # Calculate unit price with margin
-            unit_price = item.unit_cost * (1 + item.margin_pct / 100)
-            line_total = unit_price * item.qty
+            priced = self._price_quotation(request)
+            response = self._build_response(request, priced, "", draft_status=DraftStatus.PENDING)
+            with self.metrics.time("storage"):
+                await self.offload(self.store.save, response.dict())
             
-            line_item = LineItem(
+            queued = self.draft_workers.submit(
+                response.quotation_id,
+                lambda: self._complete_deferred_draft(response.quotation_id, request, priced)
+            )
+            if not queued:
+                logger.warning(f"Draft queue full, drafting {response.quotation_id} from template")
+                response.email_draft = self._generate_template_email(request, priced.line_items, priced.total)
+                response.draft_status = DraftStatus.READY
+                await self.offload(self.store.update_draft, response.quotation_id, response.email_draft, response.draft_status)
+            
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error generating quotation: {e}")
+            raise ValueError(f"Failed to generate quotation: {str(e)}")
+    
+    async def _complete_deferred_draft(self, quotation_id: str, request: QuotationRequest, priced: PricedQuotation):
+        """Produce a deferred draft and store it on the quotation"""
+        try:
+            email_draft = await self._generate_email_draft_async(request, priced.line_items, priced.total)
+            status = DraftStatus.READY
+        except Exception as e:
+            logger.error(f"Deferred draft for {quotation_id} failed: {e}")
+            email_draft, status = "", DraftStatus.FAILED
+        await self.offload(self.store.update_draft, quotation_id, email_draft, status)
+        self.quotation_responses.invalidate(quotation_id)
+    
+    async def get_draft(self, quotation_id: str, wait: float = 0) -> Optional[Dict]:
+        """
+        Get the email draft of a quotation, optionally long-polling until it is final
+        
+        Args:
+            quotation_id: Unique quotation identifier
+            wait: Seconds to wait for a pending draft before returning
+            
+        Returns:
+            Dict with quotation_id, draft_status and email_draft, or None if not found
+        """
+        quotation = await self.offload(self.store.get, quotation_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, self.settings.draft_max_wait_seconds)
+        
+        while quotation and quotation.get("draft_status") in (DraftStatus.PENDING, DraftStatus.PROVISIONAL):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            if self.draft_workers.is_pending(quotation_id):
+                await self.draft_workers.wait(quotation_id, remaining)
+            else:
+                # Queued by another worker process; poll the shared store instead
+                await asyncio.sleep(min(self.settings.draft_poll_interval_seconds, remaining))
+            quotation = await self.offload(self.store.get, quotation_id)
+        
+        if quotation is None:
+            return None
+        status = quotation.get("draft_status", DraftStatus.READY)
+        return {
+            "quotation_id": quotation_id,
+            "draft_status": status,
+            "email_draft": None if status == DraftStatus.PENDING else quotation["email_draft"]
+        }
+    
+    async def stream_quotation(self, request: QuotationRequest) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a quotation, yielding the priced quotation first and then the email draft as it is produced
+        
+        Args:
+            request: QuotationRequest with client and item details
+            
+        Yields:
+            ("quotation", quotation dict) once, then ("token", {"text": ...}) for each
+            draft fragment, then ("done", draft dict) with the authoritative final draft
+        """
+        try:
+            priced = self._price_quotation(request)
+        except Exception as e:
+            logger.error(f"Error generating quotation: {e}")
+            raise ValueError(f"Failed to generate quotation: {str(e)}")
+        
+        response = self._build_response(request, priced, "", draft_status=DraftStatus.PENDING)
+        with self.metrics.time("storage"):
+            await self.offload(self.store.save, response.dict())
+        
+        finished = False
+        try:
+            yield "quotation", json.loads(response.json())
+            
+            fragments = []
+            try:
+                async for text in self._stream_email_draft(request, priced.line_items, priced.total):
+                    fragments.append(text)
+                    yield "token", {"text": text}
+                email_draft = "".join(fragments)
+            except Exception:
+                # The final "done" event carries the replacement draft
+                email_draft = self._generate_template_email(request, priced.line_items, priced.total)
+            
+            await self.offload(self.store.update_draft, response.quotation_id, email_draft, DraftStatus.READY)
+            finished = True
+            yield "done", {
+                "quotation_id": response.quotation_id,
+                "draft_status": DraftStatus.READY.value,
+                "email_draft": email_draft
+            }
+        finally:
+            if not finished:
+                # The client went away mid-stream; don't leave the quotation pending
+                self._hand_off_draft(response.quotation_id, request, priced)
+    
+    def _hand_off_draft(self, quotation_id: str, request: QuotationRequest, priced: PricedQuotation) -> None:
+        """Finish an abandoned streamed draft on the draft workers, or from template if they can't take it"""
+        try:
+            queued = self.draft_workers.submit(
+                quotation_id,
+                lambda: self._complete_deferred_draft(quotation_id, request, priced)
+            )
+        except RuntimeError:
+            # Closed outside a running event loop
+            queued = False
+        if not queued:
+            logger.warning(f"Draft queue unavailable, drafting abandoned stream {quotation_id} from template")
+            email_draft = self._generate_template_email(request, priced.line_items, priced.total)
+            self._store_draft_nowait(quotation_id, email_draft, DraftStatus.READY)
+    
+    async def _stream_email_draft(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> AsyncIterator[str]:
+        """Yield email draft fragments, streaming from OpenAI when available"""
+        if not self.async_client or self.settings.use_mock_services:
+            yield self._generate_template_email(request, line_items, total)
+            return
+        
+        key = DraftCache.make_key(request, line_items, total)
+        cached = await self.draft_cache.get_async(key) if self.draft_cache is not None else None
+        if cached is not None:
+            yield cached
+            return
+        
+        fragments = []
+        try:
+            async with self.llm_guard.slot():
+                # One deadline for opening the stream and reading every chunk of it
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + self.settings.openai_timeout_seconds
+                stream = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(
+                        model=self.settings.openai_model,
+                        messages=self._build_openai_messages(request, line_items, total),
+                        temperature=0.3,
+                        stream=True
+                    ),
+                    timeout=self.settings.openai_timeout_seconds
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        fragments.append(text)
+                        yield text
+        except LLMUnavailable as e:
+            logger.warning(f"OpenAI email streaming skipped ({e.reason}), using template")
+            yield self._generate_template_email(request, line_items, total)
+            return
+        except Exception as e:
+            logger.error(f"OpenAI email streaming failed: {e}")
+            if fragments:
+                # Part of the draft was already sent; let the caller replace it
+                raise
+            yield self._generate_template_email(request, line_items, total)
+            return
+        
+        if self.draft_cache is not None:
+            await self.draft_cache.put_async(key, "".join(fragments))
+    
+    async def generate_quotation_batch(
+        self,
+        requests: List[QuotationRequest],
+        max_concurrency: Optional[int] = None
+    ) -> List[Union[QuotationResponse, Exception]]:
+        """
+        Generate many quotations with one vectorized pricing pass
+        
+        Args:
+            requests: Quotation requests to process
+            max_concurrency: Maximum number of email drafts generated at once
+            
+        Returns:
+            One QuotationResponse or exception per request, in request order
+        """
+        logger.info(f"Generating batch of {len(requests)} quotations")
+        with self.metrics.time("pricing"):
+            results: List[Union[QuotationResponse, Exception]] = self._price_quotations(requests)
+        semaphore = asyncio.Semaphore(max_concurrency or self.settings.batch_draft_concurrency)
+        
+        async def draft(request: QuotationRequest, priced: PricedQuotation) -> str:
+            async with semaphore:
+                return await self._generate_email_draft_async(request, priced.line_items, priced.total)
+        
+        pending = [
+            (index, draft(requests[index], priced))
+            for index, priced in enumerate(results)
+            if isinstance(priced, PricedQuotation)
+        ]
+        drafts = await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+        
+        for (index, _), email_draft in zip(pending, drafts):
+            if isinstance(email_draft, Exception):
+                results[index] = ValueError(f"Failed to generate quotation: {email_draft}")
+            else:
+                results[index] = self._build_response(requests[index], results[index], email_draft)
+        
+        with self.metrics.time("storage"):
+            await self.offload(self.store.save_many, [r.dict() for r in results if isinstance(r, QuotationResponse)])
+        return results
+    
+    def _price_quotation(self, request: QuotationRequest) -> PricedQuotation:
+        """Price a single quotation request"""
+        with self.metrics.time("pricing"):
+            priced = self._price_quotations([request])[0]
+        if isinstance(priced, Exception):
+            raise priced
+        return priced
+    
+    def _price_quotations(self, requests: List[QuotationRequest]) -> List[Union[PricedQuotation, Exception]]:
+        """Price the line items of many requests in a single vectorized pass"""
+        results: List[Union[PricedQuotation, Exception]] = [None] * len(requests)
+        valid = []
+        # One snapshot each for the whole pass so a reload cannot split it
+        products = self.products
+        rates = self.fx_rates.snapshot
+        
+        for index, request in enumerate(requests):
+            missing = next((item.sku for item in request.items if item.sku not in products), None)
+            cost_currency = request.cost_currency or request.currency
+            if missing:
+                results[index] = ValueError(f"Product {missing} not found")
+            elif cost_currency != request.currency and not (cost_currency.value in rates and request.currency.value in rates):
+                results[index] = ValueError(f"No FX rate from {cost_currency.value} to {request.currency.value}")
+            else:
+                valid.append(index)
+        
+        items = [item for index in valid for item in requests[index].items]
+        counts = [len(requests[index].items) for index in valid]
+        decimals = np.array([rates.decimals(requests[index].currency.value) for index in valid], dtype=np.int64)
+        item_decimals = np.repeat(decimals, counts)
+        tax_rate = self.settings.vat_rate_pct
+        try:
+            unit_costs = self._unit_costs_in_quote_currency([requests[index] for index in valid], items, counts, rates)
+            priced = price_lines(
+                [item.qty for item in items],
+                unit_costs,
+                [item.margin_pct for item in items],
+                counts=counts,
+                vat_pct=tax_rate,
+                decimals=item_decimals,
+            )
+        except ValueError as e:
+            # An amount too large for exact pricing fails only its own quotation
+            if len(valid) == 1:
+                results[valid[0]] = e
+            else:
+                for index in valid:
+                    results[index] = self._price_quotations([requests[index]])[0]
+            return results
+        unit_prices = to_major(priced.unit_price, item_decimals).tolist()
+        line_totals = to_major(priced.line_total, item_decimals).tolist()
+        totals = zip(
+            to_major(priced.subtotal, decimals).tolist(),
+            to_major(priced.tax_amount, decimals).tolist(),
+            to_major(priced.total, decimals).tolist(),
+        )
+        
+        position = 0
+        for index, count, (subtotal, tax_amount, total) in zip(valid, counts, totals):
+            line_items = self._build_line_items(
+                items[position:position + count],
+                unit_costs[position:position + count].tolist(),
+                unit_prices[position:position + count],
+                line_totals[position:position + count],
+                products,
+            )
+            position += count
+            results[index] = PricedQuotation(
+                line_items=line_items,
+                subtotal=subtotal,
+                tax_rate=tax_rate,
+                tax_amount=tax_amount,
+                total=total,
+            )
+        
+        return results
+    
+    def _unit_costs_in_quote_currency(
+        self,
+        requests: List[QuotationRequest],
+        items: List[Any],
+        counts: List[int],
+        rates: RateSnapshot
+    ) -> np.ndarray:
+        """Unit costs of every item in its quotation's currency, converted in one pass"""
+        unit_costs = np.array([item.unit_cost for item in items], dtype=np.float64)
+        sources = [(request.cost_currency or request.currency).value for request in requests]
+        targets = [request.currency.value for request in requests]
+        if sources == targets:
+            return unit_costs
+        return rates.convert(unit_costs, np.repeat(sources, counts), np.repeat(targets, counts))
+    
+    def _build_response(
+        self,
+        request: QuotationRequest,
+        priced: PricedQuotation,
+        email_draft: str,
+        draft_status: DraftStatus = DraftStatus.READY
+    ) -> QuotationResponse:
+        """Assemble a QuotationResponse from priced line items and an email draft"""
+        # The ID and created_at come from the same instant so ID order is creation order
+        now = time.time()
+        quotation_id = new_quotation_id(now)
+        created_at = datetime.fromtimestamp(now)
+        return QuotationResponse(
+            quotation_id=quotation_id,
+            client=request.client,
+            currency=request.currency,
+            line_items=priced.line_items,
+            subtotal=priced.subtotal,
+            tax_rate=priced.tax_rate,
+            tax_amount=priced.tax_amount,
+            total=priced.total,
+            delivery_terms=request.delivery_terms,
+            notes=request.notes,
+            email_draft=email_draft,
+            draft_status=draft_status,
+            created_at=created_at,
+            valid_until=created_at + timedelta(days=30)
+        )
+    
+    def _build_line_items(
+        self,
+        items: List[Any],
+        unit_costs: List[float],
+        unit_prices: List[float],
+        line_totals: List[float],
+        products: Dict[str, Product]
+    ) -> List[LineItem]:
+        """Combine request items with their unit costs in the quotation currency and computed prices"""
+        return [
+            LineItem(
                 sku=item.sku,
-                description=product.description,
+                description=products[item.sku].description,
                 qty=item.qty,
-                unit_cost=item.unit_cost,
+                unit_cost=unit_cost,
                 margin_pct=item.margin_pct,
-                unit_price=round(unit_price, 2),
-                line_total=round(line_total, 2)
+                unit_price=unit_price,
+                line_total=line_total
             )
-            
-            line_items.append(line_item)
-        
-        return line_items
+            for item, unit_cost, unit_price, line_total in zip(items, unit_costs, unit_prices, line_totals)
+        ]
     
     def _generate_email_draft(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
         """Generate email draft using OpenAI or template"""
         try:
-            if self.client and not self.settings.use_mock_services:
-                return self._generate_with_openai(request, line_items, total)
-            else:
-                return self._generate_template_email(request, line_items, total)
+            with self.metrics.time("drafting"):
+                if self.client and not self.settings.use_mock_services:
+                    return self._generate_with_openai(request, line_items, total)
+                else:
+                    return self._generate_template_email(request, line_items, total)
                 
         except Exception as e:
             logger.error(f"Error generating email draft: {e}")
             return self._generate_template_email(request, line_items, total)
     
-    def _generate_with_openai(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
-        """Generate email draft using OpenAI"""
+    async def _generate_email_draft_async(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
+        """Generate email draft using the async OpenAI client or template, without blocking the event loop"""
+        try:
+            with self.metrics.time("drafting"):
+                if self.async_client and not self.settings.use_mock_services:
+                    return await self._generate_with_openai_async(request, line_items, total)
+                else:
+                    return self._generate_template_email(request, line_items, total)
+                
+        except Exception as e:
+            logger.error(f"Error generating email draft: {e}")
+            return self._generate_template_email(request, line_items, total)
+    
+    def _build_openai_messages(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> List[Dict[str, str]]:
+        """Build the chat messages used to draft a quotation email"""
         prompt = f"""
         Generate a professional quotation email for Alrouf Lighting Technology.
         
@@ -249,22 +758,87 @@ class QuotationService:
         Return only the email content, no additional text.
         """
         
+        return [
+            {"role": "system", "content": "You are a professional sales representative for Alrouf Lighting Technology. Generate professional quotation emails."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _generate_with_openai(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
+        """Generate email draft using OpenAI"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.settings.openai_model,
-                messages=[
-                    {"role": "system", "content": "You are a professional sales representative for Alrouf Lighting Technology. Generate professional quotation emails."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
+            if self.draft_cache is None:
+                return self._request_openai_draft(request, line_items, total)
+            return self.draft_cache.get_or_create_sync(
+                DraftCache.make_key(request, line_items, total),
+                lambda: self._request_openai_draft(request, line_items, total)
             )
             
-            return response.choices[0].message.content
+        except LLMUnavailable as e:
+            logger.warning(f"OpenAI email generation skipped ({e.reason}), using template")
+            return self._generate_template_email(request, line_items, total)
+        except Exception as e:
+            logger.error(f"OpenAI email generation failed: {e}")
+            return self._generate_template_email(request, line_items, total)
+    
+    def _request_openai_draft(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
+        """Call the OpenAI chat completions API for a draft"""
+        with self.llm_guard.slot_sync(), self.metrics.time("openai"):
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.settings.openai_model,
+                    messages=self._build_openai_messages(request, line_items, total),
+                    temperature=0.3
+                )
+            except Exception:
+                self.metrics.record_openai_usage(None, "error")
+                raise
+        self.metrics.record_openai_usage(response)
+        return response.choices[0].message.content
+    
+    async def _generate_with_openai_async(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
+        """Generate email draft using AsyncOpenAI, falling back to the template when the latency budget is exceeded"""
+        try:
+            if self.draft_cache is None:
+                return await self._request_openai_draft_async(request, line_items, total)
+            return await self.draft_cache.get_or_create(
+                DraftCache.make_key(request, line_items, total),
+                lambda: self._request_openai_draft_async(request, line_items, total)
+            )
             
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"OpenAI email generation exceeded {self.settings.openai_timeout_seconds}s, using template"
+            )
+            return self._generate_template_email(request, line_items, total)
+        except LLMUnavailable as e:
+            logger.warning(f"OpenAI email generation skipped ({e.reason}), using template")
+            return self._generate_template_email(request, line_items, total)
         except Exception as e:
             logger.error(f"OpenAI email generation failed: {e}")
             return self._generate_template_email(request, line_items, total)
     
+    async def _request_openai_draft_async(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
+        """Call the async OpenAI chat completions API for a draft within the latency budget"""
+        async with self.llm_guard.slot():
+            with self.metrics.time("openai"):
+                try:
+                    response = await asyncio.wait_for(
+                        self.async_client.chat.completions.create(
+                            model=self.settings.openai_model,
+                            messages=self._build_openai_messages(request, line_items, total),
+                            temperature=0.3
+                        ),
+                        timeout=self.settings.openai_timeout_seconds
+                    )
+                except asyncio.TimeoutError:
+                    self.metrics.record_openai_usage(None, "timeout")
+                    raise
+                except Exception:
+                    self.metrics.record_openai_usage(None, "error")
+                    raise
+        self.metrics.record_openai_usage(response)
+        return response.choices[0].message.content
+    
     def _generate_template_email(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
         """Generate email using template"""
         if request.client.lang == "ar":
@@ -274,124 +848,148 @@ class QuotationService:
     
     def _generate_arabic_template(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
         """Generate Arabic email template"""
-        subject = f"عرض سعر - {request.client.name}"
-        
-        body = f"""
-الموضوع: عرض سعر - {request.client.name}
-
-السيد/ة {request.client.name} المحترم/ة،
-
-السلام عليكم ورحمة الله وبركاته،
-
-نشكركم على اهتمامكم بمنتجات شركة الأروف للتكنولوجيا والإضاءة.
-
-نرفق لكم عرض السعر المطلوب:
-
-تفاصيل العرض:
-"""
-        
-        for item in line_items:
-            body += f"""
-• المنتج: {item.sku} - {item.description}
-• الكمية: {item.qty} وحدة
-• السعر للوحدة: {item.unit_price} {request.currency}
-• المجموع: {item.line_total} {request.currency}
-"""
-        
-        body += f"""
-المجموع الفرعي: {sum(item.line_total for item in line_items)} {request.currency}
-ضريبة القيمة المضافة (15%): {total - sum(item.line_total for item in line_items)} {request.currency}
-المجموع الكلي: {total} {request.currency}
-
-شروط التسليم: {request.delivery_terms}
-
-ملاحظات: {request.notes or 'لا توجد ملاحظات إضافية'}
-
-هذا العرض صالح لمدة 30 يوماً من تاريخ الإصدار.
-
-نتطلع للتعاون معكم.
-
-مع أطيب التحيات،
-فريق المبيعات
-شركة الأروف للتكنولوجيا والإضاءة
-هاتف: +966 11 123 4567
-بريد إلكتروني: sales@alrouf.com
-        """
-        
-        return f"Subject: {subject}\n\n{body.strip()}"
+        return self.email_templates.render(
+            request, line_items, total, lang=Language.ARABIC.value, vat_rate=self.settings.vat_rate_pct
+        )
     
     def _generate_english_template(self, request: QuotationRequest, line_items: List[LineItem], total: float) -> str:
         """Generate English email template"""
-        subject = f"Quotation - {request.client.name}"
-        
-        body = f"""
-Subject: Quotation - {request.client.name}
-
-Dear {request.client.name},
-
-Thank you for your interest in Alrouf Lighting Technology products.
-
-Please find below our quotation for your requirements:
-
-Quotation Details:
-"""
-        
-        for item in line_items:
-            body += f"""
-• Product: {item.sku} - {item.description}
-• Quantity: {item.qty} units
-• Unit Price: {item.unit_price} {request.currency}
-• Line Total: {item.line_total} {request.currency}
-"""
-        
-        body += f"""
-Subtotal: {sum(item.line_total for item in line_items)} {request.currency}
-VAT (15%): {total - sum(item.line_total for item in line_items)} {request.currency}
-Total: {total} {request.currency}
-
-Delivery Terms: {request.delivery_terms}
-
-Notes: {request.notes or 'No additional notes'}
-
-This quotation is valid for 30 days from the date of issue.
-
-We look forward to working with you.
-
-Best regards,
-Sales Team
-Alrouf Lighting Technology
-Phone: +966 11 123 4567
-Email: sales@alrouf.com
-        """
-        
-        return f"Subject: {subject}\n\n{body.strip()}"
+        return self.email_templates.render(
+            request, line_items, total, lang=Language.ENGLISH.value, vat_rate=self.settings.vat_rate_pct
+        )
     
     def get_quotation(self, quotation_id: str) -> Optional[Dict]:
         """Get quotation by ID"""
-        return self.quotations.get(quotation_id)
+        return self.store.get(quotation_id)
+    
+    def get_quotation_response(self, quotation_id: str) -> Optional[CachedResponse]:
+        """
+        Get a quotation serialized for GET /quote/{id}
+        
+        Quotations do not change once their draft is final, so the encoded
+        body is cached and only an existence check hits the store (another
+        worker may have deleted it). Quotations with a pending or
+        provisional draft are re-read every time.
+        """
+        cached = self.quotation_responses.get(quotation_id)
+        if cached is not None:
+            if self.store.exists(quotation_id):
+                return cached
+            self.quotation_responses.invalidate(quotation_id)
+            return None
+        
+        quotation = self.store.get(quotation_id)
+        if quotation is None:
+            return None
+        with self.metrics.time("serialization"):
+            cached = render_json(quotation)
+        if quotation.get("draft_status") not in (DraftStatus.PENDING, DraftStatus.PROVISIONAL):
+            self.quotation_responses.put(quotation_id, cached)
+        return cached
     
     def list_quotations(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """List quotations with pagination"""
-        quotations = list(self.quotations.values())
-        return quotations[offset:offset + limit]
+        return self.store.list(limit=limit, offset=offset)
+    
+    def list_quotations_page(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """List quotations after an opaque cursor, returning the page and the next cursor"""
+        return self.store.list_page(limit=limit, cursor=cursor)
+    
+    def search_quotations(
+        self,
+        client_contact: Optional[str] = None,
+        sku: Optional[str] = None,
+        currency: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_total: Optional[float] = None,
+        max_total: Optional[float] = None,
+        limit: int = 100
+    ) -> List[Dict]:
+        """Find quotations matching every given filter using the store's secondary indexes"""
+        return self.store.search(
+            client_contact=client_contact,
+            sku=sku.strip().upper() if sku else None,
+            currency=currency,
+            created_from=created_from,
+            created_to=created_to,
+            min_total=min_total,
+            max_total=max_total,
+            limit=limit
+        )
+    
+    def iter_quotation_batches(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        batch_size: Optional[int] = None
+    ) -> Iterator[List[Dict]]:
+        """Yield every quotation created in [created_from, created_to) in primary-key batches"""
+        batch_size = batch_size or self.settings.export_batch_size
+        after = None
+        while True:
+            batch = self.store.scan(created_from, created_to, after=after, limit=batch_size)
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            after = batch[-1]["quotation_id"]
+    
+    def export_quotations(
+        self,
+        format: ExportFormat,
+        fields: Optional[List[str]] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> Iterator[bytes]:
+        """
+        Encode quotations as NDJSON or CSV chunks, reading the store lazily
+        
+        Fields are validated here, before the first chunk, so a bad
+        projection fails the request instead of truncating the stream.
+        
+        Raises:
+            ValueError: If a requested field is unknown
+        """
+        columns = export_columns(format, fields)
+        return encode_export(self.iter_quotation_batches(created_from, created_to), format, columns)
+    
+    def count_quotations(self) -> int:
+        """Number of stored quotations"""
+        return self.store.count()
     
     def delete_quotation(self, quotation_id: str) -> bool:
         """Delete quotation by ID"""
-        if quotation_id in self.quotations:
-            del self.quotations[quotation_id]
-            return True
-        return False
+        self.quotation_responses.invalidate(quotation_id)
+        return self.store.delete(quotation_id)
     
-    def get_products(self) -> List[Dict]:
-        """Get available products"""
-        return [
-            {
-                "sku": product.sku,
-                "name": product.name,
-                "description": product.description,
-                "base_price": product.base_price,
-                "category": product.category,
-                "specifications": product.specifications
-            }
-            for product in self.products.values()
-        ]
+    def get_products(self, category: Optional[str] = None, specs: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Get available products, optionally filtered through the catalog indexes
+        
+        Args:
+            category: Category name, case-insensitive
+            specs: Specification filters such as {"wattage": "90W"}
+        """
+        return [product.to_dict() for product in self.catalog.snapshot.find(category=category, specs=specs)]
+    
+    def get_products_response(self, category: Optional[str] = None, specs: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Get the serialized GET /products body, cached per catalog version
+        
+        Args:
+            category: Category name, case-insensitive
+            specs: Specification filters such as {"wattage": "90W"}
+        """
+        snapshot = self.catalog.snapshot
+        self.product_responses.use_generation(snapshot.version)
+        key = (
+            category.lower() if category is not None else None,
+            tuple(sorted((normalize_spec_key(k), normalize_spec_value(v)) for k, v in (specs or {}).items())),
+        )
+        cached = self.product_responses.get(key)
+        if cached is None:
+            products = snapshot.find(category=category, specs=specs)
+            cached = render_json({"products": [product.to_dict() for product in products]})
+            self.product_responses.put(key, cached)
+        return cached
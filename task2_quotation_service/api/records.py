@@ -0,0 +1,274 @@
+"""
+Compact in-memory representation of stored quotations
+"""
+
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, Tuple
+from weakref import WeakValueDictionary
+
+from email_templates import get_email_templates
+
+QUOTATION_FIELDS = frozenset((
+    "quotation_id", "client", "currency", "line_items", "subtotal", "tax_rate", "tax_amount", "total",
+    "delivery_terms", "notes", "email_draft", "draft_status", "created_at", "valid_until",
+))
+CLIENT_FIELDS = frozenset(("name", "contact", "lang"))
+LINE_FIELDS = frozenset(("sku", "description", "qty", "unit_cost", "margin_pct", "unit_price", "line_total"))
+
+# Drafts shorter than this are kept as plain strings
+COMPRESS_MIN_CHARS = 64
+
+_DOUBLE = struct.Struct("d")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class _Client:
+    """Interned client shared by every live record for it (tuples cannot be weakly referenced)"""
+
+    __slots__ = ("name", "contact", "lang", "__weakref__")
+
+    def __init__(self, name: str, contact: str, lang: str):
+        self.name = sys.intern(name)
+        self.contact = sys.intern(contact)
+        self.lang = sys.intern(lang)
+
+
+class _LineLabel:
+    """Interned (sku, description) pair shared by every live record quoting it"""
+
+    __slots__ = ("sku", "description", "__weakref__")
+
+    def __init__(self, sku: str, description: str):
+        self.sku = sys.intern(sku)
+        self.description = sys.intern(description)
+
+
+# Entries drop out when the last record using them is deleted, so the
+# tables never outgrow the store
+_LINE_LABELS: "WeakValueDictionary[Tuple[str, str], _LineLabel]" = WeakValueDictionary()
+_CLIENTS: "WeakValueDictionary[Tuple[str, str, str], _Client]" = WeakValueDictionary()
+
+
+def _shared(table: WeakValueDictionary, factory: Any, key: Tuple[str, ...]) -> Any:
+    """The shared object for key, created on first use"""
+    value = table.get(key)
+    if value is None:
+        value = table[key] = factory(*key)
+    return value
+
+
+def _build_draft_dictionary() -> bytes:
+    """
+    Preset zlib dictionary: every email template rendered with a sample line
+
+    Template drafts share most of their text with these samples, so zlib can
+    encode them as a few back-references.
+    """
+    sample_rows = [("ALR-SL-90W", "High-efficiency LED streetlight pole", 100, 292.8, 29280.0)]
+    samples = [
+        template.render(
+            client_name="", rows=sample_rows, subtotal=29280.0, vat_rate="15", vat_amount=4392.0, total=33672.0,
+            delivery_terms="", notes=None,
+        )
+        for template in get_email_templates().templates.values()
+    ]
+    return "".join(samples).encode("utf-8")[-32768:]
+
+
+DRAFT_DICTIONARY = _build_draft_dictionary()
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def compress_draft(draft: str) -> Any:
+    """zlib-compress a draft against DRAFT_DICTIONARY, keeping short drafts as text"""
+    if len(draft) < COMPRESS_MIN_CHARS:
+        return draft
+    compressor = zlib.compressobj(level=6, zdict=DRAFT_DICTIONARY)
+    return compressor.compress(draft.encode("utf-8")) + compressor.flush()
+
+
+def decompress_draft(draft: Any) -> str:
+    """Inverse of compress_draft"""
+    if isinstance(draft, str):
+        return draft
+    decompressor = zlib.decompressobj(zdict=DRAFT_DICTIONARY)
+    return (decompressor.decompress(draft) + decompressor.flush()).decode("utf-8")
+
+
+def _is_canonical(record: Dict[str, Any]) -> bool:
+    """Whether a record has exactly the QuotationResponse shape CompactQuotation encodes"""
+    if record.keys() != QUOTATION_FIELDS:
+        return False
+    client = record["client"]
+    if not isinstance(client, dict) or client.keys() != CLIENT_FIELDS:
+        return False
+    if not all(isinstance(record[field], float) for field in ("subtotal", "tax_rate", "tax_amount", "total")):
+        return False
+    for field in ("created_at", "valid_until"):
+        if not isinstance(record[field], datetime) or record[field].tzinfo is not None:
+            return False
+    if not isinstance(record["email_draft"], str) or not isinstance(record["delivery_terms"], str):
+        return False
+    for item in record["line_items"]:
+        if not isinstance(item, dict) or item.keys() != LINE_FIELDS or not isinstance(item["qty"], int):
+            return False
+        if not all(isinstance(item[field], float) for field in ("unit_cost", "margin_pct", "unit_price", "line_total")):
+            return False
+    return True
+
+
+class CompactQuotation:
+    """
+    Slotted quotation record.
+
+    Numbers are packed into one buffer of doubles (totals, valid_until and
+    five values per line), repeated strings are interned, clients and
+    (sku, description) pairs are shared between records, and the email draft is
+    zlib-compressed until a reader asks for the full record.
+    """
+
+    __slots__ = (
+        "quotation_id", "client", "currency", "lines", "numbers",
+        "delivery_terms", "notes", "draft", "draft_status", "created_key",
+    )
+
+    def __init__(self, record: Dict[str, Any], created_key: str):
+        client = record["client"]
+        self.quotation_id = record["quotation_id"]
+        client_key = (client["name"], client["contact"], str(_value(client["lang"])))
+        self.client = _shared(_CLIENTS, _Client, client_key)
+        self.currency = sys.intern(str(_value(record["currency"])))
+        line_items = record["line_items"]
+        lines = []
+        numbers = [
+            record["subtotal"], record["tax_rate"], record["tax_amount"], record["total"],
+            (record["valid_until"] - EPOCH) / MICROSECOND,
+        ]
+        for item in line_items:
+            lines.append(_shared(_LINE_LABELS, _LineLabel, (item["sku"], item["description"])))
+            numbers.extend((item["qty"], item["unit_cost"], item["margin_pct"], item["unit_price"], item["line_total"]))
+        self.lines = tuple(lines)
+        # Plain bytes: a single allocation with a smaller header than an array
+        self.numbers = array("d", numbers).tobytes()
+
+        self.delivery_terms = sys.intern(record["delivery_terms"])
+        self.notes = record["notes"]
+        self.draft = compress_draft(record["email_draft"])
+        self.draft_status = sys.intern(str(_value(record["draft_status"])))
+        self.created_key = created_key
+
+    @property
+    def contact(self) -> str:
+        return self.client.contact
+
+    @property
+    def skus(self) -> Tuple[str, ...]:
+        return tuple(label.sku for label in self.lines)
+
+    @property
+    def total(self) -> float:
+        return _DOUBLE.unpack_from(self.numbers, 3 * _DOUBLE.size)[0]
+
+    def with_draft(self, email_draft: str, draft_status: Any) -> "CompactQuotation":
+        """Copy of this record with a new email draft"""
+        copy = CompactQuotation.__new__(CompactQuotation)
+        for slot in CompactQuotation.__slots__:
+            setattr(copy, slot, getattr(self, slot))
+        copy.draft = compress_draft(email_draft)
+        copy.draft_status = sys.intern(str(_value(draft_status)))
+        return copy
+
+    def to_dict(self) -> Dict[str, Any]:
+        numbers = array("d", self.numbers)
+        line_items = []
+        for index, label in enumerate(self.lines):
+            qty, unit_cost, margin_pct, unit_price, line_total = numbers[5 + 5 * index:10 + 5 * index]
+            line_items.append({
+                "sku": label.sku,
+                "description": label.description,
+                "qty": int(qty),
+                "unit_cost": unit_cost,
+                "margin_pct": margin_pct,
+                "unit_price": unit_price,
+                "line_total": line_total,
+            })
+        client = self.client
+        return {
+            "quotation_id": self.quotation_id,
+            "client": {"name": client.name, "contact": client.contact, "lang": client.lang},
+            "currency": self.currency,
+            "line_items": line_items,
+            "subtotal": numbers[0],
+            "tax_rate": numbers[1],
+            "tax_amount": numbers[2],
+            "total": numbers[3],
+            "delivery_terms": self.delivery_terms,
+            "notes": self.notes,
+            "email_draft": decompress_draft(self.draft),
+            "draft_status": self.draft_status,
+            "created_at": datetime.fromisoformat(self.created_key),
+            "valid_until": EPOCH + int(numbers[4]) * MICROSECOND,
+        }
+
+
+class RawQuotation:
+    """Record that does not have the canonical shape, kept as a plain dict"""
+
+    __slots__ = ("record", "created_key")
+
+    def __init__(self, record: Dict[str, Any], created_key: str):
+        self.record = record
+        self.created_key = created_key
+
+    @property
+    def quotation_id(self) -> str:
+        return self.record["quotation_id"]
+
+    @property
+    def contact(self) -> str:
+        return self.record["client"]["contact"]
+
+    @property
+    def skus(self) -> Tuple[str, ...]:
+        return tuple(item["sku"] for item in self.record.get("line_items", []))
+
+    @property
+    def currency(self) -> Any:
+        return self.record.get("currency")
+
+    @property
+    def total(self) -> float:
+        return self.record["total"]
+
+    def with_draft(self, email_draft: str, draft_status: Any) -> "RawQuotation":
+        return RawQuotation({**self.record, "email_draft": email_draft, "draft_status": draft_status}, self.created_key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.record
+
+
+def pack_quotation(record: Dict[str, Any], created_key: str) -> Any:
+    """
+    Encode a quotation record for in-memory storage
+
+    Args:
+        record: Quotation as produced by QuotationResponse.dict()
+        created_key: Sortable created_at string, shared with the store's index
+
+    Returns:
+        A CompactQuotation, or a RawQuotation wrapper for records that do
+        not have the canonical shape
+    """
+    if _is_canonical(record):
+        return CompactQuotation(record, created_key)
+    return RawQuotation(record, created_key)
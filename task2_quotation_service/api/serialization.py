@@ -0,0 +1,105 @@
+"""
+Fast JSON and MessagePack encoding for quotation payloads
+"""
+
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(value: Any) -> Any:
+    """Encode the types stored quotations contain beyond plain JSON"""
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def dumps_json(content: Any) -> bytes:
+    """
+    Encode content as compact UTF-8 JSON
+
+    Uses orjson when it is installed; models, enums and datetimes are
+    encoded directly instead of going through FastAPI's jsonable_encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    """Encode content as MessagePack (requires the msgpack package)"""
+    return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_json"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    """MessagePack response for machine clients"""
+
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """Whether an Accept header explicitly asks for MessagePack"""
+    if msgpack is None or not accept:
+        return False
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.partition(";")
+        if media_type.strip().lower() not in MSGPACK_MEDIA_TYPES:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            return True
+    return False
+
+
+def negotiated_response(
+    content: Any,
+    accept: Optional[str] = None,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Encode content as MessagePack when the client asks for it, JSON otherwise
+
+    Returning a Response directly also skips FastAPI's response_model
+    re-validation and jsonable_encoder pass.
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    response_class = MsgPackResponse if accepts_msgpack(accept) else FastJSONResponse
+    return response_class(content, status_code=status_code, headers=headers)
@@ -0,0 +1,275 @@
+"""
+Idempotency keys and draft cache shared by every worker process
+
+Quotations are already shared through the SQLite store. With
+``uvicorn --workers N`` each process still has its own idempotency table
+and draft cache, so a retry landing on another worker creates a second
+quotation and every worker pays for the same LLM draft. The classes here
+keep the in-process caches as a first tier and put a SQLite file behind
+them that all workers on the host open.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from draft_cache import DraftCache
+from idempotency import IdempotencyCache, IdempotencyConflict
+
+
+class SharedStateDB:
+    """
+    SQLite file holding cross-worker state.
+
+    Same connection model as SQLiteQuotationStore: WAL mode, one connection
+    per thread, and BEGIN IMMEDIATE for read-modify-write so two processes
+    cannot claim the same idempotency key.
+    """
+
+    SCHEMA = (
+        # result is NULL while the owning worker is still generating it;
+        # expires_at is then the lease after which another worker may take over
+        """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            result TEXT,
+            expires_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at)",
+        """
+        CREATE TABLE IF NOT EXISTS draft_cache (
+            key TEXT PRIMARY KEY,
+            draft TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_draft_cache_expires_at ON draft_cache (expires_at)",
+    )
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SharedDraftCache(DraftCache):
+    """
+    DraftCache whose misses fall through to the shared SQLite table.
+
+    Drafts found there are copied into this process's LRU with their
+    remaining TTL; every new draft is written to both tiers. The shared
+    table keeps at most max_entries unexpired drafts.
+
+    The synchronous methods block on SQLite and are meant for worker
+    threads; event-loop callers use get_async, put_async and
+    get_or_create, which run the SQLite work on the default executor.
+    """
+
+    def __init__(self, db: SharedStateDB, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.db = db
+        self.shared_hits = 0
+
+    def _load_shared(self, key: str) -> None:
+        """Copy key's draft from the shared table into this process's LRU, unless already cached"""
+        with self._lock:
+            if self._lookup(key) is not None:
+                return
+        now = time.time()
+        row = self.db.connection().execute(
+            "SELECT draft, expires_at FROM draft_cache WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        if row is None:
+            return
+        draft, expires_at = row
+        size = len(draft.encode("utf-8"))
+        if size <= self.max_bytes:
+            with self._lock:
+                self._insert(key, draft, size, expires_at - now)
+                self.shared_hits += 1
+
+    def get(self, key: str) -> Optional[str]:
+        self._load_shared(key)
+        return super().get(key)
+
+    async def get_async(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.get, key)
+
+    def get_or_create_sync(self, key: str, factory: Callable[[], str]) -> str:
+        self._load_shared(key)
+        return super().get_or_create_sync(key, factory)
+
+    async def get_or_create(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        with self._lock:
+            known = key in self._inflight or self._lookup(key) is not None
+        if not known:
+            await asyncio.to_thread(self._load_shared, key)
+        return await super().get_or_create(key, factory)
+
+    def put(self, key: str, draft: str) -> None:
+        super().put(key, draft)
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO draft_cache (key, draft, expires_at) VALUES (?, ?, ?)",
+                (key, draft, now + self.ttl_seconds),
+            )
+            conn.execute("DELETE FROM draft_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM draft_cache WHERE key IN ("
+                " SELECT key FROM draft_cache ORDER BY expires_at"
+                " LIMIT max(0, (SELECT COUNT(*) FROM draft_cache) - ?))",
+                (self.max_entries,),
+            )
+
+    async def put_async(self, key: str, draft: str) -> None:
+        await asyncio.to_thread(self.put, key, draft)
+
+    def clear(self) -> None:
+        super().clear()
+        conn = self.db.connection()
+        with conn:
+            conn.execute("DELETE FROM draft_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["shared_hits"] = self.shared_hits
+        return stats
+
+
+class SharedIdempotencyCache(IdempotencyCache):
+    """
+    IdempotencyCache whose keys are claimed in the shared SQLite table.
+
+    The first worker to insert a key generates the result; a duplicate on
+    another worker polls until the result is stored and then replays it.
+    Results cross processes as text, so the cache takes an encode/decode
+    pair (e.g. QuotationResponse.json / QuotationResponse.parse_raw). A
+    claim whose worker died is taken over once lease_seconds have passed.
+    """
+
+    def __init__(
+        self,
+        db: SharedStateDB,
+        encode: Callable[[Any], str],
+        decode: Callable[[str], Any],
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400.0,
+        lease_seconds: float = 300.0,
+        poll_interval: float = 0.05,
+    ):
+        super().__init__(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.db = db
+        self.encode = encode
+        self.decode = decode
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    def _claim(self, key: str, fingerprint: str) -> Tuple[bool, Optional[str]]:
+        """
+        Try to become the worker that generates key's result
+
+        Returns:
+            (True, None) if this worker claimed the key, otherwise (False, the
+            encoded result or None while the owner is still working)
+        """
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, fingerprint, result, expires_at) VALUES (?, ?, NULL, ?)",
+                (key, fingerprint, now + self.lease_seconds),
+            )
+            if cursor.rowcount:
+                return True, None
+            stored_fingerprint, result = conn.execute(
+                "SELECT fingerprint, result FROM idempotency_keys WHERE key = ?", (key,)
+            ).fetchone()
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflict(key)
+        return False, result
+
+    def _release(self, key: str) -> None:
+        """Drop this worker's unfinished claim on key"""
+        conn = self.db.connection()
+        with conn:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND result IS NULL", (key,))
+
+    def _store(self, key: str, encoded: str) -> None:
+        """Save key's encoded result for the other workers"""
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE idempotency_keys SET result = ?, expires_at = ? WHERE key = ?",
+                (encoded, now + self.ttl_seconds, key),
+            )
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+            # Oldest results go first; in-flight claims are never trimmed
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE key IN ("
+                " SELECT key FROM idempotency_keys WHERE result IS NOT NULL ORDER BY expires_at"
+                " LIMIT max(0, (SELECT COUNT(*) FROM idempotency_keys WHERE result IS NOT NULL) - ?))",
+                (self.max_entries,),
+            )
+
+    async def _fill(self, key: str, fingerprint: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        # SQLite calls may wait up to busy_timeout for the write lock, so they
+        # run on the default executor rather than stalling the event loop
+        while True:
+            claimed, encoded = await asyncio.to_thread(self._claim, key, fingerprint)
+            if claimed:
+                break
+            if encoded is not None:
+                result = self.decode(encoded)
+                self._remember(key, fingerprint, result)
+                return result, True
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            result = await factory()
+        except BaseException:
+            # Failed requests are not remembered, so the client can retry
+            await asyncio.to_thread(self._release, key)
+            raise
+
+        await asyncio.to_thread(self._store, key, self.encode(result))
+        self._remember(key, fingerprint, result)
+        return result, False
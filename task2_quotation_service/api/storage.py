@@ -0,0 +1,711 @@
+"""
+Storage backends for generated quotations
+"""
+
+import base64
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from array import array
+from datetime import date, datetime
+from enum import Enum
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple
+
+from quotation_ids import quotation_id_ranges
+from records import RawQuotation, pack_quotation
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    """Encode values the standard JSON encoder does not understand"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _sortable_timestamp(value: Any) -> str:
+    """Normalize a created_at value to a fixed-width, lexicographically sortable string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        # Stored timestamps are naive local time
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def encode_cursor(created_at: str, quotation_id: str) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor"""
+    raw = json.dumps([created_at, quotation_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, quotation_id = json.loads(raw)
+        return str(created_at), str(quotation_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def _remove_sorted(keys: List[Any], key: Any) -> None:
+    """Remove a key from a sorted key list if present"""
+    index = bisect.bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        del keys[index]
+
+
+def _discard_from_index(index: Dict[str, List[str]], value: str, quotation_id: str) -> None:
+    """Remove a quotation ID from a value -> IDs index, dropping empty entries"""
+    ids = index.get(value)
+    if ids is not None and quotation_id in ids:
+        ids.remove(quotation_id)
+        if not ids:
+            del index[value]
+
+
+class _TotalIndex:
+    """Quotation IDs sorted by total, as parallel arrays (16 bytes per entry)"""
+
+    __slots__ = ("totals", "ids")
+
+    def __init__(self):
+        self.totals = array("d")
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def insert(self, total: float, quotation_id: str) -> None:
+        index = bisect.bisect_right(self.totals, total)
+        self.totals.insert(index, total)
+        self.ids.insert(index, quotation_id)
+
+    def extend(self, keys: List[Tuple[float, str]]) -> None:
+        """Add many (total, quotation_id) keys with one sort"""
+        merged = sorted(chain(zip(self.totals, self.ids), keys))
+        self.totals = array("d", [key[0] for key in merged])
+        self.ids = [key[1] for key in merged]
+
+    def remove(self, total: float, quotation_id: str) -> None:
+        index = bisect.bisect_left(self.totals, total)
+        while index < len(self.ids) and self.totals[index] == total:
+            if self.ids[index] == quotation_id:
+                del self.totals[index]
+                del self.ids[index]
+                return
+            index += 1
+
+    def bounds(self, min_total: Optional[float], max_total: Optional[float]) -> Tuple[int, int]:
+        """Slice of ids whose total lies in [min_total, max_total]"""
+        lo = bisect.bisect_left(self.totals, min_total) if min_total is not None else 0
+        hi = bisect.bisect_right(self.totals, max_total) if max_total is not None else len(self.ids)
+        return lo, max(hi, lo)
+
+
+class QuotationStore(ABC):
+    """Interface every quotation storage backend implements"""
+
+    # Whether calls may wait on disk or locks; async callers then make them
+    # on a worker thread instead of the event loop
+    blocking_io = False
+
+    @abstractmethod
+    def save(self, quotation: Dict[str, Any]) -> None:
+        """Insert or replace a quotation record"""
+
+    def save_many(self, quotations: List[Dict[str, Any]]) -> None:
+        """Insert or replace several quotation records"""
+        for quotation in quotations:
+            self.save(quotation)
+
+    @abstractmethod
+    def get(self, quotation_id: str) -> Optional[Dict[str, Any]]:
+        """Return a quotation record or None"""
+
+    def exists(self, quotation_id: str) -> bool:
+        """Whether a quotation is stored, without decoding it"""
+        return self.get(quotation_id) is not None
+
+    @abstractmethod
+    def update_draft(self, quotation_id: str, email_draft: str, draft_status: str) -> bool:
+        """Replace the email draft of a stored quotation, returning whether it existed"""
+
+    @abstractmethod
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Return quotation records ordered by creation time"""
+
+    @abstractmethod
+    def list_page(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return the page of quotations after cursor, ordered by creation time
+
+        The cost of a page does not depend on how deep it is. The returned
+        cursor is None once the last page has been reached.
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        client_contact: Optional[str] = None,
+        sku: Optional[str] = None,
+        currency: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_total: Optional[float] = None,
+        max_total: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return quotations matching every given filter, ordered by creation time
+
+        created_from is inclusive and created_to exclusive; min_total and
+        max_total are inclusive. Filters are answered from secondary indexes.
+        """
+
+    @abstractmethod
+    def scan(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return quotations created in [created_from, created_to), ordered by quotation_id
+
+        Quotation IDs sort by creation time (see quotation_ids), so the
+        window maps to primary-key ranges and no secondary index is needed.
+        Pass the last ID of a batch as ``after`` to resume the scan. Only
+        IDs in the formats the service issues are guaranteed to be found.
+        """
+
+    @abstractmethod
+    def delete(self, quotation_id: str) -> bool:
+        """Delete a quotation record, returning whether it existed"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Return the number of stored quotations"""
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
+
+
+class InMemoryQuotationStore(QuotationStore):
+    """
+    Process-local dict store, useful for tests and mock deployments.
+
+    Secondary indexes mirror the SQLite ones: client contact and SKU map to
+    lists of quotation IDs (a list costs 8 bytes per entry, a set several
+    times that), and created_at and total are kept as sorted key
+    lists, so searches never scan every stored quotation. Records are kept
+    as CompactQuotation objects unless ``compact`` is False.
+    """
+
+    def __init__(self, compact: bool = True):
+        self.compact = compact
+        self._quotations: Dict[str, Any] = {}
+        # Sorted (created_at, quotation_id) keys backing time-ordered pagination
+        self._order: List[Tuple[str, str]] = []
+        # Sorted quotation IDs backing primary-key range scans
+        self._ids: List[str] = []
+        self._by_total = _TotalIndex()
+        self._by_client: Dict[str, List[str]] = {}
+        self._by_sku: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def _pack(self, quotation: Dict[str, Any]) -> Any:
+        created_key = _sortable_timestamp(quotation["created_at"])
+        if self.compact:
+            return pack_quotation(quotation, created_key)
+        return RawQuotation(quotation, created_key)
+
+    def save(self, quotation: Dict[str, Any]) -> None:
+        stored = self._pack(quotation)
+        with self._lock:
+            previous = self._quotations.get(stored.quotation_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._quotations[stored.quotation_id] = stored
+            self._index(stored)
+
+    def save_many(self, quotations: List[Dict[str, Any]]) -> None:
+        # Append and re-sort once instead of inserting into the sorted lists one by one
+        batch = {quotation["quotation_id"]: self._pack(quotation) for quotation in quotations}
+        with self._lock:
+            # Unindex replaced records while the sorted lists are still sorted
+            for quotation_id in batch:
+                previous = self._quotations.get(quotation_id)
+                if previous is not None:
+                    self._unindex(previous)
+            total_keys = []
+            for quotation_id, stored in batch.items():
+                self._quotations[quotation_id] = stored
+                self._index(stored, insort=False)
+                total_keys.append((stored.total, quotation_id))
+            self._order.sort()
+            self._ids.sort()
+            self._by_total.extend(total_keys)
+
+    def _index(self, stored: Any, insort: bool = True) -> None:
+        """Add a quotation to every secondary index; caller holds the lock"""
+        quotation_id = stored.quotation_id
+        order_key = (stored.created_key, quotation_id)
+        if insort:
+            bisect.insort(self._order, order_key)
+            bisect.insort(self._ids, quotation_id)
+            self._by_total.insert(stored.total, quotation_id)
+        else:
+            # save_many sorts _order and _ids and adds the totals in one pass
+            self._order.append(order_key)
+            self._ids.append(quotation_id)
+        self._by_client.setdefault(stored.contact.lower(), []).append(quotation_id)
+        for sku in dict.fromkeys(stored.skus):
+            self._by_sku.setdefault(sku, []).append(quotation_id)
+
+    def _unindex(self, stored: Any) -> None:
+        """Remove a quotation from every secondary index; caller holds the lock"""
+        quotation_id = stored.quotation_id
+        _remove_sorted(self._order, (stored.created_key, quotation_id))
+        _remove_sorted(self._ids, quotation_id)
+        self._by_total.remove(stored.total, quotation_id)
+        _discard_from_index(self._by_client, stored.contact.lower(), quotation_id)
+        for sku in dict.fromkeys(stored.skus):
+            _discard_from_index(self._by_sku, sku, quotation_id)
+
+    def get(self, quotation_id: str) -> Optional[Dict[str, Any]]:
+        stored = self._quotations.get(quotation_id)
+        return stored.to_dict() if stored is not None else None
+
+    def exists(self, quotation_id: str) -> bool:
+        return quotation_id in self._quotations
+
+    def update_draft(self, quotation_id: str, email_draft: str, draft_status: str) -> bool:
+        with self._lock:
+            stored = self._quotations.get(quotation_id)
+            if stored is None:
+                return False
+            # Replace rather than mutate so readers holding the old record see a consistent one
+            self._quotations[quotation_id] = stored.with_draft(email_draft, draft_status)
+            return True
+
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            stored = [self._quotations[key[1]] for key in self._order[offset:offset + limit]]
+        return [record.to_dict() for record in stored]
+
+    def list_page(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        with self._lock:
+            start = bisect.bisect_right(self._order, decode_cursor(cursor)) if cursor else 0
+            keys = self._order[start:start + limit]
+            stored = [self._quotations[key[1]] for key in keys]
+            has_more = start + limit < len(self._order)
+        return [record.to_dict() for record in stored], encode_cursor(*keys[-1]) if keys and has_more else None
+
+    def search(
+        self,
+        client_contact: Optional[str] = None,
+        sku: Optional[str] = None,
+        currency: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_total: Optional[float] = None,
+        max_total: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Each filter becomes a candidate source with a cheap size estimate;
+            # the smallest one drives and the rest are checked per candidate.
+            sources = []
+            if client_contact is not None:
+                ids = self._by_client.get(client_contact.lower(), [])
+                sources.append((len(ids), lambda ids=ids: ids))
+            if sku is not None:
+                ids = self._by_sku.get(sku, [])
+                sources.append((len(ids), lambda ids=ids: ids))
+            if created_from is not None or created_to is not None:
+                lo = bisect.bisect_left(self._order, (_sortable_timestamp(created_from), "")) if created_from else 0
+                hi = bisect.bisect_left(self._order, (_sortable_timestamp(created_to), "")) if created_to else len(self._order)
+                sources.append((max(hi - lo, 0), lambda lo=lo, hi=hi: (key[1] for key in self._order[lo:hi])))
+            if min_total is not None or max_total is not None:
+                lo, hi = self._by_total.bounds(min_total, max_total)
+                sources.append((hi - lo, lambda lo=lo, hi=hi: self._by_total.ids[lo:hi]))
+
+            if not sources:
+                candidates = (key[1] for key in self._order)
+            else:
+                candidates = min(sources, key=lambda source: source[0])[1]()
+
+            created_from_key = _sortable_timestamp(created_from) if created_from else None
+            created_to_key = _sortable_timestamp(created_to) if created_to else None
+            client_key = client_contact.lower() if client_contact is not None else None
+
+            matches = []
+            for quotation_id in candidates:
+                stored = self._quotations[quotation_id]
+                if client_key is not None and stored.contact.lower() != client_key:
+                    continue
+                if sku is not None and sku not in stored.skus:
+                    continue
+                if currency is not None and stored.currency != currency:
+                    continue
+                if min_total is not None and stored.total < min_total:
+                    continue
+                if max_total is not None and stored.total > max_total:
+                    continue
+                if created_from_key and stored.created_key < created_from_key:
+                    continue
+                if created_to_key and stored.created_key >= created_to_key:
+                    continue
+                matches.append(stored)
+
+        matches.sort(key=lambda stored: (stored.created_key, stored.quotation_id))
+        return [stored.to_dict() for stored in matches[:limit]]
+
+    def scan(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        created_from_key = _sortable_timestamp(created_from) if created_from is not None else None
+        created_to_key = _sortable_timestamp(created_to) if created_to is not None else None
+        matches = []
+        with self._lock:
+            for low, high in quotation_id_ranges(created_from, created_to):
+                if after is not None:
+                    low = max(low, after + "\0")
+                position = bisect.bisect_left(self._ids, low)
+                while position < len(self._ids) and len(matches) < limit:
+                    quotation_id = self._ids[position]
+                    if quotation_id >= high:
+                        break
+                    position += 1
+                    stored = self._quotations[quotation_id]
+                    if created_from_key and stored.created_key < created_from_key:
+                        continue
+                    if created_to_key and stored.created_key >= created_to_key:
+                        continue
+                    matches.append(stored)
+        return [stored.to_dict() for stored in matches]
+
+    def delete(self, quotation_id: str) -> bool:
+        with self._lock:
+            stored = self._quotations.pop(quotation_id, None)
+            if stored is None:
+                return False
+            self._unindex(stored)
+            return True
+
+    def count(self) -> int:
+        return len(self._quotations)
+
+
+class SQLiteQuotationStore(QuotationStore):
+    """
+    SQLite-backed store shared by every worker pointing at the same file.
+
+    The database runs in WAL mode so readers never block the writer, and
+    each thread gets its own connection. Lookups go through the primary key,
+    listing through the created_at index, and client/SKU filters through
+    their own secondary indexes.
+    """
+
+    blocking_io = True
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS quotations (
+            quotation_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            client_contact TEXT NOT NULL,
+            total REAL NOT NULL,
+            payload TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_quotations_created_at ON quotations (created_at, quotation_id)",
+        "CREATE INDEX IF NOT EXISTS idx_quotations_client_contact ON quotations (client_contact, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_quotations_total ON quotations (total, quotation_id)",
+        """
+        CREATE TABLE IF NOT EXISTS quotation_items (
+            quotation_id TEXT NOT NULL,
+            sku TEXT NOT NULL,
+            PRIMARY KEY (quotation_id, sku)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_quotation_items_sku ON quotation_items (sku, quotation_id)",
+        # Row count maintained by triggers so total counts never scan the table
+        """
+        CREATE TABLE IF NOT EXISTS quotation_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO quotation_stats (id, total) SELECT 1, COUNT(*) FROM quotations",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_quotations_count_insert AFTER INSERT ON quotations
+        BEGIN UPDATE quotation_stats SET total = total + 1 WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_quotations_count_delete AFTER DELETE ON quotations
+        BEGIN UPDATE quotation_stats SET total = total - 1 WHERE id = 1; END
+        """,
+    )
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.timeout = timeout
+        if path == ":memory:":
+            # A named shared-cache database lets every thread see the same data
+            self.path = f"file:quotations-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+        else:
+            self.path = path
+            self._uri = False
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        # Keep one connection open for the lifetime of the store so a shared
+        # in-memory database is not dropped between requests
+        conn = self._connection()
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                uri=self._uri,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def save(self, quotation: Dict[str, Any]) -> None:
+        self.save_many([quotation])
+
+    def save_many(self, quotations: List[Dict[str, Any]]) -> None:
+        if not quotations:
+            return
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for quotation in quotations:
+                self._write(conn, quotation)
+
+    def _write(self, conn: sqlite3.Connection, quotation: Dict[str, Any]) -> None:
+        """Write one quotation and its SKU index rows inside an open transaction"""
+        quotation_id = quotation["quotation_id"]
+        skus = {item["sku"] for item in quotation.get("line_items", [])}
+        payload = json.dumps(quotation, default=_json_default, ensure_ascii=False)
+
+        # An upsert, unlike INSERT OR REPLACE, never fires the delete/insert count triggers for existing rows
+        conn.execute(
+            "INSERT INTO quotations (quotation_id, created_at, client_contact, total, payload) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (quotation_id) DO UPDATE SET created_at = excluded.created_at, "
+            "client_contact = excluded.client_contact, total = excluded.total, payload = excluded.payload",
+            (
+                quotation_id,
+                _sortable_timestamp(quotation["created_at"]),
+                quotation["client"]["contact"].lower(),
+                quotation["total"],
+                payload,
+            ),
+        )
+        conn.execute("DELETE FROM quotation_items WHERE quotation_id = ?", (quotation_id,))
+        conn.executemany(
+            "INSERT INTO quotation_items (quotation_id, sku) VALUES (?, ?)",
+            [(quotation_id, sku) for sku in skus],
+        )
+
+    def get(self, quotation_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT payload FROM quotations WHERE quotation_id = ?", (quotation_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def exists(self, quotation_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM quotations WHERE quotation_id = ?", (quotation_id,)
+        ).fetchone()
+        return row is not None
+
+    def update_draft(self, quotation_id: str, email_draft: str, draft_status: str) -> bool:
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE quotations SET payload = json_set(payload, '$.email_draft', ?, '$.draft_status', ?) "
+                "WHERE quotation_id = ?",
+                (email_draft, str(getattr(draft_status, "value", draft_status)), quotation_id),
+            )
+        return cursor.rowcount > 0
+
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT payload FROM quotations ORDER BY created_at, quotation_id LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def list_page(self, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        conn = self._connection()
+        if cursor:
+            rows = conn.execute(
+                "SELECT created_at, quotation_id, payload FROM quotations "
+                "WHERE (created_at, quotation_id) > (?, ?) "
+                "ORDER BY created_at, quotation_id LIMIT ?",
+                (*decode_cursor(cursor), limit + 1),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT created_at, quotation_id, payload FROM quotations "
+                "ORDER BY created_at, quotation_id LIMIT ?",
+                (limit + 1,),
+            ).fetchall()
+
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1][0], page[-1][1]) if len(rows) > limit else None
+        return [json.loads(row[2]) for row in page], next_cursor
+
+    def search(
+        self,
+        client_contact: Optional[str] = None,
+        sku: Optional[str] = None,
+        currency: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_total: Optional[float] = None,
+        max_total: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        # Every filter maps onto an indexed column (or the SKU index via a
+        # subquery); the planner drives from the most selective one and
+        # checks the rest against the row it fetched by primary key.
+        conditions, params = [], []
+        if client_contact is not None:
+            conditions.append("client_contact = ?")
+            params.append(client_contact.lower())
+        if sku is not None:
+            conditions.append("quotation_id IN (SELECT quotation_id FROM quotation_items WHERE sku = ?)")
+            params.append(sku)
+        if created_from is not None:
+            conditions.append("created_at >= ?")
+            params.append(_sortable_timestamp(created_from))
+        if created_to is not None:
+            conditions.append("created_at < ?")
+            params.append(_sortable_timestamp(created_to))
+        if min_total is not None:
+            conditions.append("total >= ?")
+            params.append(min_total)
+        if max_total is not None:
+            conditions.append("total <= ?")
+            params.append(max_total)
+        if currency is not None:
+            conditions.append("json_extract(payload, '$.currency') = ?")
+            params.append(currency)
+
+        query = "SELECT payload FROM quotations"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at, quotation_id LIMIT ?"
+        params.append(limit)
+
+        rows = self._connection().execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def scan(
+        self,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        after: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        # The ID ranges are disjoint and ascending, so scanning them in turn
+        # keeps primary-key order without a sort. created_at is only a
+        # residual check for legacy IDs from the boundary days; the unary +
+        # keeps the planner off the created_at index.
+        residual, residual_params = "", []
+        if created_from is not None:
+            residual += " AND +created_at >= ?"
+            residual_params.append(_sortable_timestamp(created_from))
+        if created_to is not None:
+            residual += " AND +created_at < ?"
+            residual_params.append(_sortable_timestamp(created_to))
+
+        conn = self._connection()
+        rows = []
+        for low, high in quotation_id_ranges(created_from, created_to):
+            if after is not None:
+                if after >= high:
+                    continue
+                low = max(low, after + "\0")
+            rows.extend(conn.execute(
+                "SELECT payload FROM quotations WHERE quotation_id >= ? AND quotation_id < ?"
+                + residual + " ORDER BY quotation_id LIMIT ?",
+                (low, high, *residual_params, limit - len(rows)),
+            ).fetchall())
+            if len(rows) >= limit:
+                break
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, quotation_id: str) -> bool:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute("DELETE FROM quotations WHERE quotation_id = ?", (quotation_id,))
+            conn.execute("DELETE FROM quotation_items WHERE quotation_id = ?", (quotation_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT total FROM quotation_stats WHERE id = 1").fetchone()[0]
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_store(database_url: str) -> QuotationStore:
+    """
+    Build a quotation store from a database URL
+
+    Supported URLs are ``sqlite:///path/to/file.db``, ``sqlite:///:memory:``
+    and ``memory://``. Anything else falls back to the in-memory store.
+    """
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        try:
+            return SQLiteQuotationStore(path)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to open SQLite store at {path}: {e}")
+    elif not database_url.startswith("memory://"):
+        logger.warning(f"Unsupported database URL {database_url!r}, using in-memory storage")
+    return InMemoryQuotationStore()
@@ -0,0 +1,57 @@
+"""
+JSON baselines for benchmark results
+
+Results map benchmark names to metrics, e.g.
+``{"llm": {"throughput_rps": 812.4, "p95_ms": 61.2}}``. Save a run as the
+baseline, then compare later runs against it to catch regressions.
+"""
+
+import json
+import platform
+from typing import Dict, Iterable, List
+
+Results = Dict[str, Dict[str, float]]
+
+
+def save(path: str, results: Results, **context) -> None:
+    """Write results with the interpreter and machine they were measured on"""
+    document = {
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        **context,
+        "results": results,
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(document, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def load(path: str) -> Results:
+    with open(path) as baseline_file:
+        return json.load(baseline_file)["results"]
+
+
+def compare(baseline: Results, current: Results, tolerance: float, higher_is_better: Iterable[str] = ()) -> List[str]:
+    """
+    Describe every metric that is worse than the baseline by more than tolerance
+
+    Args:
+        tolerance: Allowed relative change, e.g. 0.2 for 20%
+        higher_is_better: Metric names where a drop is the regression (throughput)
+
+    Returns:
+        One line per regression; metrics missing from the baseline are skipped
+    """
+    higher_is_better = set(higher_is_better)
+    regressions = []
+    for name, metrics in current.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if not reference:
+                continue
+            change = (value - reference) / reference
+            if metric in higher_is_better:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name} {metric}: {reference:.4g} -> {value:.4g} ({change:.0%} worse)")
+    return regressions
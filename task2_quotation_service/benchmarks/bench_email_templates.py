@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: string-concatenation email renderers vs precompiled Jinja2 templates
+
+Usage:
+    python benchmarks/bench_email_templates.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from email_templates import get_email_templates  # noqa: E402
+from models import ClientInfo, LineItem, QuotationRequest  # noqa: E402
+
+LINE_COUNTS = (10, 1_000, 10_000)
+
+
+def legacy_arabic_template(request, line_items, total):
+    """Arabic renderer as it was before the Jinja2 templates, with totals rounded to the cent like them"""
+    currency = request.currency.value
+    subject = f"عرض سعر - {request.client.name}"
+
+    body = f"""
+الموضوع: عرض سعر - {request.client.name}
+
+السيد/ة {request.client.name} المحترم/ة،
+
+السلام عليكم ورحمة الله وبركاته،
+
+نشكركم على اهتمامكم بمنتجات شركة الأروف للتكنولوجيا والإضاءة.
+
+نرفق لكم عرض السعر المطلوب:
+
+تفاصيل العرض:
+"""
+
+    for item in line_items:
+        body += f"""
+• المنتج: {item.sku} - {item.description}
+• الكمية: {item.qty} وحدة
+• السعر للوحدة: {item.unit_price} {currency}
+• المجموع: {item.line_total} {currency}
+"""
+
+    body += f"""
+المجموع الفرعي: {round(sum(item.line_total for item in line_items), 2)} {currency}
+ضريبة القيمة المضافة (15%): {round(total - round(sum(item.line_total for item in line_items), 2), 2)} {currency}
+المجموع الكلي: {total} {currency}
+
+شروط التسليم: {request.delivery_terms}
+
+ملاحظات: {request.notes or 'لا توجد ملاحظات إضافية'}
+
+هذا العرض صالح لمدة 30 يوماً من تاريخ الإصدار.
+
+نتطلع للتعاون معكم.
+
+مع أطيب التحيات،
+فريق المبيعات
+شركة الأروف للتكنولوجيا والإضاءة
+هاتف: +966 11 123 4567
+بريد إلكتروني: sales@alrouf.com
+    """
+
+    return f"Subject: {subject}\n\n{body.strip()}"
+
+def legacy_english_template(request, line_items, total):
+    """English renderer as it was before the Jinja2 templates, with totals rounded to the cent like them"""
+    currency = request.currency.value
+    subject = f"Quotation - {request.client.name}"
+
+    body = f"""
+Subject: Quotation - {request.client.name}
+
+Dear {request.client.name},
+
+Thank you for your interest in Alrouf Lighting Technology products.
+
+Please find below our quotation for your requirements:
+
+Quotation Details:
+"""
+
+    for item in line_items:
+        body += f"""
+• Product: {item.sku} - {item.description}
+• Quantity: {item.qty} units
+• Unit Price: {item.unit_price} {currency}
+• Line Total: {item.line_total} {currency}
+"""
+
+    body += f"""
+Subtotal: {round(sum(item.line_total for item in line_items), 2)} {currency}
+VAT (15%): {round(total - round(sum(item.line_total for item in line_items), 2), 2)} {currency}
+Total: {total} {currency}
+
+Delivery Terms: {request.delivery_terms}
+
+Notes: {request.notes or 'No additional notes'}
+
+This quotation is valid for 30 days from the date of issue.
+
+We look forward to working with you.
+
+Best regards,
+Sales Team
+Alrouf Lighting Technology
+Phone: +966 11 123 4567
+Email: sales@alrouf.com
+    """
+
+    return f"Subject: {subject}\n\n{body.strip()}"
+
+
+def build_quotation(lang, line_count):
+    """Build a request and priced line items with the given number of lines"""
+    request = QuotationRequest(
+        client=ClientInfo(name="Gulf Eng.", contact="omar@client.com", lang=lang),
+        currency="SAR",
+        items=[{"sku": "ALR-SL-90W", "qty": 1, "unit_cost": 240.0, "margin_pct": 22}],
+        delivery_terms="DAP Dammam, 4 weeks",
+        notes="Client asked for spec compliance with Tarsheed.",
+    )
+    line_items = [
+        LineItem(
+            sku="ALR-SL-90W",
+            description="High-efficiency LED streetlight pole with 90W output",
+            qty=i % 100 + 1,
+            unit_cost=240.0,
+            margin_pct=22.0,
+            unit_price=292.8,
+            line_total=round(292.8 * (i % 100 + 1), 2),
+        )
+        for i in range(line_count)
+    ]
+    subtotal = sum(item.line_total for item in line_items)
+    return request, line_items, round(subtotal * 1.15, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions, best one is reported")
+    args = parser.parse_args()
+
+    templates = get_email_templates()
+    legacy = {"en": legacy_english_template, "ar": legacy_arabic_template}
+
+    print(f"{'lang':<5}{'lines':>8}{'legacy ms':>12}{'jinja2 ms':>12}{'speedup':>10}")
+    for lang in ("en", "ar"):
+        for line_count in LINE_COUNTS:
+            request, line_items, total = build_quotation(lang, line_count)
+            if legacy[lang](request, line_items, total) != templates.render(request, line_items, total):
+                raise SystemExit(f"Renderers disagree for lang={lang} lines={line_count}")
+
+            number = max(1, 10_000 // line_count)
+            legacy_time = min(timeit.repeat(
+                lambda: legacy[lang](request, line_items, total), number=number, repeat=args.repeat
+            )) / number
+            jinja_time = min(timeit.repeat(
+                lambda: templates.render(request, line_items, total), number=number, repeat=args.repeat
+            )) / number
+            print(
+                f"{lang:<5}{line_count:>8}{legacy_time * 1000:>12.3f}{jinja_time * 1000:>12.3f}"
+                f"{legacy_time / jinja_time:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
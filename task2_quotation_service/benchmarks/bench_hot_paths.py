@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark and regression check for the per-request hot paths
+
+Times, for quotations of 1 to 10,000 lines:
+
+    price_quotation       QuotationService._price_quotation
+    english_template      QuotationService._generate_english_template
+    arabic_template       QuotationService._generate_arabic_template
+    request_validation    QuotationRequest.parse_obj on the raw request body
+    response_dict         QuotationResponse.dict()
+
+Each timing is the median of --repeat runs, in microseconds per call;
+every run makes as many calls as it takes to last at least --min-time
+seconds. Metrics are disabled so stage timers are not measured.
+
+Save a run with --save-baseline; --baseline reruns the suite and exits 1
+if any path is slower than the baseline by more than --tolerance. Shared
+runners drift in speed by 2x over minutes, so raw timings are not
+compared. Every run of a path is paired with a run of a fixed
+pure-Python calibration loop just before it, and the median of the
+path/calibration ratios is what gets compared. A path over the tolerance
+is timed again, up to --retries times, and only fails if it is still
+over.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--lines 1,10,100,1000,10000] [--repeat N] [--min-time S]
+        [--save-baseline FILE | --baseline FILE [--tolerance 0.25] [--retries N]]
+"""
+
+import argparse
+import math
+import os
+import statistics
+import sys
+import timeit
+
+import baseline
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+os.environ["METRICS_ENABLED"] = "false"
+os.environ["USE_MOCK_SERVICES"] = "True"
+
+from models import QuotationRequest  # noqa: E402
+from quotation_service import QuotationService  # noqa: E402
+from storage import InMemoryQuotationStore  # noqa: E402
+
+LINE_COUNTS = (1, 10, 100, 1_000, 10_000)
+SKUS = ("ALR-SL-90W", "ALR-SL-120W", "ALR-SL-60W", "ALR-OBL-12V", "ALR-FL-50W")
+
+
+def build_body(line_count):
+    """Raw POST /quote body with line_count lines over the bundled catalog"""
+    return {
+        "client": {"name": "Gulf Eng.", "contact": "omar@client.com", "lang": "en"},
+        "currency": "SAR",
+        "items": [
+            {"sku": SKUS[i % len(SKUS)], "qty": i % 100 + 1, "unit_cost": 240.0 + i % 7, "margin_pct": 22}
+            for i in range(line_count)
+        ],
+        "delivery_terms": "DAP Dammam, 4 weeks",
+        "notes": "Client asked for spec compliance with Tarsheed.",
+    }
+
+
+def hot_paths(service, line_count):
+    """Callables for every hot path, prepared for a quotation of line_count lines"""
+    body = build_body(line_count)
+    request = QuotationRequest.parse_obj(body)
+    priced = service._price_quotation(request)
+    line_items, total = priced.line_items, priced.total
+    response = service._build_response(request, priced, service._generate_english_template(request, line_items, total))
+    return {
+        "price_quotation": lambda: service._price_quotation(request),
+        "english_template": lambda: service._generate_english_template(request, line_items, total),
+        "arabic_template": lambda: service._generate_arabic_template(request, line_items, total),
+        "request_validation": lambda: QuotationRequest.parse_obj(body),
+        "response_dict": lambda: response.dict(),
+    }
+
+
+def calibration_loop():
+    """Fixed interpreter-bound work: dict and attribute access, string formatting"""
+    rows = {}
+    for index in range(2_000):
+        rows[f"ALR-{index % 50}"] = rows.get(f"ALR-{index % 50}", 0.0) + index * 1.15
+    return rows
+
+
+def calls_per_run(call, min_time):
+    """Number of calls that makes one timing run last at least min_time seconds"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(call, number=number)
+        if elapsed >= min_time:
+            return number
+        # Extrapolate once a run is long enough to time reliably
+        number = number * 10 if elapsed < min_time / 100 else math.ceil(number * min_time / elapsed * 1.05)
+
+
+def measure(call, repeat, min_time, calibration_calls):
+    """
+    Time call against the calibration loop
+
+    Returns:
+        Dict with the median seconds per call ("us", in microseconds) and
+        the median ratio to a calibration run made just before each run
+        ("relative"), which is what baselines are compared on
+    """
+    number = calls_per_run(call, min_time)
+    seconds, relative = [], []
+    for _ in range(repeat):
+        reference = timeit.timeit(calibration_loop, number=calibration_calls) / calibration_calls
+        elapsed = timeit.timeit(call, number=number) / number
+        seconds.append(elapsed)
+        relative.append(elapsed / reference)
+    return {"us": statistics.median(seconds) * 1e6, "relative": statistics.median(relative)}
+
+
+def compare(reference, results, tolerance):
+    """Regressions in the calibration-relative timings of results"""
+    return baseline.compare(reference, {name: {"relative": metrics["relative"]} for name, metrics in results.items()}, tolerance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", default=",".join(str(count) for count in LINE_COUNTS), help="comma-separated line counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per path, the median one is reported")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timing run")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--retries", type=int, default=2, help="times to re-time a path over the tolerance before failing")
+    args = parser.parse_args()
+    line_counts = [int(count) for count in args.lines.split(",")]
+
+    service = QuotationService(store=InMemoryQuotationStore())
+    calibration_calls = calls_per_run(calibration_loop, args.min_time)
+    calls = {}
+    results = {}
+    print(f"{'path':<22}{'lines':>8}{'us/call':>14}{'ns/line':>10}{'relative':>10}")
+    for line_count in line_counts:
+        for path, call in hot_paths(service, line_count).items():
+            name = f"{path}[{line_count}]"
+            calls[name] = call
+            results[name] = measure(call, args.repeat, args.min_time, calibration_calls)
+            us = results[name]["us"]
+            print(f"{path:<22}{line_count:>8}{us:>14.1f}{us * 1e3 / line_count:>10.0f}{results[name]['relative']:>10.3f}")
+
+    if args.save_baseline:
+        baseline.save(args.save_baseline, results, repeat=args.repeat, min_time=args.min_time)
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        reference = baseline.load(args.baseline)
+        if not any("relative" in metrics for metrics in reference.values()):
+            sys.exit(f"{args.baseline} has no calibration-relative timings; save a new baseline")
+        regressions = compare(reference, results, args.tolerance)
+        for attempt in range(args.retries):
+            if not regressions:
+                break
+            flagged = sorted({regression.split(" ", 1)[0] for regression in regressions})
+            print(f"re-timing {len(flagged)} path(s) over the tolerance (retry {attempt + 1} of {args.retries})")
+            for name in flagged:
+                results[name] = measure(calls[name], args.repeat, args.min_time, calibration_calls)
+            regressions = compare(reference, {name: results[name] for name in flagged}, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no path slower than the baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Load test: POST /quote against the API served in-process, with a local OpenAI stand-in
+
+Serves the quotation API and a fake chat-completions endpoint on loopback
+with uvicorn, drives /quote at a fixed concurrency and reports throughput
+and latency percentiles for each workload:
+
+    template  drafts from the built-in templates, no LLM call
+    llm       every quotation is drafted by the fake OpenAI server
+    mixed     --repeat-ratio of requests repeat an earlier quotation and get
+              their draft from the draft cache; the rest call the LLM
+
+Client, API and the fake OpenAI server share one process, so absolute
+numbers are below a deployed worker's. Compare runs with each other:
+--save-baseline records one, --baseline fails (exit 1) when throughput or
+a percentile is worse by more than --tolerance. The llm and mixed
+workloads need the openai package.
+
+Usage:
+    python benchmarks/bench_quotation_load.py [--requests 500] [--concurrency 32]
+        [--latency-ms 400] [--jitter-ms 100] [--workloads template,llm,mixed]
+        [--save-baseline FILE | --baseline FILE [--tolerance 0.2]]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException
+
+import baseline
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api")
+sys.path.insert(0, API_DIR)
+
+WORKLOADS = ("template", "llm", "mixed")
+FAKE_DRAFT = "Dear customer,\n\nPlease find our quotation attached.\n\nBest regards,\nSales Team"
+ITEMS = [
+    {"sku": "ALR-SL-90W", "qty": 120, "unit_cost": 240.0, "margin_pct": 22},
+    {"sku": "ALR-OBL-12V", "qty": 40, "unit_cost": 95.5, "margin_pct": 18},
+    {"sku": "ALR-FL-50W", "qty": 60, "unit_cost": 150.0, "margin_pct": 20},
+]
+
+
+def create_fake_openai(latency_ms: float, jitter_ms: float, seed: int) -> FastAPI:
+    """Chat-completions endpoint answering after latency_ms, normally distributed with jitter_ms"""
+    app = FastAPI()
+    rng = random.Random(seed)
+    calls = {"count": 0}
+    app.state.calls = calls
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        if body.get("stream"):
+            raise HTTPException(status_code=400, detail="The load-test stand-in does not stream")
+        calls["count"] += 1
+        await asyncio.sleep(max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000)
+        return {
+            "id": f"chatcmpl-load-{calls['count']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": FAKE_DRAFT},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 420, "completion_tokens": 160, "total_tokens": 580},
+        }
+
+    return app
+
+
+class BackgroundServer:
+    """uvicorn serving an ASGI app from a daemon thread with its own event loop"""
+
+    def __init__(self, app: Any, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "BackgroundServer":
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_requests(workload: str, count: int, repeat_ratio: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Request bodies for a workload; unique clients miss the draft cache, repeats hit it"""
+    bodies = []
+    for index in range(count):
+        if workload == "mixed" and bodies and rng.random() < repeat_ratio:
+            bodies.append(rng.choice(bodies))
+            continue
+        lang = "ar" if index % 2 else "en"
+        bodies.append({
+            "client": {"name": f"{workload} client {index}", "contact": f"buyer{index}@client.com", "lang": lang},
+            "currency": "SAR",
+            "items": ITEMS[:1 + index % len(ITEMS)],
+            "delivery_terms": "DAP Dammam, 4 weeks",
+        })
+    return bodies
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+async def drive(client: httpx.AsyncClient, bodies: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    """Send every body with at most concurrency requests in flight"""
+    latencies: List[float] = []
+    counts = {"errors": 0, "llm_drafts": 0}
+    pending = iter(bodies)
+
+    async def worker():
+        for body in pending:
+            started = time.perf_counter()
+            response = await client.post("/quote", json=body)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                counts["errors"] += 1
+            elif response.json()["email_draft"] == FAKE_DRAFT:
+                counts["llm_drafts"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": counts["errors"],
+        "llm_drafts": counts["llm_drafts"],
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+async def run(args: argparse.Namespace, api_port: int, quotation_service: Any) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(args.seed)
+    llm_settings = quotation_service.settings
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", limits=limits, timeout=120) as client:
+        for workload in args.workloads:
+            # Mock mode swaps every draft for the template, as with no API key
+            quotation_service.settings = llm_settings.copy(update={"use_mock_services": workload == "template"})
+            await drive(client, build_requests(f"warmup-{workload}", args.warmup, 0, rng), args.concurrency)
+            results[workload] = await drive(
+                client, build_requests(workload, args.requests, args.repeat_ratio, rng), args.concurrency
+            )
+    quotation_service.settings = llm_settings
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per workload")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests before each workload")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset of " + ",".join(WORKLOADS))
+    parser.add_argument("--latency-ms", type=float, default=400, help="mean fake OpenAI latency")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="standard deviation of the fake latency")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="share of mixed requests answered from the draft cache")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-metrics", action="store_true", help="run with METRICS_ENABLED=false")
+    parser.add_argument("--save-baseline", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    args.workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    openai_port, api_port = free_port(), free_port()
+    # Settings are read when the service module is imported
+    os.environ.update({
+        "USE_MOCK_SERVICES": "False",
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_MAX_CONCURRENCY": str(max(16, args.concurrency)),
+        "DATABASE_URL": "memory://",
+        "SHARED_STATE_PATH": "",
+        "DRAFT_LATENCY_BUDGET_MS": "0",
+        "METRICS_ENABLED": "false" if args.no_metrics else "true",
+    })
+    from main import app, quotation_service  # noqa: E402
+
+    # Per-request INFO logs would dominate the profile
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if quotation_service.async_client is None and set(args.workloads) - {"template"}:
+        sys.exit("the llm and mixed workloads need the openai package (pip install openai)")
+
+    fake_openai = create_fake_openai(args.latency_ms, args.jitter_ms, args.seed)
+    with BackgroundServer(fake_openai, openai_port), BackgroundServer(app, api_port):
+        results = asyncio.run(run(args, api_port, quotation_service))
+
+    print(f"concurrency {args.concurrency}, fake OpenAI {args.latency_ms:g}±{args.jitter_ms:g} ms, "
+          f"{fake_openai.state.calls['count']} LLM calls")
+    print(f"{'workload':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'llm':>7}")
+    for workload, result in results.items():
+        print(f"{workload:<10}{result['throughput_rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}{result['errors']:>8}{result['llm_drafts']:>7}")
+
+    timings = {
+        workload: {key: result[key] for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")}
+        for workload, result in results.items()
+    }
+    if args.save_baseline:
+        baseline.save(args.save_baseline, timings, concurrency=args.concurrency,
+                      latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, requests=args.requests)
+        print(f"baseline written to {args.save_baseline}")
+    failed = any(result["errors"] for result in results.values())
+    if args.baseline:
+        regressions = baseline.compare(baseline.load(args.baseline), timings, args.tolerance, higher_is_better=("throughput_rps",))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory per stored quotation, plain dicts vs compact records
+
+Builds realistic quotations (1-5 lines, English and Arabic template
+drafts, a few thousand repeat clients) and measures with tracemalloc what
+an InMemoryQuotationStore retains, indexes included, with and without
+compact records.
+
+Usage:
+    python benchmarks/bench_quotation_memory.py [--count 100000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from email_templates import get_email_templates  # noqa: E402
+from models import ClientInfo, LineItem, QuotationRequest, QuotationResponse  # noqa: E402
+from storage import InMemoryQuotationStore  # noqa: E402
+
+PRODUCTS = {
+    "ALR-SL-90W": ("High-efficiency LED streetlight pole with 90W output", 240.0),
+    "ALR-SL-120W": ("High-efficiency LED streetlight pole with 120W output", 320.0),
+    "ALR-SL-60W": ("High-efficiency LED streetlight pole with 60W output", 180.0),
+    "ALR-OBL-12V": ("Low-voltage outdoor bollard light for pathways", 95.5),
+    "ALR-FL-50W": ("High-power flood light for area illumination", 150.0),
+}
+
+
+def build_quotations(count, seed=7):
+    """Yield quotation records shaped exactly like QuotationResponse.dict()"""
+    rng = random.Random(seed)
+    templates = get_email_templates()
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        client_number = rng.randrange(3000)
+        request = QuotationRequest(
+            client=ClientInfo(
+                name=f"Client {client_number}",
+                contact=f"buyer{client_number}@client.com",
+                lang="ar" if client_number % 2 else "en",
+            ),
+            currency="SAR",
+            items=[
+                {"sku": sku, "qty": rng.randint(1, 500), "unit_cost": PRODUCTS[sku][1], "margin_pct": 22}
+                for sku in rng.sample(list(PRODUCTS), rng.randint(1, 5))
+            ],
+            delivery_terms="DAP Dubai, 4 weeks",
+        )
+        line_items = []
+        for item in request.items:
+            unit_price = round(item.unit_cost * (1 + item.margin_pct / 100), 2)
+            line_items.append(LineItem(
+                sku=item.sku,
+                description=PRODUCTS[item.sku][0],
+                qty=item.qty,
+                unit_cost=item.unit_cost,
+                margin_pct=item.margin_pct,
+                unit_price=unit_price,
+                line_total=round(unit_price * item.qty, 2),
+            ))
+        subtotal = round(sum(item.line_total for item in line_items), 2)
+        total = round(subtotal * 1.15, 2)
+        created_at = start + timedelta(seconds=i)
+        yield QuotationResponse(
+            quotation_id=f"QUO-20240101-{i:08X}",
+            client=request.client,
+            currency=request.currency,
+            line_items=line_items,
+            subtotal=subtotal,
+            tax_rate=15.0,
+            tax_amount=round(total - subtotal, 2),
+            total=total,
+            delivery_terms=request.delivery_terms,
+            email_draft=templates.render(request, line_items, total),
+            created_at=created_at,
+            valid_until=created_at + timedelta(days=30),
+        ).dict()
+
+
+def measure(count, compact):
+    """Bytes retained by a store holding count quotations"""
+    # Records are built inside the traced window so strings the store keeps
+    # (or interns) are counted the same way for both representations
+    gc.collect()
+    tracemalloc.start()
+    store = InMemoryQuotationStore(compact=compact)
+    quotations = build_quotations(count)
+    while True:
+        batch = list(islice(quotations, 10_000))
+        if not batch:
+            break
+        store.save_many(batch)
+        del batch
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained, store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="number of stored quotations")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    plain_bytes, plain_store = measure(args.count, compact=False)
+    del plain_store
+    compact_bytes, compact_store = measure(args.count, compact=True)
+    print(f"Built and stored {args.count:,} quotations twice in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'store':<10}{'total MB':>12}{'bytes/quote':>14}")
+    for name, retained in (("dict", plain_bytes), ("compact", compact_bytes)):
+        print(f"{name:<10}{retained / 2 ** 20:>12.1f}{retained / args.count:>14.0f}")
+    print(f"\nreduction: {plain_bytes / compact_bytes:.1f}x")
+
+    ids = [key[1] for key in compact_store._order[:10_000]]
+    start = time.perf_counter()
+    for quotation_id in ids:
+        compact_store.get(quotation_id)
+    print(f"get() with lazy draft decompression: {(time.perf_counter() - start) / len(ids) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: index-backed quotation search vs a full scan
+
+Loads synthetic quotations into a store and times typical sales-manager
+queries ("quotes to a client containing a SKU last month over 50k") through
+QuotationStore.search, then the same filters as a linear scan.
+
+Usage:
+    python benchmarks/bench_quotation_search.py [--count 1000000] [--backend memory|sqlite] [--path FILE]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from storage import InMemoryQuotationStore, SQLiteQuotationStore, _sortable_timestamp  # noqa: E402
+
+SKUS = ["ALR-SL-90W", "ALR-SL-120W", "ALR-SL-60W", "ALR-OBL-12V", "ALR-FL-50W"] + [
+    f"ALR-X-{i:04d}" for i in range(995)
+]
+CLIENTS = [f"buyer{i}@client{i % 97}.com" for i in range(5000)]
+START = datetime(2024, 1, 1)
+
+
+def generate(count, seed=42):
+    """Yield synthetic quotation records spread over one year"""
+    rng = random.Random(seed)
+    step = timedelta(days=365) / count
+    for i in range(count):
+        skus = rng.sample(SKUS, rng.randint(1, 4))
+        yield {
+            "quotation_id": f"QUO-{i:08d}",
+            "client": {"name": "Client", "contact": rng.choice(CLIENTS), "lang": "en"},
+            "currency": "SAR",
+            "line_items": [{"sku": sku} for sku in skus],
+            "total": round(rng.lognormvariate(9.5, 1.2), 2),
+            "created_at": START + step * i,
+        }
+
+
+def full_scan(records, client_contact=None, sku=None, created_from=None, created_to=None, min_total=None, limit=100):
+    """Reference implementation: filter every record"""
+    created_from_key = _sortable_timestamp(created_from) if created_from else None
+    created_to_key = _sortable_timestamp(created_to) if created_to else None
+    matches = []
+    for record in records:
+        if client_contact and record["client"]["contact"] != client_contact:
+            continue
+        if sku and all(item["sku"] != sku for item in record["line_items"]):
+            continue
+        created_at = _sortable_timestamp(record["created_at"])
+        if created_from_key and created_at < created_from_key:
+            continue
+        if created_to_key and created_at >= created_to_key:
+            continue
+        if min_total is not None and record["total"] < min_total:
+            continue
+        matches.append(record)
+    return matches[:limit]
+
+
+def timed(fn, repeat):
+    """Best wall time of fn over repeat runs, with its last result"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000, help="number of stored quotations")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--path", help="SQLite file (default: temporary file)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-scan", action="store_true", help="do not time the full-scan baseline")
+    args = parser.parse_args()
+
+    print(f"Loading {args.count:,} quotations into the {args.backend} store...")
+    records = list(generate(args.count))
+    start = time.perf_counter()
+    if args.backend == "memory":
+        store = InMemoryQuotationStore()
+        store.save_many(records)
+    else:
+        path = args.path or os.path.join(tempfile.mkdtemp(), "bench_quotations.db")
+        store = SQLiteQuotationStore(path)
+        for offset in range(0, len(records), 10_000):
+            store.save_many(records[offset:offset + 10_000])
+    print(f"Loaded in {time.perf_counter() - start:.1f}s\n")
+
+    client = records[len(records) // 2]["client"]["contact"]
+    month_from, month_to = datetime(2024, 6, 1), datetime(2024, 7, 1)
+    queries = {
+        "client": dict(client_contact=client),
+        "sku + month": dict(sku="ALR-SL-90W", created_from=month_from, created_to=month_to),
+        "client + sku + month + >50k": dict(
+            client_contact=client, sku="ALR-SL-90W", created_from=month_from, created_to=month_to, min_total=50_000
+        ),
+        "sku + >50k": dict(sku="ALR-FL-50W", min_total=50_000),
+        "month + >50k": dict(created_from=month_from, created_to=month_to, min_total=50_000),
+    }
+
+    print(f"{'query':<30}{'matches':>9}{'index ms':>11}{'scan ms':>11}{'speedup':>10}")
+    for name, filters in queries.items():
+        index_time, results = timed(lambda: store.search(**filters, limit=100), args.repeat)
+        if args.skip_scan:
+            print(f"{name:<30}{len(results):>9}{index_time * 1000:>11.2f}")
+            continue
+        scan_time, expected = timed(lambda: full_scan(records, **filters, limit=100), 1)
+        if [r["quotation_id"] for r in results] != [r["quotation_id"] for r in expected]:
+            raise SystemExit(f"Index and scan results disagree for {name!r}")
+        print(
+            f"{name:<30}{len(results):>9}{index_time * 1000:>11.2f}{scan_time * 1000:>11.2f}"
+            f"{scan_time / index_time:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
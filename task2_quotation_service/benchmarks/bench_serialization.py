@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: FastAPI's default response encoding vs orjson and MessagePack
+
+The default path is what a response_model endpoint does per request:
+re-validate the model, run jsonable_encoder and json.dumps the result.
+
+Usage:
+    python benchmarks/bench_serialization.py [--repeat N] [--draft-bytes N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from models import ClientInfo, LineItem, QuotationResponse  # noqa: E402
+from serialization import dumps_json, dumps_msgpack, msgpack, orjson  # noqa: E402
+
+LINE_COUNTS = (1, 10, 100, 1_000)
+
+
+def build_response(line_count, draft_bytes):
+    """A quotation with line_count lines and an email draft of about draft_bytes"""
+    created_at = datetime(2024, 1, 15, 10, 30)
+    line_items = [
+        LineItem(
+            sku=f"ALR-SL-{i}W",
+            description="High-efficiency LED streetlight pole",
+            qty=10 + i,
+            unit_cost=240.0,
+            margin_pct=22.0,
+            unit_price=292.8,
+            line_total=round(292.8 * (10 + i), 2),
+        )
+        for i in range(line_count)
+    ]
+    subtotal = round(sum(item.line_total for item in line_items), 2)
+    return QuotationResponse(
+        quotation_id="QUO-20240115-ABCDEF12",
+        client=ClientInfo(name="Gulf Eng.", contact="omar@client.com", lang="en"),
+        currency="SAR",
+        line_items=line_items,
+        subtotal=subtotal,
+        tax_rate=15.0,
+        tax_amount=round(subtotal * 0.15, 2),
+        total=round(subtotal * 1.15, 2),
+        delivery_terms="DAP Dubai, 4 weeks",
+        email_draft=("Dear Gulf Eng., thank you for your interest. " * (draft_bytes // 46 + 1))[:draft_bytes],
+        created_at=created_at,
+        valid_until=created_at + timedelta(days=30),
+    )
+
+
+def fastapi_default(response):
+    """response_model validation + jsonable_encoder + JSONResponse.render"""
+    validated = QuotationResponse.validate(response.dict())
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--draft-bytes", type=int, default=4096, help="email draft size")
+    args = parser.parse_args()
+
+    encoders = {"default": fastapi_default, "json": dumps_json}
+    if msgpack is not None:
+        encoders["msgpack"] = dumps_msgpack
+    print(f"json encoder: {'orjson' if orjson is not None else 'stdlib json'}")
+
+    header = f"{'lines':>6}" + "".join(f"{name + ' us':>13}" for name in encoders)
+    header += "".join(f"{name + ' B':>12}" for name in encoders if name != "default")
+    print(header + f"{'speedup':>10}")
+    for line_count in LINE_COUNTS:
+        response = build_response(line_count, args.draft_bytes)
+        number = max(1, 2_000 // line_count)
+        times, sizes = {}, {}
+        for name, encode in encoders.items():
+            sizes[name] = len(encode(response))
+            times[name] = min(timeit.repeat(lambda: encode(response), number=number, repeat=args.repeat)) / number
+
+        row = f"{line_count:>6}" + "".join(f"{times[name] * 1e6:>13.1f}" for name in encoders)
+        row += "".join(f"{sizes[name]:>12}" for name in encoders if name != "default")
+        print(row + f"{times['default'] / times['json']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
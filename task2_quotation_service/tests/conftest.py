@@ -0,0 +1,10 @@
+"""
+Shared test setup
+"""
+
+import os
+
+# Settings are read when the app and services are built at import time, so
+# point storage at memory before any test module imports them; otherwise
+# every run appends to ./quotations.db
+os.environ["DATABASE_URL"] = "memory://"
@@ -0,0 +1,151 @@
+"""
+Tests for the product catalog
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from api.catalog import ProductCatalog, load_catalog
+
+PRODUCTS = [
+    {
+        "sku": "ALR-SL-90W",
+        "name": "90W Streetlight Pole",
+        "description": "LED streetlight pole with 90W output",
+        "base_price": 240.0,
+        "category": "Streetlight",
+        "specifications": {"wattage": "90W", "color_temp": "4000K"},
+    },
+    {
+        "sku": "ALR-FL-50W",
+        "name": "50W Flood Light",
+        "description": "Flood light for area illumination",
+        "base_price": 150.0,
+        "category": "Floodlight",
+        "specifications": {"wattage": "50W", "color_temp": "5000K"},
+    },
+]
+
+
+def write_json(path, products):
+    """Write a catalog atomically, the way a catalog export should"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"products": products}, f)
+    os.replace(tmp_path, path)
+
+
+class TestLoadCatalog:
+    """Parsing and indexing"""
+
+    def test_json(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        write_json(path, PRODUCTS)
+
+        snapshot = load_catalog(path)
+        assert len(snapshot) == 2
+        assert snapshot.products["ALR-SL-90W"].base_price == 240.0
+        assert snapshot.products["ALR-SL-90W"].specifications["wattage"] == "90W"
+
+    def test_csv_extra_columns_become_specifications(self, tmp_path):
+        path = tmp_path / "products.csv"
+        path.write_text(
+            "sku,name,description,base_price,category,wattage,Color Temp\n"
+            "ALR-SL-90W,90W Streetlight Pole,LED pole,240,Streetlight,90W,4000 K\n",
+            encoding="utf-8",
+        )
+
+        snapshot = load_catalog(str(path))
+        product = snapshot.products["ALR-SL-90W"]
+        assert product.base_price == 240.0
+        assert product.specifications == {"wattage": "90W", "Color Temp": "4000 K"}
+        assert [p.sku for p in snapshot.find(specs={"color_temp": "4000k"})] == ["ALR-SL-90W"]
+
+    def test_sqlite(self, tmp_path):
+        path = str(tmp_path / "catalog.db")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE products (sku TEXT, name TEXT, description TEXT, base_price REAL, "
+            "category TEXT, specifications TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (p["sku"], p["name"], p["description"], p["base_price"], p["category"], json.dumps(p["specifications"]))
+                for p in PRODUCTS
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        snapshot = load_catalog(path)
+        assert snapshot.products["ALR-FL-50W"].specifications["color_temp"] == "5000K"
+
+    def test_find_intersects_indexes(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        write_json(path, PRODUCTS)
+        snapshot = load_catalog(path)
+
+        assert [p.sku for p in snapshot.find(category="streetlight")] == ["ALR-SL-90W"]
+        assert [p.sku for p in snapshot.find(specs={"Wattage": "50 w"})] == ["ALR-FL-50W"]
+        assert snapshot.find(category="Floodlight", specs={"wattage": "90W"}) == []
+        assert len(snapshot.find()) == 2
+
+    def test_find_keeps_catalog_order(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        extra = dict(PRODUCTS[0], sku="ALR-AA-60W", specifications={"wattage": "60W"})
+        write_json(path, PRODUCTS + [extra])
+        snapshot = load_catalog(path)
+
+        assert [p.sku for p in snapshot.find(category="Streetlight")] == ["ALR-SL-90W", "ALR-AA-60W"]
+
+    def test_invalid_row(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        write_json(path, [{"sku": "ALR-X", "name": "No price"}])
+
+        with pytest.raises(ValueError, match="missing base_price"):
+            load_catalog(path)
+
+
+class TestProductCatalog:
+    """Hot reload"""
+
+    def wait_for(self, predicate, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_hot_reload_swaps_snapshot(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        write_json(path, PRODUCTS[:1])
+        catalog = ProductCatalog(path, reload_interval=0.01)
+        before = catalog.snapshot
+
+        write_json(path, PRODUCTS)
+        os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        time.sleep(0.02)
+
+        assert self.wait_for(lambda: len(catalog.snapshot) == 2)
+        # Readers holding the old snapshot keep a consistent view
+        assert len(before) == 1
+        assert catalog.version != before.version
+
+    def test_failed_reload_keeps_previous_snapshot(self, tmp_path):
+        path = str(tmp_path / "products.json")
+        write_json(path, PRODUCTS)
+        catalog = ProductCatalog(path, reload_interval=0)
+        version = catalog.version
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+
+        assert catalog.reload() is False
+        assert catalog.version == version
+        assert len(catalog.products) == 2
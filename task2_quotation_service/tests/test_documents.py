@@ -0,0 +1,142 @@
+"""
+Tests for printable quotation documents
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from api import documents
+from api.documents import (
+    DocumentFormat,
+    DocumentQueueFull,
+    DocumentRenderer,
+    DocumentUnavailable,
+    content_hash,
+    document_content,
+    render_html,
+)
+
+
+def make_quotation(lang: str = "en", name: str = "Gulf Eng.") -> dict:
+    return {
+        "quotation_id": "QUO-01HM7Q2X5K-8Q7R2T6V4W0Y1A2B",
+        "client": {"name": name, "contact": "omar@client.com", "lang": lang},
+        "currency": "SAR",
+        "line_items": [{"sku": "ALR-SL-90W", "description": "90W Streetlight Pole", "qty": 120,
+                        "unit_cost": 240.0, "margin_pct": 22.0, "unit_price": 292.8, "line_total": 35136.0}],
+        "subtotal": 35136.0,
+        "tax_rate": 15.0,
+        "tax_amount": 5270.4,
+        "total": 40406.4,
+        "delivery_terms": "DAP Dammam, 4 weeks",
+        "notes": None,
+        "email_draft": "draft",
+        "draft_status": "ready",
+        "created_at": datetime(2024, 1, 15, 10, 30),
+        "valid_until": "2024-02-14T10:30:00",
+    }
+
+
+class TestRendering:
+    """HTML output and content hashing"""
+
+    def test_html_escapes_and_formats(self):
+        html = render_html(document_content(make_quotation(name="<b>Gulf</b>"))).decode()
+
+        assert '<html lang="en" dir="ltr">' in html
+        assert "&lt;b&gt;Gulf&lt;/b&gt;" in html
+        assert "40,406.40 SAR" in html
+        assert "VAT (15%)" in html
+        assert "2024-02-14" in html
+
+    def test_arabic_html_is_rtl(self):
+        html = render_html(document_content(make_quotation(lang="ar", name="شركة الخليج"))).decode()
+
+        assert '<html lang="ar" dir="rtl">' in html
+        assert "عرض سعر" in html
+        assert "شركة الخليج" in html
+
+    def test_hash_ignores_fields_not_shown(self):
+        quotation = make_quotation()
+        upgraded = dict(quotation, email_draft="LLM draft")
+
+        assert content_hash(document_content(quotation), DocumentFormat.PDF) == content_hash(document_content(upgraded), DocumentFormat.PDF)
+        assert content_hash(document_content(quotation), DocumentFormat.PDF) != content_hash(document_content(quotation), DocumentFormat.HTML)
+
+    def test_pdf_requirements_reported(self):
+        reason = documents.pdf_unavailable_reason(document_content(make_quotation(lang="ar")))
+
+        assert reason is not None
+        if documents.pdfmetrics is None:
+            with pytest.raises(DocumentUnavailable):
+                asyncio.run(DocumentRenderer(workers=0).render(make_quotation(), DocumentFormat.PDF))
+
+    @pytest.mark.skipif(documents.pdfmetrics is None, reason="reportlab is not installed")
+    def test_pdf_render(self):
+        pdf = documents.render_pdf(document_content(make_quotation()))
+
+        assert pdf.startswith(b"%PDF")
+        assert pdf == documents.render_pdf(document_content(make_quotation()))
+
+
+class TestDocumentRenderer:
+    """Caching, request coalescing and the bounded queue"""
+
+    def test_cached_after_first_render(self):
+        renderer = DocumentRenderer(workers=0)
+
+        async def run():
+            return [await renderer.render(make_quotation(), DocumentFormat.HTML) for _ in range(3)]
+
+        first, *rest = asyncio.run(run())
+        renderer.close()
+
+        assert renderer.rendered == 1
+        assert all(document.body == first.body for document in rest)
+        assert first.etag == renderer.etag(make_quotation(), DocumentFormat.HTML)
+
+    def test_concurrent_requests_share_one_render(self):
+        renderer = DocumentRenderer(workers=0)
+
+        async def run():
+            return await asyncio.gather(*(renderer.render(make_quotation(), DocumentFormat.HTML) for _ in range(5)))
+
+        results = asyncio.run(run())
+        renderer.close()
+
+        assert renderer.rendered == 1
+        assert len({document.body for document in results}) == 1
+
+    def test_full_queue_sheds(self, monkeypatch):
+        release = threading.Event()
+        render = documents.render_document
+        monkeypatch.setattr(documents, "render_document", lambda *args: release.wait(5) and render(*args))
+        renderer = DocumentRenderer(workers=0, max_queue=1)
+
+        async def run():
+            first = asyncio.ensure_future(renderer.render(make_quotation(), DocumentFormat.HTML))
+            await asyncio.sleep(0)
+            try:
+                await renderer.render(make_quotation(name="Other"), DocumentFormat.HTML)
+            finally:
+                release.set()
+                await first
+
+        with pytest.raises(DocumentQueueFull):
+            asyncio.run(run())
+        renderer.close()
+
+        assert renderer.shed == 1
+        assert renderer.queue_depth == 0
+
+    def test_process_pool_render(self):
+        renderer = DocumentRenderer(workers=1)
+        try:
+            document = asyncio.run(renderer.render(make_quotation(lang="ar"), DocumentFormat.HTML))
+        finally:
+            renderer.close()
+
+        assert 'dir="rtl"' in document.body.decode()
@@ -0,0 +1,104 @@
+"""
+Tests for the email draft cache
+"""
+
+import asyncio
+import threading
+import time
+
+from api.draft_cache import DraftCache
+
+
+class TestDraftCache:
+    """Eviction, TTL and single-flight behaviour"""
+
+    def test_lru_eviction_by_entries(self):
+        cache = DraftCache(max_entries=2)
+        cache.put("a", "draft a")
+        cache.put("b", "draft b")
+        assert cache.get("a") == "draft a"  # a is now most recently used
+
+        cache.put("c", "draft c")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "draft a"
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_budget(self):
+        cache = DraftCache(max_bytes=10)
+        cache.put("a", "12345")
+        cache.put("b", "67890")
+        cache.put("c", "x")
+
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] <= 10
+
+        cache.put("huge", "x" * 11)
+        assert cache.get("huge") is None
+
+    def test_ttl_expiry(self):
+        cache = DraftCache(ttl_seconds=0.01)
+        cache.put("a", "draft a")
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_async_single_flight(self):
+        cache = DraftCache()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "shared draft"
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_create("key", factory) for _ in range(10)))
+
+        assert asyncio.run(run()) == ["shared draft"] * 10
+        assert len(calls) == 1
+        assert asyncio.run(cache.get_or_create("key", factory)) == "shared draft"
+
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 9, 1)
+
+    def test_sync_single_flight(self):
+        cache = DraftCache()
+        calls = []
+        release = threading.Event()
+
+        def factory():
+            calls.append(1)
+            release.wait(1)
+            return "shared draft"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_create_sync("key", factory)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["shared draft"] * 5
+        assert len(calls) == 1
+
+    def test_failures_are_not_cached(self):
+        cache = DraftCache()
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        for _ in range(2):
+            try:
+                asyncio.run(cache.get_or_create("key", failing))
+            except RuntimeError:
+                pass
+
+        assert cache.stats()["misses"] == 2
+        assert cache.stats()["entries"] == 0
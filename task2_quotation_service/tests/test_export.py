@@ -0,0 +1,83 @@
+"""
+Tests for streaming quotation export
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from api.export import ExportFormat, encode_export, export_columns
+from api.quotation_ids import format_quotation_id
+from api.storage import InMemoryQuotationStore
+
+
+def make_quotation(index: int, created_at: datetime) -> dict:
+    return {
+        "quotation_id": format_quotation_id(int(created_at.timestamp() * 1000), index),
+        "client": {"name": f"Client, {index}", "contact": f"c{index}@client.com", "lang": "ar"},
+        "currency": "SAR",
+        "line_items": [{"sku": "ALR-SL-90W", "description": "عمود إنارة", "qty": 1, "unit_cost": 100.0,
+                        "margin_pct": 20.0, "unit_price": 120.0, "line_total": 120.0}],
+        "subtotal": 120.0,
+        "tax_rate": 15.0,
+        "tax_amount": 18.0,
+        "total": 138.0,
+        "delivery_terms": "DAP",
+        "notes": None,
+        "email_draft": "draft",
+        "draft_status": "ready",
+        "created_at": created_at,
+        "valid_until": created_at,
+    }
+
+
+class TestExport:
+    """Field projection and chunked encoding"""
+
+    def test_ndjson_projection(self):
+        batches = [[make_quotation(1, datetime(2024, 1, 1))], [make_quotation(2, datetime(2024, 1, 2))]]
+        columns = export_columns(ExportFormat.NDJSON, ["quotation_id", "client.contact", "total"])
+
+        chunks = list(encode_export(iter(batches), ExportFormat.NDJSON, columns))
+
+        assert len(chunks) == 2
+        rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+        assert rows[1] == {"quotation_id": batches[1][0]["quotation_id"], "client.contact": "c2@client.com", "total": 138.0}
+
+    def test_csv_defaults_and_quoting(self):
+        quotation = make_quotation(1, datetime(2024, 1, 1, 9, 30))
+        columns = export_columns(ExportFormat.CSV)
+
+        text = b"".join(encode_export([[quotation]], ExportFormat.CSV, columns)).decode()
+
+        header, row = list(csv.reader(io.StringIO(text)))
+        assert header[:3] == ["quotation_id", "created_at", "client.name"]
+        assert row[1] == "2024-01-01T09:30:00"
+        assert row[2] == "Client, 1"
+        assert "line_items" not in header
+
+    def test_csv_header_only_when_empty(self):
+        columns = export_columns(ExportFormat.CSV, ["quotation_id", "line_items"])
+
+        assert b"".join(encode_export([], ExportFormat.CSV, columns)) == b"quotation_id,line_items\n"
+
+    def test_unknown_field_rejected(self):
+        with pytest.raises(ValueError, match="secret"):
+            export_columns(ExportFormat.CSV, ["quotation_id", "secret"])
+
+    def test_batches_resume_after_last_id(self):
+        from api.quotation_service import QuotationService
+
+        store = InMemoryQuotationStore()
+        for index in range(7):
+            store.save(make_quotation(index, datetime(2024, 1, 1 + index)))
+        service = QuotationService(store=store)
+
+        batches = list(service.iter_quotation_batches(created_from=datetime(2024, 1, 2), batch_size=3))
+
+        assert [len(batch) for batch in batches] == [3, 3]
+        ids = [quotation["quotation_id"] for batch in batches for quotation in batch]
+        assert ids == sorted(ids)
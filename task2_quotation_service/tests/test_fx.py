@@ -0,0 +1,134 @@
+"""
+Tests for FX rate snapshots and currency conversion
+"""
+
+import json
+import os
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from api.fx import FxRateTable, load_rates
+
+RATES = {
+    "version": "2024-06-01",
+    "base": "SAR",
+    "rates": {"SAR": "1", "USD": "3.75", "EUR": "4.0725", "AED": "1.021103"},
+}
+
+
+def write_rates(path, document):
+    """Write a rate file atomically, the way a rate publisher should"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+    os.replace(tmp_path, path)
+
+
+@pytest.fixture
+def rates(tmp_path):
+    path = str(tmp_path / "fx_rates.json")
+    write_rates(path, RATES)
+    return load_rates(path)
+
+
+class TestLoadRates:
+    """Parsing and validation"""
+
+    def test_snapshot(self, rates):
+        assert rates.base == "SAR"
+        assert rates.codes == ("AED", "EUR", "SAR", "USD")
+        assert rates.version.startswith("2024-06-01-")
+        assert rates.rate("USD", "SAR") == Decimal("3.75")
+        assert rates.decimals("EUR") == 2
+
+    @pytest.mark.parametrize("value", ["0", "-1", "3.7500001", "abc"])
+    def test_invalid_rate(self, tmp_path, value):
+        path = str(tmp_path / "fx_rates.json")
+        write_rates(path, dict(RATES, rates={"SAR": "1", "USD": value}))
+
+        with pytest.raises(ValueError):
+            load_rates(path)
+
+    def test_base_must_be_one(self, tmp_path):
+        path = str(tmp_path / "fx_rates.json")
+        write_rates(path, dict(RATES, rates={"SAR": "1.1", "USD": "3.75"}))
+
+        with pytest.raises(ValueError):
+            load_rates(path)
+
+    def test_bundled_rates_load(self):
+        path = os.path.join(os.path.dirname(__file__), "..", "data", "fx_rates.json")
+
+        assert set(load_rates(path).codes) == {"SAR", "USD", "EUR", "AED"}
+
+
+class TestConvert:
+    """Exact conversion and per-currency rounding"""
+
+    def test_convert_rounds_half_up_to_minor_unit(self, rates):
+        converted = rates.convert([240.0, 95.5, 0.01], "SAR", "USD")
+
+        # 95.5 / 3.75 = 25.4666..., 0.01 / 3.75 = 0.00266...
+        assert converted.tolist() == [64.0, 25.47, 0.0]
+
+    def test_source_amounts_rounded_as_written(self, rates):
+        # 1.005 is stored as 1.00499999...; it still counts as 1.01 USD
+        assert rates.to_minor([1.005, 2.675], "USD").tolist() == [101, 268]
+        assert rates.convert([1.005], "USD", "SAR").tolist() == [3.79]
+
+    def test_matches_decimal_arithmetic(self, rates):
+        rng = np.random.default_rng(7)
+        minor = rng.integers(1, 10**9, size=2_000)
+        converted = rates.convert_minor(minor, "EUR", "AED")
+
+        rate = Decimal("4.0725") / Decimal("1.021103")
+        expected = [int((Decimal(int(value)) * Decimal("4.0725") / Decimal("1.021103")).quantize(Decimal(1), "ROUND_HALF_UP"))
+                    for value in minor]
+        assert converted.tolist() == expected
+        assert rates.rate("EUR", "AED") == rate
+
+    def test_per_item_currencies(self, rates):
+        converted = rates.convert([100.0, 100.0, 100.123], ["USD", "EUR", "SAR"], ["SAR", "SAR", "SAR"])
+
+        # Same-currency amounts are left exactly as given
+        assert converted.tolist() == [375.0, 407.25, 100.123]
+
+    def test_large_amounts_do_not_overflow(self, rates):
+        assert rates.convert_minor([10**17], "USD", "SAR").tolist() == [375 * 10**15]
+
+    def test_unknown_currency(self, rates):
+        with pytest.raises(ValueError):
+            rates.convert([1.0], "USD", "GBP")
+        with pytest.raises(ValueError):
+            rates.convert([1.0, 2.0], ["USD", "JPY"], "SAR")
+
+
+class TestFxRateTable:
+    """Hot reload"""
+
+    def test_reload_swaps_snapshot(self, tmp_path):
+        path = str(tmp_path / "fx_rates.json")
+        write_rates(path, RATES)
+        table = FxRateTable(path, reload_interval=0)
+        before = table.snapshot
+
+        write_rates(path, dict(RATES, version="2024-06-02", rates=dict(RATES["rates"], EUR="4.10")))
+        assert table.reload()
+
+        assert table.snapshot.version.startswith("2024-06-02-")
+        assert table.snapshot.rate("EUR", "SAR") == Decimal("4.10")
+        # Readers holding the old snapshot keep the old rates
+        assert before.rate("EUR", "SAR") == Decimal("4.0725")
+
+    def test_failed_reload_keeps_serving(self, tmp_path):
+        path = str(tmp_path / "fx_rates.json")
+        write_rates(path, RATES)
+        table = FxRateTable(path, reload_interval=0)
+        version = table.version
+
+        write_rates(path, {"rates": {"SAR": "1", "USD": "-3"}})
+
+        assert not table.reload()
+        assert table.version == version
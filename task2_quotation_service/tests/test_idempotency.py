@@ -0,0 +1,71 @@
+"""
+Tests for idempotency keys
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from api.idempotency import IdempotencyCache, IdempotencyConflict
+
+
+class TestIdempotencyCache:
+    """Replay, coalescing, conflicts and expiry"""
+
+    def test_concurrent_duplicates_share_one_run(self):
+        cache = IdempotencyCache()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return f"QUO-{len(calls)}"
+
+        async def run():
+            return await asyncio.gather(*(cache.run("key", "fp", factory) for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ["QUO-1"] * 5
+        assert [replayed for _, replayed in results] == [False] + [True] * 4
+
+        assert asyncio.run(cache.run("key", "fp", factory)) == ("QUO-1", True)
+        assert len(calls) == 1
+
+    def test_conflicting_reuse(self):
+        cache = IdempotencyCache()
+
+        async def factory():
+            return "QUO-1"
+
+        asyncio.run(cache.run("key", "fp", factory))
+        with pytest.raises(IdempotencyConflict):
+            asyncio.run(cache.run("key", "other", factory))
+
+    def test_failures_are_not_stored(self):
+        cache = IdempotencyCache()
+        outcomes = [RuntimeError("boom"), "QUO-1"]
+
+        async def factory():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.run("key", "fp", factory))
+        assert asyncio.run(cache.run("key", "fp", factory)) == ("QUO-1", False)
+
+    def test_ttl_and_bound(self):
+        cache = IdempotencyCache(max_entries=2, ttl_seconds=0.01)
+
+        async def factory():
+            return time.monotonic()
+
+        for key in ("a", "b", "c"):
+            asyncio.run(cache.run(key, "fp", factory))
+        assert cache.stats()["entries"] == 2
+
+        time.sleep(0.02)
+        assert asyncio.run(cache.run("c", "fp", factory))[1] is False
@@ -0,0 +1,102 @@
+"""
+Tests for OpenAI admission control and the circuit breaker
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from api.llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable
+
+
+class TestCircuitBreaker:
+    """State transitions"""
+
+    def test_opens_after_failures_in_window(self):
+        breaker = CircuitBreaker(failure_threshold=3, window_seconds=60, cooldown_seconds=60)
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.stats()["trips"] == 1
+
+    def test_failures_outside_window_expire(self):
+        breaker = CircuitBreaker(failure_threshold=2, window_seconds=0.01, cooldown_seconds=60)
+        breaker.record_failure()
+        time.sleep(0.02)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, window_seconds=60, cooldown_seconds=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+        time.sleep(0.02)
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow() and breaker.allow()
+
+
+class TestLLMGuard:
+    """Concurrency limit, shedding and failure accounting"""
+
+    def test_limits_concurrency_and_sheds_beyond_queue(self):
+        guard = LLMGuard(max_concurrency=2, max_queue=1)
+        running = []
+        peak = []
+
+        async def call():
+            async with guard.slot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.02)
+                running.pop()
+            return "llm"
+
+        async def run():
+            tasks = [asyncio.ensure_future(call()) for _ in range(3)]
+            await asyncio.sleep(0)
+            assert guard.stats()["queued"] == 1
+            with pytest.raises(LLMUnavailable) as shed:
+                await call()
+            return shed.value.reason, await asyncio.gather(*tasks)
+
+        reason, results = asyncio.run(run())
+        assert reason == "overloaded"
+        assert results == ["llm"] * 3
+        assert max(peak) == 2
+        assert guard.stats()["shed"] == 1
+        assert guard.stats()["in_flight"] == 0
+
+    def test_failures_trip_the_breaker(self):
+        guard = LLMGuard(breaker=CircuitBreaker(failure_threshold=2, window_seconds=60, cooldown_seconds=60))
+
+        async def failing():
+            async with guard.slot():
+                raise asyncio.TimeoutError()
+
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(failing())
+        with pytest.raises(LLMUnavailable) as rejected:
+            asyncio.run(failing())
+        assert rejected.value.reason == "circuit_open"
+
+        with pytest.raises(LLMUnavailable):
+            with guard.slot_sync():
+                pass
+        assert guard.stats()["breaker"]["state"] == "open"
@@ -0,0 +1,48 @@
+"""
+Tests for the Prometheus metrics registry
+"""
+
+from types import SimpleNamespace
+
+from api.metrics import Metrics
+
+
+class TestMetrics:
+    """Timers, counters and text exposition"""
+
+    def test_stage_histogram_exposition(self):
+        metrics = Metrics()
+        with metrics.time("pricing"):
+            pass
+        metrics.observe_stage("pricing", 0.2)
+
+        text = metrics.render()
+
+        assert "# TYPE quotation_stage_duration_seconds histogram" in text
+        assert 'quotation_stage_duration_seconds_bucket{stage="pricing",le="0.25"} 2' in text
+        assert 'quotation_stage_duration_seconds_bucket{stage="pricing",le="+Inf"} 2' in text
+        assert 'quotation_stage_duration_seconds_count{stage="pricing"} 2' in text
+        assert 'quotation_stage_in_flight{stage="pricing"} 0' in text
+
+    def test_openai_usage_and_collectors(self):
+        metrics = Metrics()
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=80)
+        metrics.record_openai_usage(SimpleNamespace(usage=usage))
+        metrics.record_openai_usage(None, "timeout")
+        metrics.add_collector(lambda: [("cache_hit_ratio", "gauge", "Hit ratio", {"cache": 'dr"aft'}, 0.5)])
+
+        text = metrics.render()
+
+        assert 'quotation_openai_tokens_total{type="prompt"} 120' in text
+        assert 'quotation_openai_tokens_total{type="completion"} 80' in text
+        assert 'quotation_openai_requests_total{outcome="timeout"} 1' in text
+        assert 'quotation_cache_hit_ratio{cache="dr\\"aft"} 0.5' in text
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics(enabled=False)
+        with metrics.time("pricing"):
+            pass
+        metrics.record_openai_usage(None)
+
+        assert metrics.stage_seconds.count("pricing") == 0
+        assert metrics.openai_requests.value("ok") == 0
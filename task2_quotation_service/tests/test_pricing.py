@@ -0,0 +1,137 @@
+"""
+Tests for the fixed-point pricing engine
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from api.models import QuotationItem
+from api.pricing import mul_div, price_items, price_lines, round_amount, to_major, to_units
+
+CENT = Decimal("0.01")
+
+
+def decimal_quotation(items, vat_pct):
+    """Reference pricing of one quotation with Decimal arithmetic"""
+    line_totals = []
+    for qty, unit_cost, margin_pct in items:
+        unit_price = (Decimal(str(unit_cost)) * (1 + Decimal(str(margin_pct)) / 100)).quantize(CENT, ROUND_HALF_UP)
+        line_totals.append(unit_price * qty)
+    subtotal = sum(line_totals)
+    tax_amount = (subtotal * Decimal(str(vat_pct)) / 100).quantize(CENT, ROUND_HALF_UP)
+    return subtotal, tax_amount, subtotal + tax_amount
+
+
+class TestPriceLines:
+    """Exact margin, VAT and totals"""
+
+    def test_example_quotation(self):
+        priced = price_lines([120, 40], [240.0, 95.5], [22, 18])
+
+        assert priced.unit_price.tolist() == [29280, 11269]
+        assert priced.line_total.tolist() == [3513600, 450760]
+        assert priced.subtotal.tolist() == [3964360]
+        assert priced.tax_amount.tolist() == [594654]
+        assert priced.total.tolist() == [4559014]
+
+    def test_matches_decimal_reference(self):
+        rng = np.random.default_rng(3)
+        counts = rng.integers(1, 40, size=200)
+        qty = rng.integers(1, 10_000, size=counts.sum())
+        unit_cost = np.round(rng.uniform(0.01, 5_000, size=counts.sum()), 2)
+        margin_pct = np.round(rng.uniform(0, 100, size=counts.sum()), 2)
+
+        priced = price_lines(qty, unit_cost, margin_pct, counts=counts, vat_pct=15)
+
+        start = 0
+        for position, count in enumerate(counts.tolist()):
+            run = slice(start, start + count)
+            items = zip(qty[run].tolist(), unit_cost[run].tolist(), margin_pct[run].tolist())
+            start += count
+            subtotal, tax_amount, total = decimal_quotation(items, 15)
+            assert priced.subtotal[position] == int(subtotal * 100)
+            assert priced.tax_amount[position] == int(tax_amount * 100)
+            assert priced.total[position] == int(total * 100)
+
+    def test_totals_add_up(self):
+        priced = price_lines([3, 7, 1], [10.01, 0.35, 19.99], [12.5, 33.33, 0], counts=[2, 1], vat_pct=[15, 5])
+
+        # 37.07 at 15% = 5.5605 -> 5.56; 19.99 at 5% = 0.9995 -> 1.00
+        assert priced.subtotal.tolist() == [3707, 1999]
+        assert (priced.subtotal + priced.tax_amount == priced.total).all()
+        assert priced.tax_amount.tolist() == [556, 100]
+
+    def test_half_up_rounding(self):
+        # 0.30 * 1.25 = 0.375 -> 0.38, and 0.10 SAR at 15% VAT = 0.015 -> 0.02
+        assert price_lines([1], [0.30], [25]).unit_price.tolist() == [38]
+        assert price_lines([1], [0.10], [0]).tax_amount.tolist() == [2]
+
+    def test_vat_rate(self):
+        assert price_lines([1], [100.0], [0], vat_pct=5).tax_amount.tolist() == [500]
+        assert price_lines([1], [100.0], [0], vat_pct=0).total.tolist() == [10000]
+
+    def test_empty(self):
+        priced = price_lines([], [], [])
+
+        assert priced.unit_price.size == 0
+        assert priced.total.tolist() == [0]
+
+
+class TestFixedPoint:
+    """Conversions and overflow"""
+
+    def test_to_units_reads_floats_as_written(self):
+        assert to_units([1.005, 2.675, -1.005], 2).tolist() == [101, 268, -101]
+        assert to_units([12.5], 4).tolist() == [125000]
+
+    def test_to_major(self):
+        assert to_major(np.array([29280, 1]), 2).tolist() == [292.8, 0.01]
+
+    def test_mul_div_falls_back_to_python_ints(self):
+        values = np.array([4 * 10**15], dtype=np.int64)
+
+        assert mul_div(values, 3_000, 7).tolist() == [(4 * 10**15 * 3_000 * 2 + 7) // 14]
+
+    def test_price_items_floats(self):
+        unit_price, line_total = price_items([120], [240.0], [22])
+
+        assert unit_price.tolist() == [292.8]
+        assert line_total.tolist() == [35136.0]
+
+
+class TestRange:
+    """Amounts outside int64 minor units fail cleanly instead of wrapping"""
+
+    def test_to_units_out_of_range(self):
+        with pytest.raises(ValueError):
+            to_units([1e17], 2)
+        with pytest.raises(ValueError):
+            to_units([float("nan")], 2)
+
+    def test_mul_div_result_out_of_range(self):
+        # 10,000 x 1e13 at 22% margin = 1.22e19 cents, past int64
+        with pytest.raises(ValueError):
+            price_lines([10_000], [1e13], [22])
+
+    def test_subtotal_out_of_range(self):
+        # Each line fits (5.6e18 cents), their sum does not
+        with pytest.raises(ValueError):
+            price_lines([10_000, 10_000], [4.6e12, 4.6e12], [22, 22])
+
+    def test_total_out_of_range(self):
+        # The subtotal fits (8.5e18 cents), subtotal + 15% VAT does not
+        with pytest.raises(ValueError):
+            price_lines([10_000], [8.5e12], [0])
+
+    def test_unit_cost_bounds(self):
+        with pytest.raises(ValueError):
+            QuotationItem(sku="ALR-SL-90W", qty=1, unit_cost=1e17, margin_pct=0)
+        with pytest.raises(ValueError):
+            QuotationItem(sku="ALR-SL-90W", qty=1, unit_cost=0.004, margin_pct=0)
+
+    def test_round_amount_matches_to_units(self):
+        values = [1.005, 2.675, 0.125, 12.345, 240.0, 1e9]
+
+        assert [round_amount(value, 2) for value in values] == to_major(to_units(values, 2), 2).tolist()
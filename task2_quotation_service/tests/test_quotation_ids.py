@@ -0,0 +1,67 @@
+"""
+Tests for time-sortable quotation IDs
+"""
+
+import threading
+from datetime import datetime
+
+from api.quotation_ids import (
+    QuotationIdGenerator,
+    is_sortable_id,
+    new_quotation_id,
+    quotation_id_ranges,
+    quotation_id_timestamp,
+)
+
+
+class TestQuotationIds:
+    """Format, ordering and range bounds"""
+
+    def test_format_and_timestamp(self):
+        created_at = datetime(2024, 1, 15, 10, 30, 0, 123000)
+        quotation_id = QuotationIdGenerator().new_id(created_at.timestamp())
+
+        assert quotation_id.startswith("QUO-")
+        assert len(quotation_id) == 31 and quotation_id[14] == "-"
+        assert is_sortable_id(quotation_id)
+        assert not is_sortable_id("QUO-20240115-ABCDEF12")
+        assert quotation_id_timestamp(quotation_id) == created_at
+
+    def test_ids_sort_by_creation_time(self):
+        generator = QuotationIdGenerator()
+        timestamps = [1700000000.0 + offset for offset in (0, 0, 0, 0.001, 0.0005, 60, 3600)]
+        ids = [generator.new_id(timestamp) for timestamp in timestamps]
+
+        # Same millisecond and a clock step back still produce increasing IDs
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+
+    def test_unique_across_threads(self):
+        ids = []
+
+        def issue():
+            ids.extend(new_quotation_id() for _ in range(1000))
+
+        threads = [threading.Thread(target=issue) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(set(ids)) == 4000
+
+    def test_ranges_cover_both_formats(self):
+        generator = QuotationIdGenerator()
+        created_from, created_to = datetime(2024, 1, 15, 9), datetime(2024, 1, 15, 17)
+        inside = generator.new_id(datetime(2024, 1, 15, 12).timestamp())
+        before = QuotationIdGenerator().new_id(datetime(2024, 1, 15, 8).timestamp())
+        after = QuotationIdGenerator().new_id(datetime(2024, 1, 15, 17).timestamp() + 1)
+
+        (sortable_low, sortable_high), (legacy_low, legacy_high) = quotation_id_ranges(created_from, created_to)
+
+        assert sortable_low <= inside < sortable_high
+        assert not sortable_low <= before < sortable_high
+        assert not sortable_low <= after < sortable_high
+        assert legacy_low <= "QUO-20240115-ABCDEF12" < legacy_high
+        assert not legacy_low <= "QUO-20240114-ABCDEF12" < legacy_high
+        assert sortable_high < legacy_low
@@ -3,16 +3,51 @@ Tests for Quotation Service
 """
 
 import pytest
+import asyncio
 import json
+import sqlite3
 from datetime import datetime
 from fastapi.testclient import TestClient
 
 from api.main import app
-from api.models import QuotationRequest, ClientInfo, QuotationItem
+from api.models import QuotationRequest, ClientInfo, QuotationItem, Currency
 from api.quotation_service import QuotationService
+from api.storage import SQLiteQuotationStore
 
 client = TestClient(app)
 
+def quotation_service_total():
+    """Number of quotations in the app's store"""
+    from api.main import quotation_service
+    return quotation_service.count_quotations()
+
+class FakeAsyncOpenAI:
+    """Stand-in for AsyncOpenAI that answers after a fixed delay"""
+    
+    def __init__(self, delay: float, content: str = "LLM draft", token_delay: float = 0):
+        self.delay = delay
+        self.content = content
+        self.token_delay = token_delay
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+    
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if kwargs.get("stream"):
+            return self._stream()
+        message = type("Message", (), {"content": self.content})
+        choice = type("Choice", (), {"message": message})
+        return type("Completion", (), {"choices": [choice]})
+    
+    async def _stream(self):
+        for word in self.content.split(" "):
+            await asyncio.sleep(self.token_delay)
+            delta = type("Delta", (), {"content": word + " "})
+            choice = type("Choice", (), {"delta": delta})
+            yield type("Chunk", (), {"choices": [choice]})
+
 class TestQuotationService:
     """Test cases for quotation service"""
     
@@ -57,10 +92,10 @@ class TestQuotationService:
         assert result.total > 0
         assert result.email_draft is not None
     
-    def test_calculate_line_items(self):
+    def test_price_line_items(self):
         """Test line item calculations"""
-        items = self.sample_request.items
-        line_items = self.quotation_service._calculate_line_items(items)
+        priced, = self.quotation_service._price_quotations([self.sample_request])
+        line_items = priced.line_items
         
         assert len(line_items) == 2
         
@@ -123,6 +158,105 @@ class TestQuotationService:
         assert "عرض سعر" in result.email_draft
         assert "عميل تجريبي" in result.email_draft
     
+    def test_deferred_draft(self):
+        """Test that deferred quotations are priced immediately and drafted in the background"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0.05)
+        
+        async def run():
+            response = await self.quotation_service.generate_quotation_deferred(self.sample_request)
+            pending = await self.quotation_service.get_draft(response.quotation_id)
+            ready = await self.quotation_service.get_draft(response.quotation_id, wait=1)
+            await self.quotation_service.draft_workers.stop()
+            return response, pending, ready
+        
+        response, pending, ready = asyncio.run(run())
+        
+        assert response.draft_status == "pending"
+        assert response.total > 0
+        assert pending["draft_status"] == "pending"
+        assert pending["email_draft"] is None
+        assert ready["draft_status"] == "ready"
+        assert ready["email_draft"] == "LLM draft"
+        assert self.quotation_service.get_quotation(response.quotation_id)["email_draft"] == "LLM draft"
+    
+    def test_stream_quotation(self):
+        """Test that streaming yields the priced quotation before draft tokens"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0, content="Dear Test Client, thanks")
+        
+        async def run():
+            return [event async for event in self.quotation_service.stream_quotation(self.sample_request)]
+        
+        events = asyncio.run(run())
+        
+        assert events[0][0] == "quotation"
+        assert events[0][1]["draft_status"] == "pending"
+        assert [name for name, _ in events[1:-1]] == ["token"] * 4
+        assert events[-1] == ("done", {
+            "quotation_id": events[0][1]["quotation_id"],
+            "draft_status": "ready",
+            "email_draft": "Dear Test Client, thanks "
+        })
+        stored = self.quotation_service.get_quotation(events[0][1]["quotation_id"])
+        assert stored["email_draft"] == "Dear Test Client, thanks "
+    
+    def test_stream_quotation_disconnect(self):
+        """Test that a draft abandoned mid-stream is finished in the background"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0, content="Dear Test Client, thanks")
+        
+        async def run():
+            stream = self.quotation_service.stream_quotation(self.sample_request)
+            name, quotation = await stream.__anext__()
+            await stream.__anext__()
+            # The client disconnects after the first token
+            await stream.aclose()
+            draft = await self.quotation_service.get_draft(quotation["quotation_id"], wait=1.0)
+            await self.quotation_service.draft_workers.stop()
+            return draft
+        
+        draft = asyncio.run(run())
+        
+        assert draft["draft_status"] == "ready"
+        assert draft["email_draft"] == "Dear Test Client, thanks"
+    
+    def test_stream_quotation_slow_tokens(self):
+        """Test that the OpenAI timeout bounds reading the stream, not just opening it"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 0.1}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0, content="Dear Test Client, thanks", token_delay=0.05)
+        
+        async def run():
+            return [event async for event in self.quotation_service.stream_quotation(self.sample_request)]
+        
+        events = asyncio.run(run())
+        
+        # Some tokens arrived before the deadline; the template draft replaces them
+        assert events[1] == ("token", {"text": "Dear "})
+        assert events[-1][0] == "done"
+        assert "thanks" not in events[-1][1]["email_draft"]
+        assert "Total:" in events[-1][1]["email_draft"]
+    
+    def test_email_templates_precompiled(self):
+        """Test that templates are compiled once per language and currency"""
+        templates = self.quotation_service.email_templates
+        assert len(templates.templates) == 8
+        
+        priced = self.quotation_service._price_quotation(self.sample_request)
+        draft = self.quotation_service._generate_english_template(self.sample_request, priced.line_items, priced.total)
+        
+        assert f"Total: {priced.total} SAR" in draft
+        assert "Currency.SAR" not in draft
+        assert draft.count("• Product:") == 2
+    
     def test_invalid_sku(self):
         """Test handling of invalid SKU"""
         invalid_request = QuotationRequest(
@@ -198,6 +332,185 @@ class TestQuotationService:
         stored_quotation = self.quotation_service.get_quotation(quotation_id)
         assert stored_quotation is None
     
+    def test_batch_pricing_matches_single(self):
+        """Test that vectorized batch pricing matches single-request pricing"""
+        other_request = self.sample_request.copy(update={
+            "items": [
+                QuotationItem(sku="ALR-FL-50W", qty=7, unit_cost=150.0, margin_pct=12.5)
+            ]
+        })
+        invalid_request = self.sample_request.copy(update={
+            "items": [
+                QuotationItem(sku="INVALID-SKU", qty=1, unit_cost=100.0, margin_pct=20)
+            ]
+        })
+        
+        batch = self.quotation_service._price_quotations([self.sample_request, invalid_request, other_request])
+        
+        assert isinstance(batch[1], ValueError)
+        for request, priced in ((self.sample_request, batch[0]), (other_request, batch[2])):
+            single = self.quotation_service._price_quotation(request)
+            assert priced == single
+            assert priced.subtotal == pytest.approx(sum(item.line_total for item in priced.line_items))
+    
+    def test_out_of_range_quotation_fails_alone(self):
+        """Test that a quotation too large to price exactly fails without failing its batch"""
+        huge_request = self.sample_request.copy(update={
+            "items": [QuotationItem(sku="ALR-SL-90W", qty=10000, unit_cost=1e9, margin_pct=22)] * 8000
+        })
+        
+        batch = self.quotation_service._price_quotations([self.sample_request, huge_request])
+        
+        assert isinstance(batch[1], ValueError)
+        assert batch[0] == self.quotation_service._price_quotation(self.sample_request)
+    
+    def test_vat_rate_setting(self):
+        """Test that VAT comes from settings and totals add up to the cent"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(update={"vat_rate_pct": 5.0})
+        
+        result = self.quotation_service.generate_quotation(self.sample_request)
+        
+        assert result.tax_rate == 5.0
+        assert result.subtotal == 39643.6
+        assert result.tax_amount == 1982.18
+        assert result.total == 41625.78
+        assert "VAT (5%): 1982.18 SAR" in result.email_draft
+    
+    def test_cost_currency_conversion(self):
+        """Test that unit costs in another currency are converted at the FX snapshot's rates"""
+        usd_request = self.sample_request.copy(update={"cost_currency": Currency.USD})
+        sar_in_usd = self.sample_request.copy(update={"currency": Currency.USD, "cost_currency": Currency.SAR})
+        
+        batch = self.quotation_service._price_quotations([usd_request, sar_in_usd, self.sample_request])
+        
+        # The bundled table pegs USD at 3.75 SAR
+        assert [item.unit_cost for item in batch[0].line_items] == [900.0, 358.13]
+        assert [item.unit_cost for item in batch[1].line_items] == [64.0, 25.47]
+        assert batch[2] == self.quotation_service._price_quotation(self.sample_request)
+        assert batch[0].line_items[0].unit_price == pytest.approx(900.0 * 1.22)
+    
+    def test_async_openai_draft(self):
+        """Test that the async path uses the async OpenAI client"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0)
+        
+        result = asyncio.run(self.quotation_service.generate_quotation_async(self.sample_request))
+        
+        assert result.email_draft == "LLM draft"
+        assert self.quotation_service.get_quotation(result.quotation_id)["email_draft"] == "LLM draft"
+    
+    def test_async_openai_timeout_falls_back_to_template(self):
+        """Test template fallback when the OpenAI latency budget is exceeded"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 0.05}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=5)
+        
+        result = asyncio.run(self.quotation_service.generate_quotation_async(self.sample_request))
+        
+        assert result.email_draft.startswith("Subject: Quotation - Test Client")
+    
+    def test_hedged_draft_upgrades_in_background(self):
+        """Test that a slow LLM draft returns the template within budget and replaces it later"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0.1)
+        
+        async def run():
+            response = await self.quotation_service.generate_quotation_async(self.sample_request, latency_budget=0.01)
+            provisional = self.quotation_service.get_quotation_response(response.quotation_id)
+            final = await self.quotation_service.get_draft(response.quotation_id, wait=1)
+            await self.quotation_service.draft_workers.stop()
+            return response, provisional, final
+        
+        response, provisional, final = asyncio.run(run())
+        
+        assert response.draft_status == "provisional"
+        assert response.email_draft.startswith("Subject: Quotation - Test Client")
+        assert b'"provisional"' in provisional.body
+        assert final == {"quotation_id": response.quotation_id, "draft_status": "ready", "email_draft": "LLM draft"}
+        cached = self.quotation_service.get_quotation_response(response.quotation_id)
+        assert json.loads(cached.body)["email_draft"] == "LLM draft"
+    
+    def test_hedged_draft_within_budget(self):
+        """Test that an LLM draft arriving within the budget is returned directly"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        self.quotation_service.async_client = FakeAsyncOpenAI(delay=0)
+        
+        result = asyncio.run(self.quotation_service.generate_quotation_async(self.sample_request, latency_budget=1.0))
+        
+        assert result.draft_status == "ready"
+        assert result.email_draft == "LLM draft"
+    
+    def test_sqlite_store_does_not_block_event_loop(self, tmp_path):
+        """Test that a quotation waiting on the SQLite write lock leaves the event loop running"""
+        path = str(tmp_path / "quotations.db")
+        self.quotation_service = QuotationService(store=SQLiteQuotationStore(path))
+        # Another process holds the write lock for 0.2s
+        locker = sqlite3.connect(path, isolation_level=None)
+        locker.execute("BEGIN IMMEDIATE")
+        
+        async def run():
+            ticks = 0
+            task = asyncio.ensure_future(self.quotation_service.generate_quotation_async(self.sample_request))
+            asyncio.get_running_loop().call_later(0.2, locker.rollback)
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            response = await task
+            return response, await self.quotation_service.get_draft(response.quotation_id), ticks
+        
+        response, draft, ticks = asyncio.run(run())
+        locker.close()
+        
+        assert draft["email_draft"] == response.email_draft
+        assert ticks >= 10
+    
+    def test_open_breaker_skips_openai(self):
+        """Test that repeated timeouts open the breaker and later drafts use the template without calling OpenAI"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 0.01}
+        )
+        self.quotation_service.draft_cache = None
+        self.quotation_service.llm_guard.breaker.failure_threshold = 2
+        fake_client = FakeAsyncOpenAI(delay=5)
+        self.quotation_service.async_client = fake_client
+        
+        results = [
+            asyncio.run(self.quotation_service.generate_quotation_async(self.sample_request))
+            for _ in range(3)
+        ]
+        
+        assert fake_client.calls == 2
+        assert all(result.email_draft.startswith("Subject: Quotation - Test Client") for result in results)
+        assert self.quotation_service.llm_guard.stats()["breaker"]["state"] == "open"
+    
+    def test_identical_requests_share_one_openai_call(self):
+        """Test that concurrent identical requests reuse one cached draft"""
+        self.quotation_service.settings = self.quotation_service.settings.copy(
+            update={"use_mock_services": False, "openai_timeout_seconds": 1.0}
+        )
+        fake_client = FakeAsyncOpenAI(delay=0.01)
+        self.quotation_service.async_client = fake_client
+        resubmitted = self.sample_request.copy(update={"notes": "  Test   quotation "})
+        
+        async def run():
+            return await asyncio.gather(*(
+                self.quotation_service.generate_quotation_async(request)
+                for request in [self.sample_request] * 3 + [resubmitted]
+            ))
+        
+        results = asyncio.run(run())
+        
+        assert fake_client.calls == 1
+        assert {result.email_draft for result in results} == {"LLM draft"}
+        assert self.quotation_service.draft_cache.stats()["coalesced"] == 3
+    
     def test_product_catalog(self):
         """Test product catalog"""
         products = self.quotation_service.get_products()
@@ -227,6 +540,8 @@ class TestAPIEndpoints:
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
+        assert data["openai"]["breaker"]["state"] == "closed"
+        assert data["openai"]["queued"] == 0
     
     def test_generate_quotation_endpoint(self):
         """Test quotation generation endpoint"""
@@ -317,6 +632,101 @@ class TestAPIEndpoints:
         data = response.json()
         assert "quotations" in data
         assert "total" in data
+        assert "next_cursor" in data
+    
+    def test_list_quotations_cursor_pagination(self):
+        """Test cursor pagination and total count"""
+        first = client.get("/quotes?limit=1").json()
+        assert first["total"] == quotation_service_total()
+        
+        if first["next_cursor"]:
+            second = client.get(f"/quotes?limit=1&cursor={first['next_cursor']}").json()
+            assert second["quotations"][0]["quotation_id"] != first["quotations"][0]["quotation_id"]
+        
+        assert client.get("/quotes?cursor=garbage").status_code == 400
+    
+    def test_search_quotations_endpoint(self):
+        """Test secondary-index quotation search"""
+        request_data = {
+            "client": {
+                "name": "Search Client",
+                "contact": "search@client.com",
+                "lang": "en"
+            },
+            "currency": "SAR",
+            "items": [
+                {
+                    "sku": "ALR-FL-50W",
+                    "qty": 100,
+                    "unit_cost": 150.0,
+                    "margin_pct": 20
+                }
+            ],
+            "delivery_terms": "DAP Test"
+        }
+        quotation_id = client.post("/quote", json=request_data).json()["quotation_id"]
+        
+        response = client.get("/quotes/search", params={
+            "client": "search@client.com",
+            "sku": "alr-fl-50w",
+            "currency": "SAR",
+            "min_total": 20000
+        })
+        assert response.status_code == 200
+        assert quotation_id in [q["quotation_id"] for q in response.json()["quotations"]]
+        
+        response = client.get("/quotes/search", params={"client": "search@client.com", "min_total": 10 ** 9})
+        assert response.json()["count"] == 0
+    
+    def test_export_quotations_endpoint(self):
+        """Test streamed NDJSON and CSV export with projection and date filters"""
+        started = datetime.now()
+        request_data = {
+            "client": {"name": "Export Client", "contact": "export@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-FL-50W", "qty": 10, "unit_cost": 150.0, "margin_pct": 20}],
+            "delivery_terms": "DAP Test"
+        }
+        quotation_id = client.post("/quote", json=request_data).json()["quotation_id"]
+        
+        response = client.get("/quotes/export", params={
+            "fields": "quotation_id,client.contact",
+            "created_from": started.isoformat()
+        })
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert {"quotation_id": quotation_id, "client.contact": "export@client.com"} in rows
+        
+        response = client.get("/quotes/export", params={"format": "csv", "created_from": started.isoformat()})
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.text.startswith("quotation_id,created_at,")
+        assert quotation_id in response.text
+        
+        assert client.get("/quotes/export", params={"fields": "nope"}).status_code == 400
+        assert client.get("/quotes/export", params={"format": "xml"}).status_code == 422
+    
+    def test_quotation_document_endpoint(self):
+        """Test rendered HTML documents with ETag revalidation"""
+        request_data = {
+            "client": {"name": "عميل المستند", "contact": "doc@client.com", "lang": "ar"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-SL-90W", "qty": 2, "unit_cost": 240.0, "margin_pct": 22}],
+            "delivery_terms": "DAP Riyadh"
+        }
+        quotation_id = client.post("/quote", json=request_data).json()["quotation_id"]
+        
+        response = client.get(f"/quote/{quotation_id}/document", params={"format": "html"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert 'dir="rtl"' in response.text
+        assert "عميل المستند" in response.text
+        
+        etag = response.headers["etag"]
+        cached = client.get(f"/quote/{quotation_id}/document?format=html", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        
+        assert client.get("/quote/QUO-MISSING/document").status_code == 404
     
     def test_products_endpoint(self):
         """Test products endpoint"""
@@ -333,6 +743,113 @@ class TestAPIEndpoints:
         assert "name" in product
         assert "base_price" in product
     
+    def test_products_endpoint_filters(self):
+        """Products can be filtered by category and normalized specifications"""
+        response = client.get("/products", params={"category": "streetlight", "spec": ["wattage:90 w"]})
+        assert response.status_code == 200
+        assert [p["sku"] for p in response.json()["products"]] == ["ALR-SL-90W"]
+        
+        response = client.get("/products", params={"spec": "wattage"})
+        assert response.status_code == 400
+    
+    def test_idempotency_key(self):
+        """Retries with the same Idempotency-Key return the original quotation"""
+        request_data = {
+            "client": {"name": "Retry Client", "contact": "retry@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-FL-50W", "qty": 4, "unit_cost": 150.0, "margin_pct": 20}],
+            "delivery_terms": "EXW Riyadh"
+        }
+        headers = {"Idempotency-Key": "retry-test-1"}
+        count_before = quotation_service_total()
+        
+        first = client.post("/quote", json=request_data, headers=headers)
+        retry = client.post("/quote", json=request_data, headers=headers)
+        
+        assert first.headers["idempotent-replayed"] == "false"
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert retry.json()["quotation_id"] == first.json()["quotation_id"]
+        assert quotation_service_total() == count_before + 1
+        
+        changed = {**request_data, "delivery_terms": "DAP Jeddah"}
+        assert client.post("/quote", json=changed, headers=headers).status_code == 422
+    
+    def test_metrics_endpoint(self):
+        """/metrics exports per-stage histograms and cache counters after a quote"""
+        response = client.post("/quote", json={
+            "client": {"name": "Metrics Client", "contact": "metrics@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-SL-90W", "qty": 3, "unit_cost": 240.0, "margin_pct": 22}],
+            "delivery_terms": "EXW Riyadh"
+        })
+        assert response.status_code == 200
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        for stage in ("validation", "pricing", "drafting", "storage", "serialization"):
+            assert f'quotation_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert 'quotation_http_request_duration_seconds_count{handler="generate_quotation",method="POST",status="200"}' in text
+        assert 'quotation_cache_lookups_total{cache="quotation_response",result="hits"}' in text
+        assert 'quotation_openai_breaker_state{state="closed"} 1' in text
+    
+    def test_latency_budget_header(self):
+        """X-Latency-Budget-Ms is accepted on POST /quote and must not be negative"""
+        request_data = {
+            "client": {"name": "Budget Client", "contact": "budget@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-FL-50W", "qty": 2, "unit_cost": 150.0, "margin_pct": 20}],
+            "delivery_terms": "EXW Riyadh"
+        }
+        
+        response = client.post("/quote", json=request_data, headers={"X-Latency-Budget-Ms": "250"})
+        assert response.status_code == 200
+        assert response.json()["draft_status"] == "ready"
+        
+        response = client.post("/quote", json=request_data, headers={"X-Latency-Budget-Ms": "-1"})
+        assert response.status_code == 422
+    
+    def test_conditional_get_quotation(self):
+        """GET /quote/{id} serves cached bytes with a strong ETag and answers 304"""
+        from api.main import quotation_service
+        
+        response = client.post("/quote", json={
+            "client": {"name": "ETag Client", "contact": "etag@client.com", "lang": "en"},
+            "currency": "SAR",
+            "items": [{"sku": "ALR-SL-90W", "qty": 2, "unit_cost": 240.0, "margin_pct": 22}],
+            "delivery_terms": "DAP Dubai, 4 weeks"
+        })
+        quotation_id = response.json()["quotation_id"]
+        
+        first = client.get(f"/quote/{quotation_id}")
+        etag = first.headers["etag"]
+        assert first.status_code == 200
+        assert first.json()["quotation_id"] == quotation_id
+        assert client.get(f"/quote/{quotation_id}").content == first.content
+        
+        not_modified = client.get(f"/quote/{quotation_id}", headers={"If-None-Match": f"W/{etag}"})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+        assert client.get(f"/quote/{quotation_id}", headers={"If-None-Match": '"stale"'}).status_code == 200
+        
+        # Deleted behind the cache's back, e.g. by another worker
+        quotation_service.store.delete(quotation_id)
+        assert client.get(f"/quote/{quotation_id}", headers={"If-None-Match": etag}).status_code == 404
+    
+    def test_conditional_get_products(self):
+        """GET /products is cached per catalog version"""
+        from api.main import quotation_service
+        
+        first = client.get("/products")
+        etag = first.headers["etag"]
+        assert client.get("/products", headers={"If-None-Match": etag}).status_code == 304
+        assert client.get("/products", params={"category": "Floodlight"}).headers["etag"] != etag
+        
+        quotation_service.product_responses.use_generation("another-catalog-version")
+        assert quotation_service.product_responses.stats()["entries"] == 0
+        assert client.get("/products", headers={"If-None-Match": etag}).status_code == 304
+    
     def test_delete_quotation_endpoint(self):
         """Test delete quotation endpoint"""
         # First create a quotation
@@ -364,6 +881,108 @@ class TestAPIEndpoints:
         data = response.json()
         assert "message" in data
     
+    def test_batch_quotation_endpoint(self):
+        """Test bulk quotation endpoint with per-request errors"""
+        valid = {
+            "client": {
+                "name": "Test Client",
+                "contact": "test@client.com",
+                "lang": "en"
+            },
+            "currency": "SAR",
+            "items": [
+                {
+                    "sku": "ALR-SL-90W",
+                    "qty": 10,
+                    "unit_cost": 240.0,
+                    "margin_pct": 20
+                }
+            ],
+            "delivery_terms": "DAP Test"
+        }
+        unknown_sku = {**valid, "items": [{**valid["items"][0], "sku": "INVALID-SKU"}]}
+        invalid = {**valid, "items": []}
+        
+        response = client.post("/quotes/batch", json={"requests": [valid, unknown_sku, invalid, valid]})
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["succeeded"] == 2
+        assert data["failed"] == 2
+        assert [r["status"] for r in data["results"]] == ["ok", "error", "error", "ok"]
+        assert "INVALID-SKU" in data["results"][1]["error"]
+        
+        quotation_id = data["results"][0]["quotation"]["quotation_id"]
+        assert client.get(f"/quote/{quotation_id}").status_code == 200
+    
+    def test_deferred_draft_endpoint(self):
+        """Test deferred drafting with long-polling"""
+        request_data = {
+            "client": {
+                "name": "Test Client",
+                "contact": "test@client.com",
+                "lang": "en"
+            },
+            "currency": "SAR",
+            "items": [
+                {
+                    "sku": "ALR-SL-90W",
+                    "qty": 10,
+                    "unit_cost": 240.0,
+                    "margin_pct": 20
+                }
+            ],
+            "delivery_terms": "DAP Test"
+        }
+        
+        with TestClient(app) as persistent_client:
+            response = persistent_client.post("/quote?defer_draft=true", json=request_data)
+            assert response.status_code == 200
+            assert response.json()["draft_status"] == "pending"
+            
+            quotation_id = response.json()["quotation_id"]
+            draft = persistent_client.get(f"/quote/{quotation_id}/draft?wait=5")
+            assert draft.status_code == 200
+            assert draft.json()["draft_status"] == "ready"
+            assert "Test Client" in draft.json()["email_draft"]
+        
+        assert client.get("/quote/NONEXISTENT/draft").status_code == 404
+    
+    def test_stream_quotation_endpoint(self):
+        """Test server-sent events streaming endpoint"""
+        request_data = {
+            "client": {
+                "name": "Test Client",
+                "contact": "test@client.com",
+                "lang": "en"
+            },
+            "currency": "SAR",
+            "items": [
+                {
+                    "sku": "ALR-SL-90W",
+                    "qty": 10,
+                    "unit_cost": 240.0,
+                    "margin_pct": 20
+                }
+            ],
+            "delivery_terms": "DAP Test"
+        }
+        
+        response = client.post("/quote/stream", json=request_data)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        
+        events = [
+            (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in response.text.strip().split("\n\n")
+        ]
+        assert [name for name, _ in events] == ["quotation", "token", "done"]
+        assert events[0][1]["line_items"][0]["sku"] == "ALR-SL-90W"
+        assert "Test Client" in events[2][1]["email_draft"]
+        
+        invalid_sku = {**request_data, "items": [{**request_data["items"][0], "sku": "INVALID-SKU"}]}
+        assert client.post("/quote/stream", json=invalid_sku).status_code == 400
+    
     def test_delete_nonexistent_quotation(self):
         """Test deleting non-existent quotation"""
         response = client.delete("/quote/NONEXISTENT")
@@ -0,0 +1,87 @@
+"""
+Tests for response encoding
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models import ClientInfo, DraftStatus, LineItem, QuotationResponse
+from api.serialization import accepts_msgpack, dumps_json
+
+client = TestClient(app)
+
+QUOTE_REQUEST = {
+    "client": {"name": "Gulf Eng.", "contact": "omar@client.com", "lang": "ar"},
+    "currency": "SAR",
+    "items": [{"sku": "ALR-SL-90W", "qty": 120, "unit_cost": 240.0, "margin_pct": 22}],
+    "delivery_terms": "DAP Dubai, 4 weeks",
+}
+
+
+def make_response():
+    created_at = datetime(2024, 1, 15, 10, 30, 0, 123456)
+    return QuotationResponse(
+        quotation_id="QUO-1",
+        client=ClientInfo(name="شركة الخليج", contact="omar@client.com", lang="ar"),
+        currency="SAR",
+        line_items=[LineItem(
+            sku="ALR-SL-90W", description="Pole", qty=2, unit_cost=240.0,
+            margin_pct=22, unit_price=292.8, line_total=585.6,
+        )],
+        subtotal=585.6,
+        tax_rate=15.0,
+        tax_amount=87.84,
+        total=673.44,
+        delivery_terms="DAP",
+        email_draft="مرحبا",
+        draft_status=DraftStatus.READY,
+        created_at=created_at,
+        valid_until=created_at,
+    )
+
+
+class TestSerialization:
+    """Encoding helpers"""
+
+    def test_dumps_json_matches_fastapi_encoding(self):
+        response = make_response()
+        assert json.loads(dumps_json(response)) == jsonable_encoder(response)
+        assert json.loads(dumps_json(response.dict())) == jsonable_encoder(response)
+
+    def test_accepts_msgpack(self):
+        if not accepts_msgpack("application/msgpack"):
+            pytest.skip("msgpack is not installed")
+        assert accepts_msgpack("application/json, application/x-msgpack;q=0.5")
+        assert not accepts_msgpack("application/msgpack;q=0")
+        assert not accepts_msgpack("application/json")
+        assert not accepts_msgpack(None)
+
+
+class TestContentNegotiation:
+    """JSON by default, MessagePack on request"""
+
+    def test_json_by_default(self):
+        response = client.post("/quote", json=QUOTE_REQUEST)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert QuotationResponse.parse_obj(response.json()).total == response.json()["total"]
+
+    def test_msgpack(self):
+        msgpack = pytest.importorskip("msgpack")
+        headers = {"Accept": "application/msgpack"}
+
+        response = client.post("/quote", json=QUOTE_REQUEST, headers=headers)
+        assert response.headers["content-type"] == "application/msgpack"
+        quotation = msgpack.unpackb(response.content)
+        assert quotation["client"]["name"] == "Gulf Eng."
+
+        fetched = client.get(f"/quote/{quotation['quotation_id']}", headers=headers)
+        assert msgpack.unpackb(fetched.content)["total"] == quotation["total"]
+
+        listed = client.get("/quotes", params={"limit": 1}, headers=headers)
+        assert len(msgpack.unpackb(listed.content)["quotations"]) == 1
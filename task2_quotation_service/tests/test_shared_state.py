@@ -0,0 +1,146 @@
+"""
+Tests for state shared between worker processes
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+from api.shared_state import IdempotencyConflict, SharedDraftCache, SharedIdempotencyCache, SharedStateDB
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+def make_idempotency(path, **kwargs):
+    """One worker's view of the shared idempotency table"""
+    return SharedIdempotencyCache(SharedStateDB(path), encode=str, decode=str, poll_interval=0.005, **kwargs)
+
+
+class TestSharedIdempotencyCache:
+    """Keys claimed by one worker are replayed by the others"""
+
+    def test_replay_across_workers(self, shared_path):
+        worker_a, worker_b = make_idempotency(shared_path), make_idempotency(shared_path)
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "QUO-1"
+
+        async def run():
+            # The duplicate reaches worker B while worker A is still generating
+            return await asyncio.gather(worker_a.run("key", "fp", factory), worker_b.run("key", "fp", factory))
+
+        assert asyncio.run(run()) == [("QUO-1", False), ("QUO-1", True)]
+        assert len(calls) == 1
+        assert asyncio.run(make_idempotency(shared_path).run("key", "fp", factory)) == ("QUO-1", True)
+
+        with pytest.raises(IdempotencyConflict):
+            asyncio.run(worker_b.run("key", "other", factory))
+
+    def test_failed_claims_are_released(self, shared_path):
+        worker_a, worker_b = make_idempotency(shared_path), make_idempotency(shared_path)
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        async def factory():
+            return "QUO-2"
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(worker_a.run("key", "fp", failing))
+        assert asyncio.run(worker_b.run("key", "fp", factory)) == ("QUO-2", False)
+
+    def test_abandoned_claim_is_taken_over(self, shared_path):
+        worker_a = make_idempotency(shared_path, lease_seconds=0.01)
+        worker_a._claim("key", "fp")
+
+        async def factory():
+            return "QUO-3"
+
+        worker_b = make_idempotency(shared_path, lease_seconds=0.01)
+        assert asyncio.run(asyncio.wait_for(worker_b.run("key", "fp", factory), 1)) == ("QUO-3", False)
+
+    def test_locked_database_does_not_block_event_loop(self, shared_path):
+        worker = make_idempotency(shared_path)
+        # Another process holds the write lock for 0.2s
+        locker = sqlite3.connect(shared_path, isolation_level=None)
+        locker.execute("BEGIN IMMEDIATE")
+
+        async def factory():
+            return "QUO-4"
+
+        async def run():
+            ticks = 0
+            task = asyncio.ensure_future(worker.run("key", "fp", factory))
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.2, locker.rollback)
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            return await task, ticks
+
+        result, ticks = asyncio.run(run())
+        locker.close()
+
+        assert result == ("QUO-4", False)
+        assert ticks >= 10
+
+    def test_shared_table_is_bounded(self, shared_path):
+        worker = make_idempotency(shared_path, max_entries=2)
+        worker._claim("inflight", "fp")
+
+        async def run():
+            for key in ("a", "b", "c"):
+                await worker.run(key, "fp", lambda: asyncio.sleep(0, result=key))
+
+        asyncio.run(run())
+
+        keys = [row[0] for row in worker.db.connection().execute("SELECT key FROM idempotency_keys ORDER BY key")]
+        assert keys == ["b", "c", "inflight"]
+
+
+class TestSharedDraftCache:
+    """Drafts written by one worker are hits on the others"""
+
+    def test_drafts_are_shared(self, shared_path):
+        worker_a = SharedDraftCache(SharedStateDB(shared_path))
+        worker_b = SharedDraftCache(SharedStateDB(shared_path))
+
+        worker_a.put("key", "LLM draft")
+
+        assert worker_b.get("key") == "LLM draft"
+        assert worker_b.stats()["shared_hits"] == 1
+
+    def test_async_methods(self, shared_path):
+        worker_a = SharedDraftCache(SharedStateDB(shared_path))
+        worker_b = SharedDraftCache(SharedStateDB(shared_path))
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            return "LLM draft"
+
+        async def run():
+            await worker_a.put_async("key", "LLM draft")
+            return await worker_b.get_async("key"), await worker_b.get_or_create("key", factory), await worker_a.get_async("other")
+
+        assert asyncio.run(run()) == ("LLM draft", "LLM draft", None)
+        assert calls == []
+        assert worker_b.stats()["shared_hits"] == 1
+        assert worker_b.get("key") == "LLM draft"
+        assert worker_b.stats()["shared_hits"] == 1
+
+    def test_shared_table_is_bounded(self, shared_path):
+        db = SharedStateDB(shared_path)
+        cache = SharedDraftCache(db, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, f"draft {key}")
+
+        keys = [row[0] for row in db.connection().execute("SELECT key FROM draft_cache ORDER BY key")]
+        assert keys == ["b", "c"]
@@ -0,0 +1,249 @@
+"""
+Tests for quotation storage backends
+"""
+
+import gc
+import sys
+
+import pytest
+from datetime import datetime, timedelta
+
+from api import storage
+from api.quotation_ids import QuotationIdGenerator
+from api.storage import InMemoryQuotationStore, SQLiteQuotationStore, create_store
+
+
+def make_quotation(quotation_id, created_at, contact="omar@client.com", skus=("ALR-SL-90W",), total=115.0, currency="SAR"):
+    """Build a minimal stored quotation record"""
+    return {
+        "quotation_id": quotation_id,
+        "client": {"name": "Gulf Eng.", "contact": contact, "lang": "en"},
+        "currency": currency,
+        "line_items": [{"sku": sku, "qty": 1, "line_total": 100.0} for sku in skus],
+        "total": total,
+        "created_at": created_at,
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryQuotationStore()
+    else:
+        sqlite_store = SQLiteQuotationStore(str(tmp_path / "quotations.db"))
+        yield sqlite_store
+        sqlite_store.close()
+
+
+class TestQuotationStore:
+    """Behaviour shared by every storage backend"""
+
+    def test_save_get_delete(self, store):
+        store.save(make_quotation("QUO-1", datetime(2024, 1, 15, 10, 30)))
+
+        stored = store.get("QUO-1")
+        assert stored["quotation_id"] == "QUO-1"
+        assert store.count() == 1
+
+        assert store.delete("QUO-1") is True
+        assert store.get("QUO-1") is None
+        assert store.delete("QUO-1") is False
+        assert store.count() == 0
+
+    def test_list_is_ordered_by_creation_time(self, store):
+        start = datetime(2024, 1, 15, 10, 30)
+        for i in range(5):
+            store.save(make_quotation(f"QUO-{i}", start + timedelta(minutes=i)))
+
+        page = store.list(limit=2, offset=1)
+        assert [q["quotation_id"] for q in page] == ["QUO-1", "QUO-2"]
+
+    def test_cursor_pagination(self, store):
+        start = datetime(2024, 1, 15, 10, 30)
+        for i in range(7):
+            store.save(make_quotation(f"QUO-{i}", start + timedelta(minutes=i)))
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = store.list_page(limit=3, cursor=cursor)
+            seen.extend(q["quotation_id"] for q in page)
+            if cursor is None:
+                break
+
+        assert seen == [f"QUO-{i}" for i in range(7)]
+
+    def test_count_tracks_upserts_and_deletes(self, store):
+        created_at = datetime(2024, 1, 15, 10, 30)
+        store.save(make_quotation("QUO-1", created_at))
+        store.save(make_quotation("QUO-1", created_at, contact="other@client.com"))
+        store.save(make_quotation("QUO-2", created_at))
+        assert store.count() == 2
+
+        store.delete("QUO-1")
+        store.delete("QUO-1")
+        assert store.count() == 1
+        assert [q["quotation_id"] for q in store.list_page()[0]] == ["QUO-2"]
+
+    def test_search_intersects_filters(self, store):
+        start = datetime(2024, 1, 1)
+        for i in range(40):
+            store.save(make_quotation(
+                f"QUO-{i:02d}",
+                start + timedelta(days=i),
+                contact="omar@client.com" if i % 2 else "sara@other.com",
+                skus=("ALR-SL-90W", "ALR-FL-50W") if i % 3 == 0 else ("ALR-OBL-12V",),
+                total=1000.0 * i,
+                currency="USD" if i == 33 else "SAR",
+            ))
+
+        results = store.search(
+            client_contact="Omar@Client.com",
+            sku="ALR-SL-90W",
+            created_from=datetime(2024, 1, 10),
+            created_to=datetime(2024, 2, 4),
+            min_total=15000.0,
+        )
+        assert [q["quotation_id"] for q in results] == ["QUO-15", "QUO-21", "QUO-27", "QUO-33"]
+
+        assert [q["quotation_id"] for q in store.search(sku="ALR-FL-50W", currency="USD")] == ["QUO-33"]
+        assert [q["quotation_id"] for q in store.search(max_total=1000.0)] == ["QUO-00", "QUO-01"]
+        assert len(store.search(limit=5)) == 5
+
+        store.delete("QUO-33")
+        assert store.search(sku="ALR-FL-50W", currency="USD") == []
+
+    def test_scan_by_id_range(self, store):
+        generator = QuotationIdGenerator()
+        start = datetime(2024, 1, 15, 10, 0)
+        sortable = []
+        for i in range(6):
+            created_at = start + timedelta(hours=i)
+            sortable.append(generator.new_id(created_at.timestamp()))
+            store.save(make_quotation(sortable[-1], created_at))
+        # Legacy dated IDs are random within their day
+        store.save(make_quotation("QUO-20240115-FFFFFFFF", start + timedelta(minutes=30)))
+        store.save(make_quotation("QUO-20240115-00000000", start + timedelta(hours=8)))
+
+        window = store.scan(start + timedelta(hours=1), start + timedelta(hours=4))
+        assert [q["quotation_id"] for q in window] == sortable[1:4]
+
+        batches, after = [], None
+        while True:
+            batch = store.scan(start, start + timedelta(days=1), after=after, limit=3)
+            if not batch:
+                break
+            batches.append([q["quotation_id"] for q in batch])
+            after = batch[-1]["quotation_id"]
+        assert batches == [sortable[:3], sortable[3:], ["QUO-20240115-00000000", "QUO-20240115-FFFFFFFF"]]
+
+    def test_invalid_cursor(self, store):
+        with pytest.raises(ValueError, match="Invalid pagination cursor"):
+            store.list_page(cursor="not-a-cursor")
+
+
+class TestInMemoryQuotationStore:
+    """Compact record encoding"""
+
+    def canonical_quotation(self):
+        from api.models import ClientInfo, LineItem, QuotationResponse
+
+        created_at = datetime(2024, 1, 15, 10, 30, 0, 123456)
+        return QuotationResponse(
+            quotation_id="QUO-1",
+            client=ClientInfo(name="Gulf Eng.", contact="omar@client.com", lang="ar"),
+            currency="SAR",
+            line_items=[
+                LineItem(sku=sku, description="Pole", qty=qty, unit_cost=240.0,
+                         margin_pct=22.0, unit_price=292.8, line_total=292.8 * qty)
+                for sku, qty in (("ALR-SL-90W", 120), ("ALR-FL-50W", 3))
+            ],
+            subtotal=36014.4,
+            tax_rate=15.0,
+            tax_amount=5402.16,
+            total=41416.56,
+            delivery_terms="DAP Dubai, 4 weeks",
+            email_draft="Dear Gulf Eng., thank you for your interest in our products. " * 20,
+            created_at=created_at,
+            valid_until=created_at + timedelta(days=30),
+        ).dict()
+
+    def test_compact_round_trip(self):
+        record = self.canonical_quotation()
+        store = InMemoryQuotationStore()
+        store.save(record)
+
+        stored = store._quotations["QUO-1"]
+        assert type(stored).__name__ == "CompactQuotation"
+        assert len(stored.draft) < len(record["email_draft"]) // 10
+
+        expected = {**record, "currency": "SAR", "draft_status": "ready", "client": {**record["client"], "lang": "ar"}}
+        assert store.get("QUO-1") == expected
+
+        store.update_draft("QUO-1", "short", "failed")
+        assert store.get("QUO-1")["email_draft"] == "short"
+        assert store.search(sku="ALR-FL-50W", currency="SAR")[0]["draft_status"] == "failed"
+
+    def test_shared_clients_freed_with_records(self):
+        # The records module the store itself imported
+        records = sys.modules[storage.pack_quotation.__module__]
+        store = InMemoryQuotationStore()
+        before = len(records._CLIENTS)
+        for index in range(100):
+            store.save({**self.canonical_quotation(), "quotation_id": f"QUO-{index}",
+                        "client": {"name": f"Client {index}", "contact": "omar@client.com", "lang": "en"}})
+        assert len(records._CLIENTS) == before + 100
+
+        for index in range(50):
+            store.delete(f"QUO-{index}")
+        gc.collect()
+        assert len(records._CLIENTS) == before + 50
+
+        del store
+        gc.collect()
+        assert len(records._CLIENTS) == before
+
+    def test_non_canonical_records_are_kept_as_is(self):
+        record = {**self.canonical_quotation(), "extra": 1}
+        store = InMemoryQuotationStore()
+        store.save(record)
+        assert store.get("QUO-1") is record
+
+
+class TestSQLiteQuotationStore:
+    """SQLite-specific behaviour"""
+
+    def test_shared_between_store_instances(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        writer = SQLiteQuotationStore(path)
+        reader = SQLiteQuotationStore(path)
+
+        writer.save(make_quotation("QUO-1", datetime(2024, 1, 15, 10, 30)))
+        assert reader.get("QUO-1")["client"]["contact"] == "omar@client.com"
+
+        writer.close()
+        reader.close()
+
+    def test_wal_mode_and_indexes(self, tmp_path):
+        store = SQLiteQuotationStore(str(tmp_path / "quotations.db"))
+        conn = store._connection()
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in conn.execute("SELECT * FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_quotations_created_at", "idx_quotations_client_contact", "idx_quotation_items_sku"} <= indexes
+
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT quotation_id FROM quotation_items WHERE sku = ?", ("ALR-SL-90W",)
+        ).fetchall()
+        assert "idx_quotation_items_sku" in " ".join(row[-1] for row in plan)
+
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT payload FROM quotations WHERE (created_at, quotation_id) > (?, ?) "
+            "ORDER BY created_at, quotation_id LIMIT 10", ("2024-01-01", "QUO-1")
+        ).fetchall()
+        assert "idx_quotations_created_at" in " ".join(row[-1] for row in plan)
+        store.close()
+
+    def test_create_store_from_url(self, tmp_path):
+        assert isinstance(create_store(f"sqlite:///{tmp_path}/q.db"), SQLiteQuotationStore)
+        assert isinstance(create_store("sqlite:///:memory:"), SQLiteQuotationStore)
+        assert isinstance(create_store("memory://"), InMemoryQuotationStore)
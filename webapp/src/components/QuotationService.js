@@ -12,7 +12,7 @@ import {
   FiCopy,
   FiDownload
 } from 'react-icons/fi';
-import axios from 'axios';
+import { quotationAPI } from '../services/api';
 
 const Container = styled.div`
   padding: 2rem 0;
@@ -360,8 +360,19 @@ function QuotationService() {
     setResult(null);
 
     try {
-      const response = await axios.post('/quote', formData);
-      setResult(response.data);
+      await quotationAPI.streamQuotation(formData, {
+        // Show pricing as soon as it arrives, then fill in the draft as it streams
+        onQuotation: (quotation) => {
+          setResult(quotation);
+          setLoading(false);
+        },
+        onToken: (text) => {
+          setResult(prev => ({ ...prev, email_draft: prev.email_draft + text }));
+        },
+        onDone: (draft) => {
+          setResult(prev => ({ ...prev, ...draft }));
+        },
+      });
       toast.success('Quotation generated successfully!');
     } catch (error) {
       console.error('Error generating quotation:', error);
@@ -383,7 +394,7 @@ Contact: ${result.client.contact}
 Currency: ${result.currency}
 
 Items:
-${result.items.map(item => 
+${(result.line_items || result.items).map(item => 
   `${item.sku} - Qty: ${item.qty} - Unit Cost: ${item.unit_cost} - Margin: ${item.margin_pct}% - Total: ${item.line_total}`
 ).join('\n')}
 
@@ -66,6 +66,55 @@ export const quotationAPI = {
     }
   },
 
+  // Stream a quotation over server-sent events: the priced quotation arrives
+  // first, then email draft tokens as the LLM produces them.
+  streamQuotation: async (quotationData, { onQuotation, onToken, onDone } = {}) => {
+    const response = await fetch(`${api.defaults.baseURL}/quote/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify(quotationData),
+    });
+
+    if (response.status === 404) {
+      // Servers without streaming support (e.g. simple_api_server.py)
+      const { data } = await api.post('/quote', quotationData);
+      onQuotation?.(data);
+      onDone?.(data);
+      return;
+    }
+
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({}));
+      throw new Error(error.detail || 'Server error');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const dispatch = (block) => {
+      const event = block.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(block.match(/^data: (.*)$/m)?.[1] || '{}');
+      if (event === 'quotation') onQuotation?.(data);
+      else if (event === 'token') onToken?.(data.text);
+      else if (event === 'done') onDone?.(data);
+      else if (event === 'error') throw new Error(data.detail || 'Server error');
+    };
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+  },
+
   listQuotations: async () => {
     try {
       const response = await api.get('/quotes');